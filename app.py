@@ -1,3 +1,8 @@
+import time
+
+# 量測腳本開始執行到畫面渲染完成的時間（冷啟動時包含各模組的匯入時間）
+_RUN_START = time.perf_counter()
+
 import streamlit as st
 
 # Import UI components from the ui directory
@@ -5,6 +10,7 @@ from ui.sidebar import display_sidebar
 from ui.tab_dashboard import display_dashboard_tab
 from ui.tab_single_prediction import display_single_prediction_tab
 from ui.tab_batch_prediction import display_batch_prediction_tab
+from ui.state import get_model
 
 # ==============================================================================
 # Main App Configuration
@@ -40,13 +46,23 @@ with tab1:
     display_dashboard_tab()
 
 with tab2:
-    if st.session_state.get('trained_model'):
+    if get_model() is not None:
         display_single_prediction_tab()
     else:
         st.info("請先從側邊欄載入或訓練一個模型，才能使用即時預測功能。" )
 
 with tab3:
-    if st.session_state.get('trained_model'):
+    if get_model() is not None:
         display_batch_prediction_tab()
     else:
         st.info("請先從側邊欄載入或訓練一個模型，才能使用批次分析功能。" )
+
+# ==============================================================================
+# Startup Time
+# ==============================================================================
+run_seconds = time.perf_counter() - _RUN_START
+if 'first_render_seconds' not in st.session_state:
+    st.session_state['first_render_seconds'] = run_seconds
+st.sidebar.caption(
+    f"⏱️ 首次渲染 {st.session_state['first_render_seconds']:.2f} 秒 · 本次執行 {run_seconds:.2f} 秒"
+)
@@ -0,0 +1,107 @@
+"""
+基因演算法族群表示法效能測試：
+
+1. 每一代的族群操作（錦標賽選擇、兩點交配、位元翻轉突變與產生快取鍵）在 DEAP 個體列表與
+   向量化布林矩陣 (`representation='packed'`) 下的耗時，不含模型評估。
+2. 每次評估取出特徵子集的耗時：原本的 `X[:, mask]`（每次配置新陣列）與 `gather_columns`
+   （從欄主序矩陣逐欄複製到重複使用的緩衝區）。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_ga_population --features 78 --generations 50
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from deap import algorithms, base, creator, tools
+
+from src.feature_selector import (
+    crossover_two_point, gather_columns, mask_to_key, mutate_flip_bit, select_tournament,
+)
+
+
+def _deap_seconds(pop_size, n_features, generations):
+    toolbox = base.Toolbox()
+    toolbox.register("attr_bool", random.randint, 0, 1)
+    toolbox.register("individual", tools.initRepeat, creator.Individual, toolbox.attr_bool, n=n_features)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("mate", tools.cxTwoPoint)
+    toolbox.register("mutate", tools.mutFlipBit, indpb=0.05)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+
+    pop = toolbox.population(n=pop_size)
+    for ind in pop:
+        ind.fitness.values = (random.random(),)
+    start = time.perf_counter()
+    for _ in range(generations):
+        offspring = algorithms.varAnd(toolbox.select(pop, len(pop)), toolbox, 0.5, 0.2)
+        for ind in offspring:
+            mask_to_key(ind)
+            ind.fitness.values = (random.random(),)
+        pop[:] = offspring
+    return (time.perf_counter() - start) / generations
+
+
+def _packed_seconds(pop_size, n_features, generations):
+    rng = np.random.default_rng(0)
+    pop = rng.random((pop_size, n_features)) < 0.5
+    fitness = rng.random(pop_size)
+    start = time.perf_counter()
+    for _ in range(generations):
+        chosen = select_tournament(fitness, pop_size, 3, rng)
+        pop, fitness = pop[chosen], fitness[chosen]
+        pop, _ = crossover_two_point(pop, 0.5, rng)
+        pop, _ = mutate_flip_bit(pop, 0.2, 0.05, rng)
+        [row.tobytes() for row in np.packbits(pop, axis=1)]
+        fitness = rng.random(pop_size)
+    return (time.perf_counter() - start) / generations
+
+
+def _subset_ms(n_rows, n_features, repeat):
+    rng = np.random.default_rng(0)
+    X = np.asfortranarray(rng.normal(size=(n_rows, n_features)).astype(np.float32))
+    buffer = np.empty_like(X, order='F')
+    masks = rng.random((repeat, n_features)) < 0.5
+
+    start = time.perf_counter()
+    for mask in masks:
+        X[:, mask]
+    fancy = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    for mask in masks:
+        gather_columns(X, mask, buffer)
+    gathered = (time.perf_counter() - start) / repeat * 1000
+    return fancy, gathered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--features', type=int, default=78, help='特徵數')
+    parser.add_argument('--generations', type=int, default=50, help='測量的世代數')
+    parser.add_argument('--rows', type=int, default=200_000, help='取出特徵子集的資料筆數')
+    parser.add_argument('--repeat', type=int, default=20, help='取出特徵子集的重複次數')
+    args = parser.parse_args()
+
+    rows = []
+    for pop_size in (40, 400, 4000):
+        deap_ms = _deap_seconds(pop_size, args.features, args.generations) * 1000
+        packed_ms = _packed_seconds(pop_size, args.features, args.generations) * 1000
+        rows.append({
+            '族群大小': pop_size,
+            'DEAP 列表 (毫秒/代)': deap_ms,
+            '布林矩陣 (毫秒/代)': packed_ms,
+            '加速': deap_ms / packed_ms,
+        })
+    print(f"族群操作 ({args.features} 個特徵，不含模型評估)：")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+    fancy, gathered = _subset_ms(args.rows, args.features, args.repeat)
+    print(f"\n取出特徵子集 ({args.rows:,} 筆，約一半的特徵)：X[:, mask] {fancy:,.1f} 毫秒，"
+          f"gather_columns {gathered:,.1f} 毫秒 (不配置新陣列)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+模型套件格式測試：比較舊版 joblib、壓縮 joblib、mmap 與 compact 套件的檔案大小、載入時間與常駐記憶體。
+
+每次載入都在新的 Python 行程中進行，記錄載入前後的 RssAnon（行程私有記憶體）與 RssFile
+（檔案對應的分頁，多個行程可共用）。RssAnon/RssFile 需要 Linux 的 /proc/self/status。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_model_package --trees 100 --rows 200000
+    python -m benchmarks.bench_model_package --model hgb
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.model_package import load_model_package, read_package_header, save_model_package
+
+
+def _rss_mb():
+    """回傳 (RssAnon, RssFile)，單位 MB；無法取得時為 NaN。"""
+    values = {'RssAnon': float('nan'), 'RssFile': float('nan')}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key = line.split(':', 1)[0]
+                if key in values:
+                    values[key] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values['RssAnon'], values['RssFile']
+
+
+def _child(path, mmap_mode, legacy, cache_dir):
+    """子行程：載入一次套件並輸出量測結果 (JSON)。"""
+    import joblib  # noqa: F401  預先匯入，讓量測不包含模組匯入時間
+    import sklearn.ensemble  # noqa: F401
+
+    anon_before, file_before = _rss_mb()
+    start = time.perf_counter()
+    if legacy:
+        package = joblib.load(path, mmap_mode=mmap_mode)
+    else:
+        package = load_model_package(path, mmap_mode=mmap_mode, cache_dir=cache_dir)
+    seconds = time.perf_counter() - start
+    anon_after, file_after = _rss_mb()
+
+    X = np.zeros((1, len(package['selected_features'])))
+    package['model'].predict(X)
+    print(json.dumps({
+        'seconds': seconds,
+        'anon_mb': anon_after - anon_before,
+        'file_mb': file_after - file_before,
+    }))
+
+
+def _measure(path, cache_dir, mmap_mode=None, legacy=False):
+    args = [sys.executable, '-m', 'benchmarks.bench_model_package', '--child', path,
+            '--cache-dir', cache_dir, '--mmap-mode', mmap_mode or 'none']
+    if legacy:
+        args.append('--legacy')
+    output = subprocess.run(args, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def make_package(model_name, n_rows, n_features, n_trees, seed=0):
+    """訓練一個測試用的模型套件。"""
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    features = [f"Feature {i}" for i in range(n_features)]
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=features)
+    labels = np.where(X.iloc[:, 0] + rng.normal(scale=0.5, size=n_rows) > 1.5, 'DDoS', 'Benign')
+    le = LabelEncoder()
+    y = le.fit_transform(labels)
+    scaler = StandardScaler().fit(X)
+    if model_name == 'rf':
+        model = RandomForestClassifier(n_estimators=n_trees, random_state=seed, n_jobs=-1)
+    else:
+        model = HistGradientBoostingClassifier(max_iter=n_trees, random_state=seed)
+    model.fit(scaler.transform(X), y)
+    return {'model': model, 'scaler': scaler, 'le': le, 'selected_features': features}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=('rf', 'hgb'), default='rf', help='模型種類')
+    parser.add_argument('--rows', type=int, default=200_000, help='訓練資料筆數')
+    parser.add_argument('--features', type=int, default=20, help='特徵數')
+    parser.add_argument('--trees', type=int, default=100, help='樹的數量 (HistGB 為迭代次數)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--mmap-mode', default='none', help=argparse.SUPPRESS)
+    parser.add_argument('--legacy', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, None if args.mmap_mode == 'none' else args.mmap_mode, args.legacy, args.cache_dir)
+        return
+
+    import joblib
+
+    package = make_package(args.model, args.rows, args.features, args.trees)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            'joblib (舊版)': os.path.join(tmp, 'legacy.joblib'),
+            'joblib compress=3 (舊版)': os.path.join(tmp, 'legacy_z.joblib'),
+            'mmap': os.path.join(tmp, 'package.joblib'),
+            'compact (lzma)': os.path.join(tmp, 'package.idspkg'),
+        }
+        joblib.dump(package, paths['joblib (舊版)'])
+        joblib.dump(package, paths['joblib compress=3 (舊版)'], compress=3)
+        save_model_package(package, paths['mmap'], mode='mmap')
+        save_model_package(package, paths['compact (lzma)'], mode='compact')
+
+        start = time.perf_counter()
+        header = read_package_header(paths['compact (lzma)'])
+        print(f"讀取標頭 (不載入模型): {(time.perf_counter() - start) * 1000:.2f} ms, "
+              f"{len(header['selected_features'])} 個特徵, 類別 {header['classes']}")
+
+        cases = [
+            ('joblib (舊版)', None, True),
+            ('joblib compress=3 (舊版)', None, True),
+            ('mmap', None, False),
+            ('mmap', 'r', False),
+            ('compact (lzma)', 'r', False),  # 第一次：包含解壓縮到快取
+            ('compact (lzma)', 'r', False),  # 第二次：直接使用快取
+        ]
+        rows = []
+        # compact 的解壓縮快取寫在暫存目錄內
+        cache_dir = os.path.join(tmp, 'cache')
+        for name, mmap_mode, legacy in cases:
+            result = _measure(paths[name], cache_dir, mmap_mode, legacy)
+            rows.append({
+                '格式': name,
+                'mmap_mode': mmap_mode or '-',
+                '檔案 MB': os.path.getsize(paths[name]) / 1e6,
+                '載入秒數': result['seconds'],
+                '私有記憶體 MB': result['anon_mb'],
+                '檔案對應 MB': result['file_mb'],
+            })
+
+    print(f"模型: {args.model}, {args.trees} trees, {args.features} 特徵, {args.rows:,} 筆訓練資料")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+
+if __name__ == '__main__':
+    main()
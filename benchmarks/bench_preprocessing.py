@@ -0,0 +1,106 @@
+"""
+預處理記憶體用量測試：比較原本的流程（`fit_transform` 產生 float64 陣列、再包成新的 DataFrame，
+訓練前以 `train_test_split` 複製特徵子集）與 `src.preprocessing`（float32 單一矩陣、列索引分割）的
+最高記憶體用量。每種流程在獨立的子行程中執行，互不影響峰值。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_preprocessing --rows 2000000 --features 78
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import current_rss_mb, peak_rss_mb
+
+
+def make_frame(n_rows, n_features, seed=0):
+    """產生與清理後資料相同型別的資料：int32/float32 特徵、類別型 Label 與 Timestamp。"""
+    rng = np.random.default_rng(seed)
+    columns = {'Timestamp': pd.date_range('2018-03-01', periods=n_rows, freq='s').to_numpy()}
+    for i in range(n_features):
+        if i % 2:
+            columns[f"f{i}"] = rng.integers(0, 1_000_000, n_rows, dtype=np.int32)
+        else:
+            columns[f"f{i}"] = rng.normal(size=n_rows).astype(np.float32)
+    columns['Label'] = pd.Categorical(rng.choice(['Benign', 'Bot', 'Infilteration'], n_rows, p=[0.8, 0.15, 0.05]))
+    return pd.DataFrame(columns)
+
+
+def _legacy(df, selected):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    X = df.drop(columns=['Label', 'Timestamp'])
+    y_encoded = LabelEncoder().fit_transform(df['Label'])
+    X_scaled = pd.DataFrame(StandardScaler().fit_transform(X), columns=X.columns)
+    return X_scaled, train_test_split(X_scaled[selected], y_encoded, test_size=0.2, random_state=42, stratify=y_encoded)
+
+
+def _lean(df, selected):
+    from src.preprocessing import preprocess_dataset, split_indices, take
+
+    preprocessed = preprocess_dataset(df)
+    X_scaled, y_encoded = preprocessed['X_scaled'], preprocessed['y_encoded']
+    train_rows, test_rows = split_indices(y_encoded)
+    return X_scaled, (take(X_scaled, train_rows, selected), take(X_scaled, test_rows, selected),
+                      y_encoded[train_rows], y_encoded[test_rows])
+
+
+def _run_mode(mode, n_rows, n_features):
+    df = make_frame(n_rows, n_features)
+    frame_mb = float(df.memory_usage(deep=True).sum()) / (1024 * 1024)
+    rss_before = current_rss_mb()
+    selected = list(df.columns[1:n_features // 2 + 1])
+    start = time.perf_counter()
+    X_scaled, split = (_legacy if mode == 'legacy' else _lean)(df, selected)
+    print(json.dumps({
+        'mode': mode,
+        'frame_mb': frame_mb,
+        'rss_before_mb': rss_before,
+        'rss_after_mb': current_rss_mb(),
+        'peak_rss_mb': peak_rss_mb(),
+        'matrix_mb': X_scaled.to_numpy().nbytes / (1024 * 1024),
+        'seconds': time.perf_counter() - start,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='資料筆數')
+    parser.add_argument('--features', type=int, default=78, help='特徵數')
+    parser.add_argument('--mode', choices=('legacy', 'lean'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        _run_mode(args.mode, args.rows, args.features)
+        return
+
+    rows = []
+    for mode in ('legacy', 'lean'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_preprocessing', '--mode', mode,
+             '--rows', str(args.rows), '--features', str(args.features)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        rows.append({
+            '流程': '原本 (float64 + 複製)' if mode == 'legacy' else 'src.preprocessing (float32 + 索引)',
+            '特徵矩陣 (MB)': result['matrix_mb'],
+            '預處理前 RSS (MB)': result['rss_before_mb'],
+            '預處理後 RSS (MB)': result['rss_after_mb'],
+            '最高 RSS (MB)': result['peak_rss_mb'],
+            '峰值增加 (MB)': result['peak_rss_mb'] - result['rss_before_mb'],
+            '最高 RSS / 資料大小': result['peak_rss_mb'] / result['frame_mb'],
+            '耗時 (秒)': result['seconds'],
+        })
+    print(f"資料: {args.rows:,} 筆 x {args.features} 個特徵，清理後資料 {result['frame_mb']:,.0f} MB")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == '__main__':
+    main()
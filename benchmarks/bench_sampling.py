@@ -0,0 +1,95 @@
+"""
+訓練資料抽樣效能測試：比較以完整訓練集與 `src.sampling.downsample`（移除重複列 + 每類別上限）縮減後的
+訓練集，在隨機森林訓練與基因演算法單次適應度評估（3 折交叉驗證）上的耗時，以及在同一份未抽樣的測試集上
+各類別的召回率。
+
+資料模擬流量資料的特性：大量彼此重複的正常流量與少數的攻擊類別。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_sampling --rows 500000 --cap 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import preprocess_dataset, split_indices, take
+from src.sampling import downsample
+
+
+def make_flows(n_rows, n_features, duplicate_fraction=0.5, seed=0):
+    """產生類別不平衡、且多數正常流量重複出現的資料。"""
+    from sklearn.datasets import make_classification
+
+    n_unique = int(n_rows * (1 - duplicate_fraction))
+    X, y = make_classification(
+        n_samples=n_unique, n_features=n_features, n_informative=n_features // 2, n_classes=4,
+        n_clusters_per_class=2, weights=[0.9, 0.06, 0.03, 0.01], flip_y=0.0, random_state=seed,
+    )
+    # 重複的列只來自正常流量
+    rng = np.random.default_rng(seed)
+    benign = np.flatnonzero(y == 0)
+    repeat = rng.choice(benign, n_rows - n_unique)
+    order = rng.permutation(n_rows)
+    X = np.vstack([X, X[repeat]])[order].astype(np.float32)
+    y = np.concatenate([y, y[repeat]])[order]
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(n_features)])
+    df['Label'] = pd.Categorical(np.array(['Benign', 'DoS', 'Bot', 'Infilteration'])[y])
+    return df
+
+
+def _evaluate(name, X, y, train_rows, test_rows, le, n_estimators, extra_seconds=0.0):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import recall_score
+    from sklearn.model_selection import cross_val_score
+
+    X_train, y_train = take(X, train_rows), y[train_rows]
+    start = time.perf_counter()
+    cross_val_score(RandomForestClassifier(n_estimators=20, random_state=42, n_jobs=-1), X_train, y_train, cv=3)
+    fitness_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=-1).fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    recall = recall_score(y[test_rows], model.predict(take(X, test_rows)), average=None, labels=range(len(le.classes_)))
+    return {
+        '訓練集': name,
+        '訓練筆數': len(train_rows),
+        '抽樣耗時 (秒)': extra_seconds,
+        '單次適應度評估 (秒)': fitness_seconds,
+        '隨機森林訓練 (秒)': train_seconds,
+        **{f"召回率 {label}": value for label, value in zip(le.classes_, recall)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000, help='資料筆數')
+    parser.add_argument('--features', type=int, default=40, help='特徵數')
+    parser.add_argument('--cap', type=int, default=20_000, help='每個類別的筆數上限')
+    parser.add_argument('--trees', type=int, default=100, help='隨機森林的樹數量')
+    args = parser.parse_args()
+
+    preprocessed = preprocess_dataset(make_flows(args.rows, args.features), drop_columns=())
+    X, y, le = preprocessed['X_scaled'], preprocessed['y_encoded'], preprocessed['le']
+    train_rows, test_rows = split_indices(y)
+    kept, report = downsample(X, y, class_cap=args.cap, rows=train_rows)
+
+    rows = [
+        _evaluate('完整', X, y, train_rows, test_rows, le, args.trees),
+        _evaluate(f"去除重複 + 每類別 {args.cap:,} 筆", X, y, kept, test_rows, le, args.trees, report['seconds']),
+    ]
+    print(f"資料: {args.rows:,} 筆 x {args.features} 個特徵，訓練集重複列 {report['duplicates']:,} 筆")
+    print(pd.DataFrame([{
+        '類別': le.classes_[item['class']], '原始筆數': item['before'], '去除重複後': item['unique'], '抽樣後': item['after'],
+    } for item in report['per_class']]).to_string(index=False))
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.4f}"))
+    full, sampled = rows
+    total_full = full['單次適應度評估 (秒)'] + full['隨機森林訓練 (秒)']
+    total_sampled = sampled['抽樣耗時 (秒)'] + sampled['單次適應度評估 (秒)'] + sampled['隨機森林訓練 (秒)']
+    print(f"耗時 {total_full:,.1f} → {total_sampled:,.1f} 秒 ({total_full / total_sampled:,.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
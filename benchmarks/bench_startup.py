@@ -0,0 +1,54 @@
+"""
+啟動時間測試：在全新的 Python 行程中匯入應用程式的介面模組，量測冷啟動的匯入耗時，
+並列出啟動時已被載入的重量級套件（理想情況下 shap、matplotlib、scikit-learn 等應在實際使用時才載入）。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+HEAVY_MODULES = ('shap', 'matplotlib', 'seaborn', 'sklearn', 'deap', 'joblib', 'requests', 'numba')
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+import ui.sidebar, ui.tab_dashboard, ui.tab_single_prediction, ui.tab_batch_prediction
+done = time.perf_counter()
+print(json.dumps({{
+    "streamlit": streamlit_done - start,
+    "ui": done - streamlit_done,
+    "total": done - start,
+    "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_once():
+    """在新的行程中量測一次匯入耗時。"""
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='重複量測次數')
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    for key in ('streamlit', 'ui', 'total'):
+        values = np.array([run[key] for run in runs])
+        print(f"{key:>9}: median {np.median(values):.2f} s, min {values.min():.2f} s")
+    print("啟動時已載入的重量級套件:", ', '.join(runs[-1]['heavy']) or '(無)')
+
+
+if __name__ == '__main__':
+    main()
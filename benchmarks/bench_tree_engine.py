@@ -0,0 +1,83 @@
+"""
+扁平陣列推論引擎效能測試：比較 scikit-learn `predict` 與 `src.tree_engine` 在 1、100 與 100,000 筆資料時的延遲，
+並確認兩者的預測結果（含機率）完全相同。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_tree_engine --trees 100
+    python -m benchmarks.bench_tree_engine --model hgb
+    python -m benchmarks.bench_tree_engine --no-numba --force-engine
+
+超過 `src.tree_engine.NUMBA_MAX_ROWS` / `NUMPY_MAX_ROWS` 筆的批次預設交由 scikit-learn 處理。
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_model_package import make_package
+from src import tree_engine
+from src.tree_engine import FlatTreeEngine
+
+
+def _latency_ms(predict, X, repeat):
+    """回傳多次呼叫的中位數延遲（毫秒）。"""
+    predict(X)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=('rf', 'hgb'), default='rf', help='模型種類')
+    parser.add_argument('--rows', type=int, default=100_000, help='訓練資料筆數')
+    parser.add_argument('--features', type=int, default=20, help='特徵數')
+    parser.add_argument('--trees', type=int, default=100, help='樹的數量 (HistGB 為迭代次數)')
+    parser.add_argument('--repeat', type=int, default=50, help='小批次的重複次數')
+    parser.add_argument('--model-jobs', type=int, default=1, help='scikit-learn 預測使用的執行緒數')
+    parser.add_argument('--no-numba', action='store_true', help='即使已安裝 numba 也只使用 NumPy 向量化走訪')
+    parser.add_argument('--force-engine', action='store_true', help='大批次也不轉交 scikit-learn，量測引擎本身的走訪')
+    args = parser.parse_args()
+
+    if args.force_engine:
+        tree_engine.NUMBA_MAX_ROWS = tree_engine.NUMPY_MAX_ROWS = float('inf')
+
+    package = make_package(args.model, args.rows, args.features, args.trees)
+    model = package['model']
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = args.model_jobs
+
+    start = time.perf_counter()
+    engine = FlatTreeEngine.from_model(model, use_numba=not args.no_numba)
+    print(f"模型: {args.model}, {engine.n_trees} 棵樹, 最大深度 {engine.max_depth}, "
+          f"節點陣列 {engine.nbytes / 1e6:,.1f} MB, 匯出耗時 {time.perf_counter() - start:.2f} 秒, "
+          f"走訪方式: {engine.backend}")
+
+    rng = np.random.default_rng(1)
+    n_features = len(package['selected_features'])
+    rows = []
+    for n_rows in (1, 100, 100_000):
+        # 與 make_package 的訓練資料相同，以 NumPy 陣列輸入
+        X = rng.normal(size=(n_rows, n_features))
+        repeat = args.repeat if n_rows <= 100 else 3
+        identical = (np.array_equal(model.predict(X), engine.predict(X))
+                     and np.array_equal(model.predict_proba(X), engine.predict_proba(X)))
+        sklearn_ms = _latency_ms(model.predict, X, repeat)
+        engine_ms = _latency_ms(engine.predict, X, repeat)
+        rows.append({
+            '筆數': n_rows,
+            'scikit-learn (ms)': sklearn_ms,
+            '扁平陣列 (ms)': engine_ms,
+            '每筆 (µs)': engine_ms * 1000 / n_rows,
+            '加速倍數': sklearn_ms / engine_ms,
+            '結果相同': identical,
+        })
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+
+if __name__ == '__main__':
+    main()
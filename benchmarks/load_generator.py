@@ -0,0 +1,86 @@
+"""
+推論服務壓力測試：以多個並行連線對本機 `src.serving` 服務送出流量，回報用戶端量測的吞吐量與延遲，
+並取得服務端的 /metrics（含 micro-batching 後的平均批次大小與佇列深度）。
+
+執行方式（先啟動服務，再於專案根目錄執行）：
+    python -m src.serving ids_model_package.joblib --port 8765
+    python -m benchmarks.load_generator --url http://127.0.0.1:8765 --concurrency 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+def _request(conn, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"HTTP {response.status}: {data[:200]!r}")
+    return json.loads(data)
+
+
+def _worker(url, features, flows_per_request, deadline, latencies, errors, seed):
+    rng = np.random.default_rng(seed)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    while time.perf_counter() < deadline:
+        values = rng.normal(size=(flows_per_request, len(features)))
+        flows = [dict(zip(features, row.tolist())) for row in values]
+        payload = {"flow": flows[0]} if flows_per_request == 1 else {"flows": flows}
+        start = time.perf_counter()
+        try:
+            _request(conn, 'POST', '/predict', payload)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help='推論服務位址')
+    parser.add_argument('--concurrency', type=int, default=16, help='並行連線數')
+    parser.add_argument('--duration', type=float, default=10.0, help='測試秒數')
+    parser.add_argument('--flows-per-request', type=int, default=1, help='每個請求包含的流量筆數')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    features = _request(conn, 'GET', '/health')['features']
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_worker, args=(url, features, args.flows_per_request, deadline, latencies, errors, i))
+        for i in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    print(f"concurrency={args.concurrency} flows/request={args.flows_per_request} duration={elapsed:.1f}s")
+    if errors:
+        print("errors:", errors[:3])
+    print(f"requests: {len(latencies):,} ok, {len(errors):,} errors, "
+          f"{len(latencies) / elapsed:,.0f} req/s, {len(latencies) * args.flows_per_request / elapsed:,.0f} flows/s")
+    if latencies_ms.size:
+        print(f"client latency: p50 {np.percentile(latencies_ms, 50):.2f} ms, p99 {np.percentile(latencies_ms, 99):.2f} ms")
+    print("server metrics:", json.dumps(_request(conn, 'GET', '/metrics'), ensure_ascii=False))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+此模組提供不需瀏覽器的批次評分入口，可作為函式庫匯入或從命令列執行。
+
+載入側邊欄「💾 儲存模型」產生的模型套件，將一個或多個流量 CSV 以與介面相同的欄位映射、
+標準化與預測流程分塊評分，並將結果寫入 CSV。本模組刻意不匯入 streamlit、shap 與 matplotlib，以加快啟動。
+
+命令列範例（於專案根目錄）：
+    python -m src.batch_scoring ids_model_package.joblib data/*.csv --output-dir results --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.inference import ATTACK_TEXT, UNMAPPED, score_csv_stream
+from src.model_package import load_model_package
+
+# 工作行程內的模型套件，由 _init_worker 在行程啟動時載入一次
+_WORKER_STATE = {}
+
+
+def default_column_mapping(columns, selected_features):
+    """
+    以欄位名稱比對建立預設映射（忽略前後空白），找不到的特徵標記為 UNMAPPED。
+
+    Args:
+        columns (iterable): 輸入檔案的欄位名稱。
+        selected_features (list): 模型使用的特徵。
+
+    Returns:
+        dict: 模型特徵 -> 輸入檔案欄位名稱。
+    """
+    by_name = {str(col).strip(): col for col in columns}
+    return {feature: by_name.get(feature, UNMAPPED) for feature in selected_features}
+
+
+def output_path_for(input_path, output_dir=None):
+    """結果檔案路徑：`<輸出目錄>/<原檔名>.scored.csv`，未指定輸出目錄時與輸入檔放在一起。"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    directory = output_dir if output_dir else os.path.dirname(os.path.abspath(input_path))
+    return os.path.join(directory, f"{stem}.scored.csv")
+
+
+def score_file(package, input_path, output_path, column_mapping=None, chunksize=100_000):
+    """
+    對單一 CSV 檔案進行分塊評分。
+
+    Args:
+        package (dict): load_model_package 載入的模型套件。
+        input_path (str): 輸入 CSV 路徑。
+        output_path (str): 結果 CSV 路徑。
+        column_mapping (dict, optional): 模型特徵 -> 輸入欄位名稱；未提供時依欄位名稱自動比對。
+        chunksize (int): 每個區塊的列數。
+
+    Returns:
+        dict: 檔案評分統計，包含 rows_read、rows_scored、attacks、unmapped、seconds 與 rows_per_sec。
+    """
+    selected_features = package['selected_features']
+    if column_mapping is None:
+        columns = pd.read_csv(input_path, nrows=0).columns
+        column_mapping = default_column_mapping(columns, selected_features)
+
+    summary = score_csv_stream(
+        input_path, column_mapping, package['model'], package['scaler'], package['le'],
+        selected_features, output_path, chunksize=chunksize, preview_rows=0, attack_rows=0,
+    )
+    seconds = summary['seconds']
+    return {
+        "input": input_path,
+        "output": output_path,
+        "rows_read": summary['rows_read'],
+        "rows_scored": summary['rows_scored'],
+        "attacks": summary['result_counts'].get(ATTACK_TEXT, 0),
+        "label_counts": summary['label_counts'],
+        "unmapped": [feature for feature, col in column_mapping.items() if col == UNMAPPED],
+        "seconds": seconds,
+        "rows_per_sec": summary['rows_read'] / seconds if seconds > 0 else float('nan'),
+    }
+
+
+def _init_worker(package_path):
+    # 版本化套件以唯讀記憶體映射載入，各工作行程共用同一份檔案分頁
+    package = load_model_package(package_path, mmap_mode='r')
+    # 平行度已由行程池提供，模型本身只使用一個核心以免超額訂閱
+    if hasattr(package['model'], 'n_jobs'):
+        package['model'].n_jobs = 1
+    _WORKER_STATE['package'] = package
+
+
+def _score_in_worker(task):
+    input_path, output_path, column_mapping, chunksize = task
+    return score_file(_WORKER_STATE['package'], input_path, output_path, column_mapping, chunksize)
+
+
+def score_files(package_path, input_paths, output_dir=None, column_mapping=None, chunksize=100_000, workers=1):
+    """
+    對多個 CSV 檔案進行評分；`workers` 大於 1 時以行程池平行處理不同檔案。
+
+    Args:
+        package_path (str): 模型套件路徑。
+        input_paths (list): 輸入 CSV 路徑。
+        output_dir (str, optional): 輸出目錄，未指定時結果與輸入檔放在一起。
+        column_mapping (dict, optional): 所有檔案共用的欄位映射；未提供時各檔依欄位名稱自動比對。
+        chunksize (int): 每個區塊的列數。
+        workers (int): 平行處理的行程數。
+
+    Yields:
+        dict: 每個檔案的評分統計，順序與 `input_paths` 相同。
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tasks = [(path, output_path_for(path, output_dir), column_mapping, chunksize) for path in input_paths]
+
+    if workers <= 1 or len(tasks) <= 1:
+        package = load_model_package(package_path)
+        for input_path, output_path, mapping, size in tasks:
+            yield score_file(package, input_path, output_path, mapping, size)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(package_path,)) as pool:
+        yield from pool.map(_score_in_worker, tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.batch_scoring',
+        description="以已儲存的模型套件對流量 CSV 進行批次評分。",
+    )
+    parser.add_argument('package', help="模型套件路徑 (例如 ids_model_package.joblib)")
+    parser.add_argument('inputs', nargs='+', help="待評分的 CSV 檔案")
+    parser.add_argument('--output-dir', help="結果輸出目錄，預設與輸入檔相同")
+    parser.add_argument('--mapping', help="欄位映射 JSON 檔：{模型特徵: 輸入欄位}，預設依欄位名稱自動比對")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="每個區塊的列數")
+    parser.add_argument('--workers', type=int, default=1, help="平行處理檔案的行程數")
+    parser.add_argument('--report', help="將各檔案的評分統計另存為 JSON")
+    args = parser.parse_args(argv)
+
+    column_mapping = None
+    if args.mapping:
+        with open(args.mapping, encoding='utf-8') as f:
+            column_mapping = json.load(f)
+
+    start = time.perf_counter()
+    reports = []
+    for report in score_files(args.package, args.inputs, args.output_dir, column_mapping,
+                              args.chunksize, args.workers):
+        reports.append(report)
+        print(
+            f"{report['input']}: {report['rows_scored']:,}/{report['rows_read']:,} 筆, "
+            f"攻擊 {report['attacks']:,} 筆, {report['seconds']:.1f} 秒 "
+            f"({report['rows_per_sec']:,.0f} 筆/秒) -> {report['output']}"
+        )
+        if report['unmapped']:
+            print(f"  警告：以下特徵在輸入檔中找不到，以 0 填補：{', '.join(report['unmapped'])}", file=sys.stderr)
+
+    total_rows = sum(report['rows_read'] for report in reports)
+    elapsed = time.perf_counter() - start
+    print(f"總計 {len(reports)} 個檔案、{total_rows:,} 筆，耗時 {elapsed:.1f} 秒 ({total_rows / max(elapsed, 1e-9):,.0f} 筆/秒)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,36 @@
 """此模組負責資料的讀取、解析與初步清理。"""
+import hashlib
+import json
+import os
+import time
+
 import pandas as pd
 import numpy as np
 import streamlit as st
-import os
+from pyarrow import feather
+
+from src.dataset_profile import PROFILE_VERSION, DatasetProfiler, profile_frame
+from src.profiling import peak_rss_mb
+
+LABEL_COLUMN = 'Label'
+TIMESTAMP_COLUMN = 'Timestamp'
+# CSE-CIC-IDS2018 的時間格式為 日/月/年
+TIMESTAMP_FORMAT = '%d/%m/%Y %H:%M:%S'
+# 清理後資料的磁碟快取目錄；清理規則或資料結構改變時遞增 CLEANING_VERSION 讓舊快取失效
+CACHE_DIR = os.path.join('data', '.cache')
+CLEANING_VERSION = 1
+# 以整數記錄的計數型特徵，其餘特徵一律存成 float32
+INT32_FEATURES = frozenset({
+    'Dst Port', 'Protocol', 'Flow Duration',
+    'Tot Fwd Pkts', 'Tot Bwd Pkts', 'TotLen Fwd Pkts', 'TotLen Bwd Pkts',
+    'Fwd Pkt Len Max', 'Fwd Pkt Len Min', 'Bwd Pkt Len Max', 'Bwd Pkt Len Min',
+    'Pkt Len Min', 'Pkt Len Max', 'Fwd Header Len', 'Bwd Header Len',
+    'Fwd PSH Flags', 'Bwd PSH Flags', 'Fwd URG Flags', 'Bwd URG Flags',
+    'FIN Flag Cnt', 'SYN Flag Cnt', 'RST Flag Cnt', 'PSH Flag Cnt',
+    'ACK Flag Cnt', 'URG Flag Cnt', 'CWE Flag Count', 'ECE Flag Cnt',
+    'Subflow Fwd Pkts', 'Subflow Fwd Byts', 'Subflow Bwd Pkts', 'Subflow Bwd Byts',
+    'Init Fwd Win Byts', 'Init Bwd Win Byts', 'Fwd Act Data Pkts', 'Fwd Seg Size Min',
+})
 
 @st.cache_data
 def load_data(file_path):
@@ -51,4 +79,366 @@ def clean_data(df):
 
     cleaned_rows = len(df)
     st.write(f"清理完成，共移除 {original_rows - cleaned_rows} 筆資料。剩餘 {cleaned_rows} 筆有效資料。")
-    return df
\ No newline at end of file
+    return df
+
+
+def _parse_timestamps(raw):
+    """以固定格式解析時間戳記，格式不符的值再以日在前的寬鬆模式解析一次。"""
+    parsed = pd.to_datetime(raw, format=TIMESTAMP_FORMAT, errors='coerce')
+    retry = parsed.isna() & raw.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(raw[retry], format='mixed', dayfirst=True, errors='coerce')
+    return parsed
+
+
+def _clean_chunk(chunk, feature_columns):
+    """
+    將單一區塊轉為精簡型別並移除無效列。
+
+    特徵轉為數值後，任何含 NaN/Infinity 的列（包含檔案中重複出現的標頭列）都會被移除。
+
+    Returns:
+        tuple: (清理後的區塊, 被移除的列數)。
+    """
+    values = np.column_stack([
+        pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+        for col in feature_columns
+    ])
+    timestamps = _parse_timestamps(chunk[TIMESTAMP_COLUMN])
+    valid = np.isfinite(values).all(axis=1) & timestamps.notna().to_numpy() & chunk[LABEL_COLUMN].notna().to_numpy()
+
+    feature_index = {col: i for i, col in enumerate(feature_columns)}
+    columns = {}
+    for col in chunk.columns:
+        if col == TIMESTAMP_COLUMN:
+            columns[col] = timestamps.to_numpy()[valid]
+        elif col == LABEL_COLUMN:
+            columns[col] = pd.Categorical(chunk[col].to_numpy()[valid])
+        else:
+            column = values[valid, feature_index[col]]
+            columns[col] = column.astype(np.int32 if col in INT32_FEATURES and _fits_int32(column) else np.float32)
+    return pd.DataFrame(columns), int((~valid).sum())
+
+
+def _fits_int32(column):
+    return not column.size or (
+        np.array_equal(column, np.trunc(column)) and np.abs(column).max() < np.iinfo(np.int32).max
+    )
+
+
+def load_clean_data(file_path, chunksize=200_000, columns=None):
+    """
+    以分塊串流方式載入並清理 CSV 檔案，取代 `load_data` + `clean_data` 的整檔讀取流程。
+
+    每個區塊在讀入後立即轉為精簡型別（float32/int32 特徵、類別型 Label、解析後的 Timestamp）
+    並移除無效列，因此記憶體中同時只會有一個原始區塊，不會產生整份資料的多份副本。
+    資料集摘要（見 `src.dataset_profile`）在同一次串流中逐區塊累計。
+
+    Args:
+        file_path (str): CSV 檔案的路徑。
+        chunksize (int): 每個區塊的列數。
+        columns (list, optional): 只讀取這些欄位（需包含 Label 與 Timestamp），None 代表全部。
+
+    Returns:
+        tuple: (清理後的 DataFrame, 載入統計 dict)；統計中的 `profile` 為資料集摘要，
+            `header_rows` 為檔案中重複出現的標頭列數（已計入 `rows_dropped`）。
+            檔案不存在或讀取失敗時回傳 (None, None)。
+    """
+    if not os.path.exists(file_path):
+        st.error(f"錯誤：找不到檔案 {file_path}")
+        return None, None
+
+    start = time.perf_counter()
+    rows_read = 0
+    rows_dropped = 0
+    header_rows = 0
+    chunks = []
+    profiler = DatasetProfiler(label_column=LABEL_COLUMN)
+    try:
+        usecols = None
+        if columns is not None:
+            wanted = frozenset(columns)
+            usecols = lambda col: col.strip() in wanted
+        reader = pd.read_csv(file_path, chunksize=chunksize, low_memory=False, skipinitialspace=True, usecols=usecols)
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            feature_columns = chunk.columns.drop([LABEL_COLUMN, TIMESTAMP_COLUMN])
+            rows_read += len(chunk)
+            # 合併多個檔案產生的 CSV 常在中間重複出現標頭列，清理時會一併移除，這裡另外計數
+            header_rows += int((chunk[LABEL_COLUMN] == LABEL_COLUMN).sum())
+            cleaned, dropped = _clean_chunk(chunk, feature_columns)
+            rows_dropped += dropped
+            profiler.update(cleaned)
+            chunks.append(cleaned)
+            del chunk
+    except Exception as e:
+        st.error(f"讀取檔案時發生錯誤：{e}")
+        return None, None
+
+    if not chunks:
+        st.error(f"錯誤：檔案 {file_path} 中沒有任何資料。")
+        return None, None
+
+    # 各區塊的 Label 類別集合不同，需先合併類別，否則 concat 會退化成 object 欄位
+    label_position = chunks[0].columns.get_loc(LABEL_COLUMN)
+    labels = pd.api.types.union_categoricals([chunk.pop(LABEL_COLUMN).array for chunk in chunks])
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+    df.insert(label_position, LABEL_COLUMN, labels)
+    # 少數整數欄位若在某些區塊含有小數，合併後會變成 float64，統一降為 float32
+    for col in df.columns[df.dtypes == np.float64]:
+        df[col] = df[col].astype(np.float32)
+
+    seconds = time.perf_counter() - start
+    report = {
+        "rows_read": rows_read,
+        "rows_kept": len(df),
+        "rows_dropped": rows_dropped,
+        "header_rows": header_rows,
+        "seconds": seconds,
+        "rows_per_sec": rows_read / seconds if seconds > 0 else float('nan'),
+        "peak_rss_mb": peak_rss_mb(),
+        "frame_mb": float(df.memory_usage(deep=True).sum()) / (1024 * 1024),
+        "profile": profiler.result(df),
+    }
+    return df, report
+
+
+
+def file_content_hash(file_path, block_size=8 * 1024 * 1024) -> str:
+    """
+    計算檔案內容的雜湊值（BLAKE2b）。
+
+    Args:
+        file_path (str): 檔案路徑。
+        block_size (int): 每次讀取的位元組數。
+
+    Returns:
+        str: 十六進位雜湊字串。
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, 'manifest.json')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _source_hash(file_path, cache_dir):
+    """
+    取得來源檔案的內容雜湊；檔案大小與修改時間未變時沿用清單中記錄的雜湊，避免重新讀取整個檔案。
+    """
+    stat = os.stat(file_path)
+    source_key = os.path.abspath(file_path)
+    manifest = _read_manifest(cache_dir)
+    entry = manifest.get(source_key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['content_hash']
+
+    content_hash = file_content_hash(file_path)
+    # 重新讀取清單再寫入，保留其他行程（平行建立快取時）在計算雜湊期間加入的項目
+    manifest = _read_manifest(cache_dir)
+    manifest[source_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'content_hash': content_hash}
+    _write_manifest(cache_dir, manifest)
+    return content_hash
+
+
+def _cleaning_params(columns=None):
+    """影響清理結果的所有參數，納入快取鍵。"""
+    params = {
+        'version': CLEANING_VERSION,
+        'timestamp_format': TIMESTAMP_FORMAT,
+        'int32_features': sorted(INT32_FEATURES),
+    }
+    # 只在指定欄位時加入，讀取全部欄位的快取鍵維持不變
+    if columns is not None:
+        params['columns'] = list(columns)
+    return params
+
+
+def clean_data_cache_key(file_path, cache_dir=CACHE_DIR, columns=None):
+    """
+    清理後資料的快取鍵：由來源檔案的內容雜湊與清理參數組成，內容相同的資料集得到相同的鍵。
+
+    Args:
+        file_path (str): CSV 檔案的路徑。
+        cache_dir (str): 快取目錄（內容雜湊清單存放於此）。
+        columns (list, optional): 只讀取的欄位，None 代表全部。
+
+    Returns:
+        str: 十六進位的快取鍵。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    params = json.dumps(_cleaning_params(columns), sort_keys=True)
+    return hashlib.blake2b(
+        (_source_hash(file_path, cache_dir) + params).encode('utf-8'), digest_size=10
+    ).hexdigest()
+
+
+def _read_profile(profile_path, df):
+    """讀取快取的資料集摘要；不存在或版本不符時重新計算並寫回。"""
+    try:
+        profile = pd.read_pickle(profile_path)
+        if profile.get('version') == PROFILE_VERSION:
+            return profile
+    except Exception:
+        pass
+    profile = profile_frame(df, label_column=LABEL_COLUMN)
+    try:
+        pd.to_pickle(profile, profile_path)
+    except OSError:
+        pass
+    return profile
+
+
+def _cache_prefix(file_path, columns=None):
+    """
+    以檔名、來源路徑與讀取的欄位組成快取檔名的前綴，同一來源、同一組欄位重建快取時據此清除舊檔。
+
+    欄位納入前綴，讓單檔載入（全部欄位）與多檔合併（協調後的欄位）的快取可以並存，不會互相刪除。
+    """
+    source_id = hashlib.blake2b(os.path.abspath(file_path).encode('utf-8'), digest_size=4).hexdigest()
+    columns_id = 'all' if columns is None else hashlib.blake2b(
+        json.dumps(list(columns)).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{os.path.splitext(os.path.basename(file_path))[0]}-{source_id}-{columns_id}-"
+
+
+def clean_data_cache_path(file_path, cache_dir=CACHE_DIR, columns=None):
+    """
+    清理後資料的快取檔 (Feather) 路徑；載入統計與資料集摘要分別存放在同名的 `.json` 與 `.profile.pkl`。
+
+    Args:
+        file_path (str): CSV 檔案的路徑。
+        cache_dir (str): 快取目錄。
+        columns (list, optional): 只讀取的欄位，None 代表全部。
+
+    Returns:
+        str: 快取檔路徑（檔案不一定已存在）。
+    """
+    cache_key = clean_data_cache_key(file_path, cache_dir, columns)
+    return os.path.join(cache_dir, f"{_cache_prefix(file_path, columns)}{cache_key}.feather")
+
+
+def is_clean_data_cached(file_path, cache_dir=CACHE_DIR, columns=None):
+    """
+    不讀取來源檔案內容，判斷清理後資料的快取是否已存在（來源檔案的大小與修改時間需與清單記錄相同）。
+    """
+    stat = os.stat(file_path)
+    entry = _read_manifest(cache_dir).get(os.path.abspath(file_path))
+    if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+        return False
+    cache_path = clean_data_cache_path(file_path, cache_dir, columns)
+    return os.path.exists(cache_path) and os.path.exists(cache_path + '.json')
+
+
+def _write_cache(df, report, cache_path, prefix, cache_dir):
+    """寫入清理後資料、載入統計與摘要，並移除同一來源、同一組欄位的舊版快取。"""
+    try:
+        # 不壓縮，讓之後的讀取可以直接記憶體映射
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, cache_path)
+        pd.to_pickle(report["profile"], cache_path + '.profile.pkl')
+        with open(cache_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({k: v for k, v in report.items() if k not in ("cache_hit", "profile")}, f)
+        # 移除同一來源、同一組欄位的舊版快取
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and not name.startswith(os.path.basename(cache_path)):
+                os.remove(os.path.join(cache_dir, name))
+    except Exception as e:
+        st.warning(f"無法寫入資料快取：{e}")
+
+
+def build_clean_data_cache(file_path, cache_dir=CACHE_DIR, chunksize=200_000, columns=None):
+    """
+    確保檔案的清理後資料快取存在，但不將資料留在記憶體中（供多檔平行建立快取使用）。
+
+    Args:
+        file_path (str): CSV 檔案的路徑。
+        cache_dir (str): 快取目錄。
+        chunksize (int): 未命中快取時，串流載入的區塊列數。
+        columns (list, optional): 只讀取的欄位，None 代表全部。
+
+    Returns:
+        dict or None: 載入統計（不含摘要），並加上 `cache_path` 與 `cache_hit`；讀取失敗時為 None。
+    """
+    cache_path = clean_data_cache_path(file_path, cache_dir, columns)
+    report_path = cache_path + '.json'
+    if os.path.exists(cache_path) and os.path.exists(report_path):
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+        return {**report, "cache_path": cache_path, "cache_hit": True}
+
+    df, report = load_clean_data(file_path, chunksize=chunksize, columns=columns)
+    if df is None:
+        return None
+    _write_cache(df, report, cache_path, _cache_prefix(file_path, columns), cache_dir)
+    report.pop("profile")
+    return {**report, "cache_path": cache_path, "cache_hit": False}
+
+
+def load_cached_clean_data(file_path, cache_dir=CACHE_DIR, chunksize=200_000):
+    """
+    載入清理後的資料，並以欄式檔案 (Feather/Arrow IPC) 持久化快取。
+
+    快取鍵由來源檔案的內容雜湊與清理參數組成，因此不同的伺服器行程或工作階段都能共用；
+    來源檔案內容改變時會自動重建快取。命中快取時以記憶體映射 (memory map) 方式讀取，
+    不需重新解析 CSV 與執行清理。
+
+    Args:
+        file_path (str): CSV 檔案的路徑。
+        cache_dir (str): 快取目錄。
+        chunksize (int): 未命中快取時，串流載入的區塊列數。
+
+    Returns:
+        tuple: (清理後的 DataFrame, 載入統計 dict)；統計中的 `cache_hit` 標示是否命中快取，
+            `profile` 為與快取一起保存的資料集摘要。檔案不存在或讀取失敗時回傳 (None, None)。
+    """
+    if not os.path.exists(file_path):
+        st.error(f"錯誤：找不到檔案 {file_path}")
+        return None, None
+
+    start = time.perf_counter()
+    cache_path = clean_data_cache_path(file_path, cache_dir)
+    report_path = cache_path + '.json'
+    profile_path = cache_path + '.profile.pkl'
+
+    if os.path.exists(cache_path) and os.path.exists(report_path):
+        try:
+            table = feather.read_table(cache_path, memory_map=True)
+            df = table.to_pandas(split_blocks=True)
+            with open(report_path, encoding='utf-8') as f:
+                report = json.load(f)
+            seconds = time.perf_counter() - start
+            report.update({
+                "cache_hit": True,
+                "seconds": seconds,
+                "rows_per_sec": report["rows_read"] / seconds if seconds > 0 else float('nan'),
+                "peak_rss_mb": peak_rss_mb(),
+                "profile": _read_profile(profile_path, df),
+            })
+            return df, report
+        except Exception as e:
+            st.warning(f"讀取資料快取失敗，將重新建立：{e}")
+
+    df, report = load_clean_data(file_path, chunksize=chunksize)
+    if df is None:
+        return None, None
+    report["cache_hit"] = False
+    _write_cache(df, report, cache_path, _cache_prefix(file_path), cache_dir)
+    return df, report
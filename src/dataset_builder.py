@@ -0,0 +1,268 @@
+"""
+此模組負責將多個 CSV 檔案（例如 CSE-CIC-IDS2018 的多個單日檔案、或逐小時擷取的流量）合併成一份資料集。
+
+- 來源可以是單一檔案、目錄（其中所有 `.csv`）、萬用字元 (glob) 或路徑清單。
+- 先只讀取每個檔案的標頭來協調欄位：保留所有檔案共有的欄位（順序以第一個檔案為準），
+  並排除只用於識別連線的欄位（IP、連線 ID 等），各檔案被捨棄的欄位會列在統計中。
+- 各檔案以行程池平行解析與清理（與單檔載入相同的分塊串流流程），結果寫入各自的清理後資料快取；
+  檔案中重複出現的標頭列在清理時移除。
+- 再逐檔將快取依統一的欄位型別寫入一份合併的 Feather (Arrow IPC) 檔，同時只有一個檔案的資料在記憶體中；
+  之後載入相同的檔案組合時直接以記憶體映射讀取。
+
+不依賴 Streamlit 的介面元件，可從命令列執行：
+    python -m src.dataset_builder "data/*.csv" --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from src.data_loader import (
+    CACHE_DIR, LABEL_COLUMN, TIMESTAMP_COLUMN, _read_profile, build_clean_data_cache, is_clean_data_cached,
+)
+from src.dataset_profile import profile_frame
+from src.profiling import peak_rss_mb
+
+# 合併檔的格式改變時遞增，讓舊的合併檔失效
+COMBINED_VERSION = 1
+# 只用於識別連線、不作為特徵的欄位（例如 CSE-CIC-IDS2018 2018-02-20 的檔案多出這些欄位）
+IDENTIFIER_COLUMNS = frozenset({'Flow ID', 'Src IP', 'Src Port', 'Dst IP'})
+
+
+def resolve_sources(source):
+    """
+    將資料來源展開為排序後的 CSV 檔案清單。
+
+    Args:
+        source (str or list): 檔案、目錄、萬用字元，或以上的清單。
+
+    Returns:
+        list: 存在的 CSV 檔案路徑（不重複）。
+    """
+    if isinstance(source, (list, tuple)):
+        paths = [path for item in source for path in resolve_sources(item)]
+        return list(dict.fromkeys(paths))
+    source = os.path.expanduser(str(source).strip())
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '*.csv')))
+    if os.path.isfile(source):
+        return [source]
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+
+def read_header(file_path):
+    """讀取 CSV 檔案的欄位名稱（去除前後空白），不讀取資料列。"""
+    return [str(col).strip() for col in pd.read_csv(file_path, nrows=0, skipinitialspace=True).columns]
+
+
+def reconcile_columns(headers):
+    """
+    協調多個檔案的欄位。
+
+    Args:
+        headers (dict): 檔案路徑 -> 欄位名稱清單。
+
+    Returns:
+        tuple: (保留的欄位清單, {檔案路徑: 被捨棄的欄位清單})。
+
+    Raises:
+        ValueError: 有檔案缺少 Label 或 Timestamp 欄位。
+    """
+    for path, columns in headers.items():
+        missing = [col for col in (LABEL_COLUMN, TIMESTAMP_COLUMN) if col not in columns]
+        if missing:
+            raise ValueError(f"檔案 {path} 缺少必要欄位：{', '.join(missing)}")
+
+    first, *others = headers.values()
+    common = set(first).intersection(*others) - IDENTIFIER_COLUMNS
+    columns = [col for col in dict.fromkeys(first) if col in common]
+    dropped = {path: [col for col in dict.fromkeys(cols) if col not in common] for path, cols in headers.items()}
+    return columns, dropped
+
+
+def _build_in_worker(task):
+    file_path, cache_dir, chunksize, columns = task
+    start = time.perf_counter()
+    report = build_clean_data_cache(file_path, cache_dir, chunksize, columns)
+    return report, time.perf_counter() - start
+
+
+def _build_file_caches(sources, cache_dir, chunksize, columns, workers):
+    """建立各檔案的清理後資料快取，已存在的直接沿用；回傳 {檔案路徑: (統計或 None, 本次耗時)}。"""
+    pending = [path for path in sources if not is_clean_data_cached(path, cache_dir, columns)]
+    results = {}
+    if workers > 1 and len(pending) > 1:
+        tasks = [(path, cache_dir, chunksize, columns) for path in pending]
+        # 使用 spawn：從多執行緒的伺服器行程 fork 可能複製到其他執行緒持有的鎖
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results.update(zip(pending, pool.map(_build_in_worker, tasks)))
+    for path in sources:
+        if path not in results:
+            results[path] = _build_in_worker((path, cache_dir, chunksize, columns))
+    return results
+
+
+def _combined_schema(cache_paths):
+    """
+    各檔案快取的統一型別：任一檔案為浮點數的欄位存成 float32，其餘數值欄位為 int32；
+    Label 的類別為所有檔案的聯集；Timestamp 沿用第一個檔案的型別。
+
+    Returns:
+        tuple: (pa.Schema, 排序後的所有 Label 類別)。
+    """
+    schemas = [feather.read_table(path, memory_map=True).schema for path in cache_paths]
+    labels = set()
+    for path in cache_paths:
+        labels.update(feather.read_table(path, columns=[LABEL_COLUMN], memory_map=True)[LABEL_COLUMN]
+                      .combine_chunks().dictionary.to_pylist())
+
+    fields = []
+    for field in schemas[0]:
+        if field.name == LABEL_COLUMN:
+            fields.append(pa.field(field.name, pa.dictionary(pa.int32(), pa.string())))
+        elif field.name == TIMESTAMP_COLUMN:
+            fields.append(field)
+        else:
+            is_float = any(pa.types.is_floating(schema.field(field.name).type) for schema in schemas)
+            fields.append(pa.field(field.name, pa.float32() if is_float else pa.int32()))
+    return pa.schema(fields), sorted(labels)
+
+
+def _write_combined(cache_paths, combined_path):
+    """逐檔將快取轉為統一的型別並寫入合併檔，同時只有一個檔案的資料在記憶體中。"""
+    schema, labels = _combined_schema(cache_paths)
+    tmp_path = f"{combined_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for path in cache_paths:
+            df = feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+            # 所有檔案使用同一組 Label 類別，合併檔中的字典才會一致
+            df[LABEL_COLUMN] = df[LABEL_COLUMN].cat.set_categories(labels)
+            for field in schema:
+                if field.name not in (LABEL_COLUMN, TIMESTAMP_COLUMN):
+                    df[field.name] = df[field.name].astype(field.type.to_pandas_dtype())
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            del df
+    os.replace(tmp_path, combined_path)
+
+
+def build_dataset(source, cache_dir=CACHE_DIR, chunksize=200_000, workers=None):
+    """
+    將多個 CSV 檔案平行解析、清理並合併成一份資料集。
+
+    Args:
+        source (str or list): 檔案、目錄、萬用字元，或以上的清單。
+        cache_dir (str): 快取目錄（各檔案的清理後資料與合併檔都存放於此）。
+        chunksize (int): 串流載入的區塊列數。
+        workers (int, optional): 平行解析的行程數，預設為 CPU 核心數。
+
+    Returns:
+        tuple: (合併後的 DataFrame, 載入統計 dict)；統計的欄位與 `load_cached_clean_data` 相同，另有
+            `files`（各檔案的筆數、移除的列與標頭列、捨棄的欄位、耗時與是否命中快取）。
+            `profile` 為資料集摘要。
+
+    Raises:
+        FileNotFoundError: 來源中沒有任何 CSV 檔案。
+        ValueError: 有檔案缺少必要欄位，或所有檔案都無法讀取。
+    """
+    start = time.perf_counter()
+    sources = resolve_sources(source)
+    if not sources:
+        raise FileNotFoundError(f"找不到符合 {source} 的 CSV 檔案")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(cache_dir, exist_ok=True)
+
+    columns, dropped_columns = reconcile_columns({path: read_header(path) for path in sources})
+    results = _build_file_caches(sources, cache_dir, chunksize, columns, workers)
+
+    files = []
+    for path in sources:
+        report, seconds = results[path]
+        files.append({
+            "file": path,
+            "rows_read": report["rows_read"] if report else 0,
+            "rows_kept": report["rows_kept"] if report else 0,
+            "rows_dropped": report["rows_dropped"] if report else 0,
+            "header_rows": report.get("header_rows", 0) if report else 0,
+            "dropped_columns": dropped_columns[path],
+            "seconds": seconds,
+            "cache_hit": bool(report and report["cache_hit"]),
+            "error": None if report else "無法讀取",
+        })
+    cache_paths = [results[path][0]["cache_path"] for path in sources if results[path][0]]
+    if not cache_paths:
+        raise ValueError("所有檔案都無法讀取")
+
+    # 合併檔以各檔案的快取檔名（含內容雜湊與清理參數）為鍵，任一檔案內容改變都會重建
+    combined_key = hashlib.blake2b(
+        json.dumps([COMBINED_VERSION, [os.path.basename(path) for path in cache_paths]]).encode('utf-8'),
+        digest_size=10,
+    ).hexdigest()
+    combined_path = os.path.join(cache_dir, f"combined-{combined_key}.feather")
+    cache_hit = os.path.exists(combined_path)
+    if not cache_hit:
+        _write_combined(cache_paths, combined_path)
+
+    df = feather.read_table(combined_path, memory_map=True).to_pandas(split_blocks=True)
+    profile_path = combined_path + '.profile.pkl'
+    profile = _read_profile(profile_path, df) if cache_hit else profile_frame(df, label_column=LABEL_COLUMN)
+    if not cache_hit:
+        pd.to_pickle(profile, profile_path)
+
+    rows_read = sum(item["rows_read"] for item in files)
+    seconds = time.perf_counter() - start
+    report = {
+        "rows_read": rows_read,
+        "rows_kept": len(df),
+        "rows_dropped": sum(item["rows_dropped"] for item in files),
+        "header_rows": sum(item["header_rows"] for item in files),
+        "seconds": seconds,
+        "rows_per_sec": rows_read / seconds if seconds > 0 else float('nan'),
+        "peak_rss_mb": peak_rss_mb(),
+        "frame_mb": float(df.memory_usage(deep=True).sum()) / (1024 * 1024),
+        "cache_hit": cache_hit,
+        "workers": workers,
+        "columns": len(columns),
+        "files": files,
+        "profile": profile,
+    }
+    return df, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.dataset_builder',
+        description="平行解析多個流量 CSV，協調欄位後合併成一份清理後的資料集。",
+    )
+    parser.add_argument('sources', nargs='+', help="CSV 檔案、目錄或萬用字元 (例如 \"data/*.csv\")")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="快取目錄")
+    parser.add_argument('--chunksize', type=int, default=200_000, help="每個區塊的列數")
+    parser.add_argument('--workers', type=int, default=None, help="平行解析的行程數，預設為 CPU 核心數")
+    args = parser.parse_args(argv)
+
+    df, report = build_dataset(args.sources, args.cache_dir, args.chunksize, args.workers)
+    for item in report['files']:
+        status = item['error'] or ('快取' if item['cache_hit'] else f"{item['seconds']:.1f} 秒")
+        print(
+            f"{item['file']}: {item['rows_kept']:,}/{item['rows_read']:,} 筆 "
+            f"(移除 {item['rows_dropped']:,} 筆，其中標頭列 {item['header_rows']:,} 筆), {status}"
+        )
+        if item['dropped_columns']:
+            print(f"  捨棄欄位：{', '.join(item['dropped_columns'])}")
+    print(
+        f"合計 {len(report['files'])} 個檔案、{report['rows_kept']:,} 筆 x {report['columns']} 欄 "
+        f"({report['frame_mb']:,.0f} MB)，耗時 {report['seconds']:.1f} 秒，{report['workers']} 個行程"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+此模組負責計算資料集摘要（各類別筆數、欄位資訊與數值特徵統計），供儀表板直接顯示。
+
+摘要在資料載入時逐區塊累計一次（與清理在同一次串流中完成），並與清理後資料的磁碟快取一起保存，
+儀表板重新執行時不必再對整份資料呼叫 `value_counts`、`info` 或 `describe`。
+"""
+import numpy as np
+import pandas as pd
+
+# 摘要的內容或格式改變時遞增，讓已保存的舊摘要重新計算
+PROFILE_VERSION = 1
+# 四分位數以均勻抽樣的列估計；資料筆數不超過此數時為精確值
+QUANTILE_SAMPLE_ROWS = 20_000
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+class DatasetProfiler:
+    """
+    逐區塊累計資料集摘要。
+
+    平均數與變異數以可合併的動差（筆數、平均數、離差平方和）逐區塊合併，最小值、最大值、非空值筆數與
+    各類別筆數直接累加；四分位數由跨區塊的水庫抽樣 (reservoir sampling) 估計：每一列給一個隨機優先值，
+    保留優先值最小的 `sample_rows` 列，結果等同於從全部資料中均勻抽樣。
+
+    Args:
+        label_column (str): 目標變數欄位名稱。
+        sample_rows (int): 估計四分位數的抽樣筆數。
+        random_state (int): 抽樣的亂數種子，相同資料得到相同的摘要。
+    """
+
+    def __init__(self, label_column='Label', sample_rows=QUANTILE_SAMPLE_ROWS, random_state=0):
+        self.label_column = label_column
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self._rng = np.random.default_rng(random_state)
+        self._numeric_columns = None
+        self._label_counts = None
+        self._non_null = None
+        self._sample = None
+        self._sample_keys = None
+
+    def update(self, chunk):
+        """將一個區塊併入摘要。"""
+        if self._numeric_columns is None:
+            self._numeric_columns = chunk.select_dtypes(include='number').columns
+            n_columns = len(self._numeric_columns)
+            self._count = np.zeros(n_columns)
+            self._mean = np.zeros(n_columns)
+            self._m2 = np.zeros(n_columns)
+            self._min = np.full(n_columns, np.inf)
+            self._max = np.full(n_columns, -np.inf)
+            self._sample = np.empty((0, n_columns))
+            self._sample_keys = np.empty(0)
+
+        self.rows += len(chunk)
+        counts = chunk.count()
+        self._non_null = counts if self._non_null is None else self._non_null.add(counts, fill_value=0)
+        if self.label_column in chunk:
+            labels = chunk[self.label_column].value_counts()
+            self._label_counts = labels if self._label_counts is None else self._label_counts.add(labels, fill_value=0)
+
+        # 逐欄計算以免一次轉出整個區塊的 float64 副本
+        for i, column in enumerate(self._numeric_columns):
+            values = chunk[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if not values.size:
+                continue
+            n_b = values.size
+            mean_b = values.mean()
+            m2_b = np.square(values - mean_b).sum()
+            n_a = self._count[i]
+            n = n_a + n_b
+            delta = mean_b - self._mean[i]
+            self._mean[i] += delta * n_b / n
+            self._m2[i] += m2_b + delta * delta * n_a * n_b / n
+            self._count[i] = n
+            self._min[i] = min(self._min[i], values.min())
+            self._max[i] = max(self._max[i], values.max())
+
+        keys = self._rng.random(len(chunk))
+        if len(keys) > self.sample_rows:
+            rows = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+        else:
+            rows = np.arange(len(keys))
+        sample = chunk[self._numeric_columns].iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        self._sample = np.vstack([self._sample, sample])
+        self._sample_keys = np.concatenate([self._sample_keys, keys[rows]])
+        if len(self._sample_keys) > self.sample_rows:
+            keep = np.argpartition(self._sample_keys, self.sample_rows)[:self.sample_rows]
+            self._sample = self._sample[keep]
+            self._sample_keys = self._sample_keys[keep]
+
+    def result(self, df):
+        """
+        完成摘要。
+
+        Args:
+            df (pd.DataFrame): 所有區塊合併後的資料，只用來取得最終的欄位型別、前 5 筆與記憶體用量。
+
+        Returns:
+            dict: version、rows、label_counts (Series)、info (DataFrame：非空值筆數與型別)、
+                describe (DataFrame，格式同 `df.describe(include='number')`)、head、memory_mb，
+                以及 quantiles_exact（四分位數是否為精確值）。
+        """
+        columns = self._numeric_columns if self._numeric_columns is not None else pd.Index([])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self._m2 / (self._count - 1)) if len(columns) else np.empty(0)
+        if len(columns) and len(self._sample):
+            quantiles = np.nanquantile(self._sample, QUANTILES, axis=0)
+        else:
+            quantiles = np.full((len(QUANTILES), len(columns)), np.nan)
+
+        describe = pd.DataFrame(
+            [self._count, self._mean, std, self._min, *quantiles, self._max] if len(columns) else None,
+            index=['count', 'mean', 'std', 'min', *(f"{q:.0%}" for q in QUANTILES), 'max'],
+            columns=columns,
+        )
+        label_counts = pd.Series(dtype=np.int64) if self._label_counts is None else self._label_counts
+        label_counts = label_counts[label_counts > 0].astype(np.int64).sort_values(ascending=False)
+        label_counts.name = 'count'
+        non_null = self._non_null if self._non_null is not None else pd.Series(0, index=df.columns)
+        info = pd.DataFrame({
+            '非空值筆數': non_null.reindex(df.columns, fill_value=0).astype(np.int64),
+            '型別': df.dtypes.astype(str),
+        })
+        return {
+            'version': PROFILE_VERSION,
+            'rows': self.rows,
+            'label_counts': label_counts,
+            'info': info,
+            'describe': describe,
+            'head': df.head(),
+            'memory_mb': float(df.memory_usage(deep=True).sum()) / (1024 * 1024),
+            'quantiles_exact': self.rows <= self.sample_rows,
+        }
+
+
+def profile_frame(df, label_column='Label', chunksize=200_000):
+    """
+    以逐區塊的方式計算已載入資料的摘要（例如舊版快取沒有保存摘要時）。
+
+    Returns:
+        dict: 同 `DatasetProfiler.result`。
+    """
+    profiler = DatasetProfiler(label_column=label_column)
+    for start in range(0, len(df), chunksize):
+        profiler.update(df.iloc[start:start + chunksize])
+    return profiler.result(df)
@@ -0,0 +1,248 @@
+"""
+此模組負責 SHAP 可解釋性分析：在背景建立解釋器、整理各版本 shap 的輸出格式，並提供批次計算、快取的解釋服務。
+shap 在第一次建立解釋器時才匯入，不影響應用程式的啟動時間。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# shap 會連帶匯入 matplotlib 與 IPython；pyplot 第一次建立圖表時也會匯入 IPython，兩者在不同執行緒
+# 同時進行會觸發循環匯入錯誤。背景匯入 shap 與介面使用 pyplot 繪圖都需持有此鎖
+PLOTTING_IMPORT_LOCK = threading.Lock()
+
+
+def _import_shap():
+    """匯入 shap（約需數秒）；在背景執行緒中呼叫，不阻塞介面。"""
+    with PLOTTING_IMPORT_LOCK:
+        import shap
+    return shap
+
+
+class BackgroundExplainer:
+    """
+    在背景執行緒中匯入 shap 並建立 `shap.TreeExplainer`，避免載入或訓練模型後阻塞介面。
+
+    介面與 TreeExplainer 相容（`shap_values`、`expected_value`）：尚未建立完成時呼叫會等待建立結束，
+    因此可直接交給 ShapExplanationService 等使用端；介面可先以 `ready` 判斷是否要顯示等待狀態。
+
+    Args:
+        model: 已訓練的樹模型。
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.error = None
+        self.seconds = None
+        self._explainer = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._build, name="shap-explainer", daemon=True)
+        self._thread.start()
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self._explainer = _import_shap().TreeExplainer(self.model)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._done.set()
+
+    @property
+    def ready(self):
+        """解釋器是否已建立完成（包含建立失敗）。"""
+        return self._done.is_set()
+
+    def get(self, timeout=None):
+        """
+        取得建立完成的 TreeExplainer，必要時等待。
+
+        Raises:
+            TimeoutError: 在 `timeout` 秒內尚未建立完成。
+            RuntimeError: 建立解釋器失敗。
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("SHAP 解釋器仍在建立中")
+        if self.error is not None:
+            raise RuntimeError(f"建立 SHAP 解釋器失敗：{self.error}") from self.error
+        return self._explainer
+
+    def shap_values(self, X, **kwargs):
+        return self.get().shap_values(X, **kwargs)
+
+    @property
+    def expected_value(self):
+        return self.get().expected_value
+
+
+def select_class_shap(shap_values, expected_value, class_indices, n_features):
+    """
+    從 explainer 的輸出中取出每一列「預測類別」的 SHAP 值與基礎分數。
+
+    相容 shap 各版本的輸出格式：舊版多類別為「每個類別一個 (n, f) 陣列」的列表，
+    新版為 (n, f, c) 陣列；單一輸出的二元模型為 (n, f)，類別 0 時取負值。
+    若 SHAP 陣列多出一欄 base value，會一併切除。
+
+    Args:
+        shap_values (list or np.ndarray): `explainer.shap_values` 的輸出。
+        expected_value (float or array-like): `explainer.expected_value`。
+        class_indices (int or array-like): 每一列的預測類別索引。
+        n_features (int): 特徵數量。
+
+    Returns:
+        tuple: (形狀為 (n, n_features) 的 SHAP 值, 形狀為 (n,) 的基礎分數)。
+    """
+    if isinstance(shap_values, list):
+        shap_values = np.stack(shap_values, axis=-1)
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 1:
+        shap_values = shap_values[np.newaxis, :]
+    n_rows = shap_values.shape[0]
+    class_indices = np.broadcast_to(np.asarray(class_indices, dtype=int), (n_rows,))
+
+    if shap_values.ndim == 3:
+        # 超出範圍的類別索引退回類別 0，與舊版介面的處理方式一致
+        classes = np.where(class_indices < shap_values.shape[2], class_indices, 0)
+        values = shap_values[np.arange(n_rows), :, classes]
+    else:
+        values = np.where((class_indices == 0)[:, np.newaxis], -shap_values, shap_values)
+
+    if values.shape[1] == n_features + 1:
+        values = values[:, :-1]
+
+    base = np.atleast_1d(np.asarray(expected_value, dtype=float))
+    if base.size > 1:
+        base = base[np.where(class_indices < base.size, class_indices, 0)]
+    else:
+        base = np.full(n_rows, base[0])
+    return values, base
+
+
+class ShapExplanationService:
+    """
+    批次結果的 SHAP 解釋服務。
+
+    在背景執行緒中以向量化的批次計算所有預測為攻擊的流量的 TreeSHAP 值，
+    結果存放於以（模型識別, 列索引）為鍵、有容量上限的 LRU 快取中；
+    切換要檢視的流量時可直接取得，不需在每次重新執行腳本時重算。
+    同時累積各預測類別的平均 |SHAP| 作為類別層級的特徵重要性摘要。
+
+    Args:
+        explainer (BackgroundExplainer or shap.TreeExplainer): 解釋器；背景建立中時，第一個批次會等待建立完成。
+        model_key (hashable): 模型識別，換模型後舊的快取不會被誤用。
+        class_names (array-like): 類別名稱（le.classes_）。
+        max_cached_rows (int): 快取保留的最大列數。
+        batch_size (int): 每次向量化計算的列數。
+    """
+
+    def __init__(self, explainer, model_key, class_names, max_cached_rows=5000, batch_size=256):
+        self.explainer = explainer
+        self.model_key = model_key
+        self.class_names = np.asarray(class_names)
+        self.max_cached_rows = max_cached_rows
+        self.batch_size = batch_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # shap 的 explainer 不保證執行緒安全，背景批次與前景單筆計算共用一把鎖
+        self._explainer_lock = threading.Lock()
+        self._features = None
+        self._class_index = {}
+        self._importance_sum = {}
+        self._importance_count = {}
+        self._thread = None
+        self.total_rows = 0
+        self.done_rows = 0
+        self.error = None
+
+    @property
+    def ready(self):
+        """背景批次計算是否已完成。"""
+        return self._thread is None or not self._thread.is_alive()
+
+    def start(self, features, predicted_labels, background=True):
+        """
+        開始計算指定流量的 SHAP 值。
+
+        Args:
+            features (pd.DataFrame): 餵入模型的標準化特徵，索引為流量的列索引。
+            predicted_labels (array-like): 每一列的預測標籤名稱。
+            background (bool): 是否在背景執行緒中計算。
+        """
+        label_to_index = {label: i for i, label in enumerate(self.class_names)}
+        self._features = features
+        self._class_index = dict(zip(features.index, (label_to_index[label] for label in predicted_labels)))
+        self.total_rows = min(len(features), self.max_cached_rows)
+        self.done_rows = 0
+        if background:
+            self._thread = threading.Thread(target=self._run, name="shap-batch", daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+
+    def _run(self):
+        try:
+            for start in range(0, self.total_rows, self.batch_size):
+                batch = self._features.iloc[start:min(start + self.batch_size, self.total_rows)]
+                self._compute(batch, accumulate=True)
+                self.done_rows += len(batch)
+        except Exception as e:
+            self.error = e
+
+    def _compute(self, batch, accumulate=False):
+        class_indices = np.array([self._class_index[row] for row in batch.index])
+        with self._explainer_lock:
+            raw = self.explainer.shap_values(batch)
+            expected_value = self.explainer.expected_value
+        values, base = select_class_shap(raw, expected_value, class_indices, batch.shape[1])
+
+        with self._cache_lock:
+            for row, row_values, row_base in zip(batch.index, values, base):
+                self._cache[(self.model_key, row)] = (row_values, float(row_base))
+                self._cache.move_to_end((self.model_key, row))
+            while len(self._cache) > self.max_cached_rows:
+                self._cache.popitem(last=False)
+            if accumulate:
+                for class_index in np.unique(class_indices):
+                    rows = class_indices == class_index
+                    abs_sum = np.abs(values[rows]).sum(axis=0)
+                    self._importance_sum[class_index] = self._importance_sum.get(class_index, 0) + abs_sum
+                    self._importance_count[class_index] = self._importance_count.get(class_index, 0) + int(rows.sum())
+        return values, base
+
+    def explain(self, row):
+        """
+        取得單一流量的 SHAP 值；尚未計算時立即同步計算並存入快取。
+
+        Args:
+            row: 流量在批次結果中的列索引。
+
+        Returns:
+            tuple: (SHAP 值 np.ndarray, 基礎分數 float)。
+        """
+        key = (self.model_key, row)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        values, base = self._compute(self._features.loc[[row]])
+        return values[0], float(base[0])
+
+    def class_importance(self):
+        """
+        依預測類別彙整的平均 |SHAP| 特徵重要性（只包含背景批次已完成的列）。
+
+        Returns:
+            pd.DataFrame: 索引為特徵、欄位為類別名稱；尚無結果時為空的 DataFrame。
+        """
+        with self._cache_lock:
+            columns = {
+                self.class_names[class_index]: total / self._importance_count[class_index]
+                for class_index, total in sorted(self._importance_sum.items())
+            }
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame(columns, index=self._features.columns)
@@ -0,0 +1,141 @@
+"""
+此模組負責在基因演算法之前以過濾法 (filter) 預先篩選特徵，縮小搜尋空間。
+
+- 一次逐區塊掃描資料，同時累計各欄的平均數、變異數、兩兩共變異（相關係數矩陣）、最小值，
+  以及各類別的特徵總和（卡方統計量所需）。
+- 移除變異數為 0 的常數欄位。
+- 依關聯性排序其餘特徵：卡方 (chi²) 直接由同一次掃描的統計量計算；互資訊 (mutual information)
+  則在分層抽樣的小樣本上估計。
+- 依分數由高到低挑選特徵，與已保留特徵的相關係數絕對值超過門檻者視為重複（例如 Fwd/Bwd 區段大小的別名欄位）並移除，
+  因此每組高度相關的特徵只保留最有資訊的一個。
+
+只回傳保留的特徵名稱；標準化器與模型套件仍以完整的特徵欄位為準，`selected_features` 的格式不變。
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+# 掃描資料時每個區塊的列數（區塊會轉為 float64）
+SCREEN_CHUNK_ROWS = 65_536
+# 估計互資訊的分層抽樣筆數
+MI_SAMPLE_ROWS = 20_000
+SCORE_METHODS = ('mutual_info', 'chi2')
+
+
+def _column_statistics(X, y, n_classes, chunk_rows):
+    """一次掃描取得平均數、變異數、相關係數矩陣、最小值，以及各類別的筆數與特徵總和。"""
+    values = np.asarray(X)
+    n_rows, n_features = values.shape
+    total = np.zeros(n_features)
+    cross = np.zeros((n_features, n_features))
+    minimum = np.full(n_features, np.inf)
+    class_sums = np.zeros((n_classes, n_features))
+    for start in range(0, n_rows, chunk_rows):
+        chunk = values[start:start + chunk_rows].astype(np.float64)
+        one_hot = np.eye(n_classes)[y[start:start + chunk_rows]]
+        total += chunk.sum(axis=0)
+        cross += chunk.T @ chunk
+        np.minimum(minimum, chunk.min(axis=0), out=minimum)
+        class_sums += one_hot.T @ chunk
+
+    mean = total / n_rows
+    covariance = cross / n_rows - np.outer(mean, mean)
+    variance = np.clip(np.diag(covariance).copy(), 0.0, None)
+    std = np.sqrt(variance)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = covariance / np.outer(std, std)
+    class_counts = np.bincount(y, minlength=n_classes)
+    return mean, variance, np.nan_to_num(correlation), minimum, class_counts, class_sums
+
+
+def _chi2_scores(n_rows, minimum, class_counts, class_sums):
+    """
+    由各類別的特徵總和計算卡方統計量，結果與 `sklearn.feature_selection.chi2(X - X.min(), y)` 相同。
+    """
+    # 卡方需要非負的特徵，將每欄平移到最小值為 0
+    observed = class_sums - np.outer(class_counts, minimum)
+    feature_sums = observed.sum(axis=0)
+    expected = np.outer(class_counts / n_rows, feature_sums)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = ((observed - expected) ** 2 / expected).sum(axis=0)
+    return np.nan_to_num(scores)
+
+
+def _mutual_info_scores(X, y, columns, sample_rows, random_state):
+    """在分層抽樣的資料上估計指定欄位與標籤的互資訊。"""
+    from sklearn.feature_selection import mutual_info_classif
+    from src.feature_selector import stratified_sample_indices
+
+    rows = np.arange(len(y))
+    if len(y) > sample_rows:
+        rows = stratified_sample_indices(y, sample_rows, random_state=random_state)
+    sample = np.asarray(X)[np.ix_(rows, columns)]
+    return mutual_info_classif(sample, y[rows], random_state=random_state)
+
+
+def screen_features(X, y, correlation_threshold=0.95, method='mutual_info', top_k=None,
+                    mi_sample_rows=MI_SAMPLE_ROWS, random_state=42, chunk_rows=SCREEN_CHUNK_ROWS):
+    """
+    以過濾法預先篩選特徵。
+
+    Args:
+        X (pd.DataFrame): 標準化後的特徵。
+        y (np.ndarray): 編碼後的標籤 (0 ~ 類別數 - 1)。
+        correlation_threshold (float): 相關係數絕對值超過此值的特徵視為重複。
+        method (str): 排序方式，'mutual_info' 或 'chi2'。
+        top_k (int, optional): 最多保留幾個特徵，None 代表保留所有通過篩選的特徵。
+        mi_sample_rows (int): 估計互資訊的抽樣筆數。
+        random_state (int): 抽樣與互資訊估計的亂數種子。
+        chunk_rows (int): 掃描資料時每個區塊的列數。
+
+    Returns:
+        dict: kept（保留的特徵，依原本的欄位順序）、dropped（{特徵: 移除原因}）、
+            scores（各特徵的分數 pd.Series，常數欄位為 0）、method、n_before、n_after、seconds。
+
+    Raises:
+        ValueError: 未知的排序方式。
+    """
+    if method not in SCORE_METHODS:
+        raise ValueError(f"未知的排序方式：{method}")
+    start = time.perf_counter()
+    y = np.asarray(y)
+    columns = pd.Index(X.columns)
+    n_features = len(columns)
+    _, variance, correlation, minimum, class_counts, class_sums = _column_statistics(
+        X, y, int(y.max()) + 1 if len(y) else 0, chunk_rows)
+
+    dropped = {}
+    constant = variance <= 1e-12
+    for j in np.flatnonzero(constant):
+        dropped[columns[j]] = "常數欄位 (變異數為 0)"
+
+    candidates = np.flatnonzero(~constant)
+    scores = np.zeros(n_features)
+    if method == 'chi2':
+        scores[candidates] = _chi2_scores(len(y), minimum, class_counts, class_sums)[candidates]
+    elif len(candidates):
+        scores[candidates] = _mutual_info_scores(X, y, candidates, mi_sample_rows, random_state)
+
+    # 分數由高到低挑選，與已保留特徵高度相關的視為重複
+    kept = []
+    for j in sorted(candidates, key=lambda j: (-scores[j], j)):
+        if top_k is not None and len(kept) >= top_k:
+            dropped[columns[j]] = f"分數未進入前 {top_k} 名"
+            continue
+        if kept:
+            partner = kept[int(np.argmax(np.abs(correlation[j, kept])))]
+            if abs(correlation[j, partner]) > correlation_threshold:
+                dropped[columns[j]] = f"與 {columns[partner]} 高度相關 (r = {correlation[j, partner]:.3f})"
+                continue
+        kept.append(j)
+
+    return {
+        "kept": [columns[j] for j in sorted(kept)],
+        "dropped": dropped,
+        "scores": pd.Series(scores, index=columns, name=method),
+        "method": method,
+        "n_before": n_features,
+        "n_after": len(kept),
+        "seconds": time.perf_counter() - start,
+    }
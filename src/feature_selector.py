@@ -1,26 +1,563 @@
 """此模組負責根據不同策略進行特徵選擇，使用 DEAP 函式庫。"""
+import os
 import random
-import streamlit as st
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from deap import base, creator, tools, algorithms
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import cross_val_score
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from src.memo import disk_memoize
 
 # --- DEAP 全域設定 ---
 # 建立問題：最大化適應度（準確率）
 creator.create("FitnessMax", base.Fitness, weights=(1.0,))
 # 建立個體：一個列表，並帶有 FitnessMax 的屬性
 creator.create("Individual", list, fitness=creator.FitnessMax)
+# 多目標：最大化加權 F1、最小化特徵數與每筆預測成本
+creator.create("FitnessPareto", base.Fitness, weights=(1.0, -1.0, -1.0))
+creator.create("ParetoIndividual", list, fitness=creator.FitnessPareto)
+
+# 工作行程內的資料，由 _init_worker 在行程啟動時設定一次，避免每個任務重複傳送資料集
+_WORKER_STATE = {}
+
+# 預設的評估精度排程：(起始世代, 抽樣筆數)，抽樣筆數為 None 代表使用完整資料
+DEFAULT_FIDELITY_SCHEDULE = ((0, 20000), (5, 100000), (10, None))
+
+
+def mask_to_key(individual) -> bytes:
+    """將個體（0/1 列表）壓縮成可雜湊的位元遮罩，作為適應度快取的鍵。"""
+    return np.packbits(np.asarray(individual, dtype=bool)).tobytes()
+
+
+def key_to_mask(key: bytes, n_features: int) -> np.ndarray:
+    """將 mask_to_key 產生的鍵還原為布林遮罩。"""
+    return np.unpackbits(np.frombuffer(key, dtype=np.uint8), count=n_features).astype(bool)
+
+
+def stratified_sample_indices(y, n_samples, min_per_class=50, random_state=42) -> np.ndarray:
+    """
+    依類別比例分層抽樣，並保證每個類別至少保留 `min_per_class` 筆（不足則全取），
+    使稀有的攻擊類別不會在小樣本中消失。
+
+    Args:
+        y (array-like): 編碼後的標籤。
+        n_samples (int): 目標抽樣筆數。
+        min_per_class (int): 每個類別的最少保留筆數。
+        random_state (int): 亂數種子，固定種子讓同一精度的評估結果可以被快取。
+
+    Returns:
+        np.ndarray: 排序後的列索引。
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    classes, counts = np.unique(y, return_counts=True)
+    picked = []
+    for cls, count in zip(classes, counts):
+        quota = max(int(round(n_samples * count / len(y))), min_per_class)
+        class_rows = np.flatnonzero(y == cls)
+        if quota < count:
+            class_rows = rng.choice(class_rows, size=quota, replace=False)
+        picked.append(class_rows)
+    return np.sort(np.concatenate(picked))
+
+
+def gather_columns(X, mask, buffer):
+    """
+    將選擇的欄位逐欄複製到重複使用的欄主序緩衝區，不為每個個體配置新的陣列。
+
+    Args:
+        X (np.ndarray): 欄主序 (Fortran order) 的特徵矩陣，每一欄是連續的記憶體。
+        mask (np.ndarray): 特徵的布林遮罩。
+        buffer (np.ndarray): 與 X 形狀、型別相同的欄主序緩衝區。
+
+    Returns:
+        np.ndarray: 緩衝區前幾欄的檢視（同樣是欄主序連續記憶體），內容在下一次呼叫時會被覆寫。
+    """
+    columns = np.flatnonzero(mask)
+    subset = buffer[:, :len(columns)]
+    for k, j in enumerate(columns):
+        subset[:, k] = X[:, j]
+    return subset
+
+
+def _score_subset(X, y, mask, buffer, cv, n_estimators, n_jobs):
+    """以隨機森林的交叉驗證準確率評估一組特徵子集；X 與 y 為目前精度下參與評估的資料。"""
+    if not mask.any():
+        return 0.0
+    estimator = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs)
+    return float(np.mean(cross_val_score(estimator, gather_columns(X, mask, buffer), y, cv=cv, scoring='accuracy')))
+
+
+def nodes_per_row(forest):
+    """
+    樹模型每筆預測平均走訪的節點數（所有樹加總），作為推論成本的指標。
+
+    每個內部節點被落在其下的樣本各比較一次，因此一棵樹的期望走訪節點數為
+    1 + Σ(內部節點的加權樣本數) / 根節點的加權樣本數；只由樹的結構計算，結果固定，
+    不像實測的預測時間會受計時誤差影響。
+
+    Args:
+        forest: 已訓練的樹集成模型（具有 `estimators_`，例如隨機森林）。
+
+    Returns:
+        float: 每筆預測走訪的節點數。
+    """
+    total = 0.0
+    for tree in forest.estimators_:
+        structure = tree.tree_
+        weights = structure.weighted_n_node_samples
+        total += 1.0 + weights[structure.children_left != -1].sum() / weights[0]
+    return total
+
+
+def _pareto_scores(X, y, mask, buffer, cv, n_estimators, n_jobs):
+    """
+    多目標評估一組特徵子集：隨機森林分層交叉驗證的加權 F1、特徵數，以及每筆預測走訪的節點數
+    （`nodes_per_row`，各折的平均）。
+    """
+    n_selected = int(mask.sum())
+    if n_selected == 0:
+        return 0.0, 0.0, 0.0
+    X_subset = gather_columns(X, mask, buffer)
+    f1s, costs = [], []
+    for train, test in StratifiedKFold(n_splits=cv).split(X_subset, y):
+        estimator = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs)
+        estimator.fit(X_subset[train], y[train])
+        f1s.append(f1_score(y[test], estimator.predict(X_subset[test]), average='weighted'))
+        costs.append(nodes_per_row(estimator))
+    return float(np.mean(f1s)), float(n_selected), float(np.mean(costs))
+
+
+def _level_buffer(buffers, level, X):
+    """每個精度等級一個緩衝區，在同一行程的所有評估間重複使用。"""
+    if level not in buffers:
+        buffers[level] = np.empty_like(X, order='F')
+    return buffers[level]
+
+
+def _init_worker(level_data, cv, n_estimators, scorer=_score_subset):
+    _WORKER_STATE.update(level_data=level_data, cv=cv, n_estimators=n_estimators, scorer=scorer, buffers={})
+
 
+def _score_in_worker(task):
+    level, key = task
+    state = _WORKER_STATE
+    X, y = state['level_data'][level]
+    mask = key_to_mask(key, X.shape[1])
+    # 平行度已由行程池提供，單一模型只使用一個核心以免超額訂閱
+    return state['scorer'](X, y, mask, _level_buffer(state['buffers'], level, X),
+                           state['cv'], state['n_estimators'], n_jobs=1)
 
-@st.cache_data(show_spinner=False)
-def run_genetic_selection(_X, _y):
+
+def fitness_seconds(X, y, sample_rows=20_000, cv=3, n_estimators=20):
+    """
+    量測在分層抽樣的資料上以全部欄位評估一次適應度的耗時，用來比較不同特徵數下每個個體的評估成本。
+
+    Returns:
+        float: 秒數。
+    """
+    values, y = np.asfortranarray(X), np.asarray(y)
+    if len(y) > sample_rows:
+        rows = stratified_sample_indices(y, sample_rows)
+        values, y = np.asfortranarray(values[rows]), y[rows]
+    start = time.perf_counter()
+    _score_subset(values, y, np.ones(values.shape[1], dtype=bool), np.empty_like(values, order='F'),
+                  cv, n_estimators, n_jobs=-1)
+    return time.perf_counter() - start
+
+
+class FitnessEngine:
+    """
+    基因演算法的適應度評估引擎。
+
+    以（評估精度, 特徵位元遮罩）為鍵快取評估結果，重複出現的個體不會重新訓練模型；
+    每一代的待評估個體會先去重，再透過行程池平行評估。
+    註冊為 DEAP 工具箱的 `map` 後，每一代的評估都會經過此引擎；向量化族群則以 `evaluate_population`
+    一次評估整個布林矩陣。
+    特徵以欄主序矩陣保存（各精度的抽樣資料也預先取出一份），評估時選擇的欄位複製到重複使用的緩衝區。
+
+    Args:
+        X (array-like): 特徵矩陣。
+        y (array-like): 編碼後的標籤。
+        n_workers (int, optional): 行程池大小，預設為 CPU 核心數；設為 1 則在目前行程中逐一評估。
+        cv (int): 交叉驗證的折數。
+        n_estimators (int): 評估用隨機森林的樹數量。
+        sample_sizes (iterable, optional): 需要預先準備的分層抽樣筆數；None 代表完整資料，永遠可用。
+        scorer (callable): 評估函式，`_score_subset` 回傳準確率；`_pareto_scores` 回傳多目標的 tuple。
+    """
+
+    def __init__(self, X, y, n_workers=None, cv=3, n_estimators=20, sample_sizes=(), scorer=_score_subset):
+        # 預處理後的特徵本身就是欄主序，不會複製
+        self.X = np.asfortranarray(X)
+        self.y = np.asarray(y)
+        self.n_features = self.X.shape[1]
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.cv = cv
+        self.n_estimators = n_estimators
+        self.scorer = scorer
+        # 每個精度等級對應的 (特徵, 標籤)；抽樣筆數不小於資料量時直接視為完整資料
+        self._level_data = {None: (self.X, self.y)}
+        for size in sample_sizes:
+            if size is not None and size < len(self.y) and size not in self._level_data:
+                rows = stratified_sample_indices(self.y, size)
+                self._level_data[size] = (np.asfortranarray(self.X[rows]), self.y[rows])
+        self._buffers = {}
+        self.level = None
+        self._cache = {}
+        self._pool = None
+        self.evaluations = 0
+        self.cache_hits = 0
+
+    def __enter__(self):
+        if self.n_workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self._level_data, self.cv, self.n_estimators, self.scorer),
+            )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """關閉行程池。"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def set_level(self, sample_size):
+        """
+        切換評估精度。
+
+        Args:
+            sample_size (int or None): 分層抽樣筆數，None 或不小於資料量時使用完整資料。
+
+        Returns:
+            int or None: 實際採用的精度等級（None 代表完整資料）。
+        """
+        self.level = sample_size if sample_size in self._level_data else None
+        return self.level
+
+    @property
+    def level_rows(self):
+        """目前精度下參與評估的資料筆數。"""
+        return len(self._level_data[self.level][1])
+
+    def evaluate(self, individual):
+        """評估單一個體（DEAP 的 evaluate 介面），結果同樣會被快取。"""
+        return self.map(self.evaluate, [individual])[0]
+
+    def map(self, func, individuals):
+        """
+        DEAP 工具箱的 `map` 替代品。
+
+        當 `func` 為本引擎的 `evaluate` 時，會以快取與行程池批次評估整代個體；
+        其他函式則退回一般的逐一映射。
+        """
+        # toolbox.register 會將函式包裝成 functools.partial，因此需比對其底層函式
+        if getattr(func, 'func', func) != self.evaluate:
+            return list(map(func, individuals))
+
+        scores = self._scores([mask_to_key(ind) for ind in individuals])
+        return [score if isinstance(score, tuple) else (score,) for score in scores]
+
+    def evaluate_population(self, population):
+        """
+        評估以布林矩陣表示的族群。
+
+        Args:
+            population (np.ndarray): 形狀為 (個體數, 特徵數) 的布林矩陣。
+
+        Returns:
+            np.ndarray: 每個個體的適應度。
+        """
+        # 整個族群一次壓縮成位元，每一列的位元組與 mask_to_key 相同
+        packed = np.packbits(population, axis=1)
+        return np.array(self._scores([row.tobytes() for row in packed]), dtype=float)
+
+    def _scores(self, masks):
+        """以目前精度評估多個位元遮罩，已評估過的直接取自快取。"""
+        keys = [(self.level, mask) for mask in masks]
+        pending = [key for key in dict.fromkeys(keys) if key not in self._cache]
+        if pending:
+            if self._pool is not None:
+                scores = self._pool.map(_score_in_worker, pending)
+            else:
+                scores = (
+                    self.scorer(*self._level_data[level], key_to_mask(key, self.n_features),
+                                  _level_buffer(self._buffers, level, self._level_data[level][0]),
+                                  self.cv, self.n_estimators, n_jobs=-1)
+                    for level, key in pending
+                )
+            self._cache.update(zip(pending, scores))
+
+        self.evaluations += len(pending)
+        self.cache_hits += len(keys) - len(pending)
+        return [self._cache[key] for key in keys]
+
+    def report(self):
+        """
+        回傳評估統計。
+
+        Returns:
+            dict: 實際評估次數、快取命中次數與命中率，以及使用的行程數。
+        """
+        requests = self.evaluations + self.cache_hits
+        return {
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache_hits,
+            "hit_rate": self.cache_hits / requests if requests else 0.0,
+            "n_workers": self.n_workers,
+        }
+
+
+def _evolve(toolbox, engine, pop_size, ngen, cxpb, mutpb, fidelity_schedule, patience, hof_size=5, progress=None):
+    """
+    依評估精度排程執行的世代演化迴圈（取代 `algorithms.eaSimple`）。
+
+    每個精度階段從排程指定的世代開始；若最佳適應度連續 `patience` 代沒有進步，
+    會提前進入下一個階段，在最後（完整資料）階段停滯則結束演化。
+    切換精度時，先在新精度下重新評估整個族群，再重置名人堂並進行選擇與交配突變，
+    使選擇依據的是新精度下的分數，同一代的分數也可以互相比較。
+    `progress` 不為 None 時，每一代結束後以該代的紀錄呼叫一次。
+
+    Returns:
+        tuple: (最終族群, 名人堂候選個體, 每一代的紀錄列表, 是否提前停止)。
+    """
+    stages = sorted(fidelity_schedule, key=lambda stage: stage[0])
+    stage_idx = 0
+    pop = toolbox.population(n=pop_size)
+    hof = tools.HallOfFame(hof_size)
+    history = []
+    best, stale = -np.inf, 0
+    stopped_early = False
+
+    for gen in range(ngen + 1):
+        gen_start = time.perf_counter()
+        # 到達下一階段的起始世代，或在目前階段停滯時，往下一個精度階段前進
+        while stage_idx + 1 < len(stages) and (gen >= stages[stage_idx + 1][0] or stale >= patience):
+            stage_idx += 1
+            stale = 0
+        if stale >= patience:
+            stopped_early = True
+            break
+
+        previous_level = engine.level
+        engine.set_level(stages[stage_idx][1])
+        if gen > 0 and engine.level != previous_level:
+            # 親代先在新精度下重新評估，選擇才不會比較到失效的分數
+            for ind, fit in zip(pop, toolbox.map(toolbox.evaluate, pop)):
+                ind.fitness.values = fit
+            hof.clear()
+            hof.update(pop)
+            best = -np.inf
+
+        if gen > 0:
+            offspring = toolbox.select(pop, len(pop))
+            offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        else:
+            offspring = pop
+
+        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+
+        pop[:] = offspring
+        hof.update(pop)
+
+        scores = [ind.fitness.values[0] for ind in pop]
+        gen_best = max(scores)
+        if gen_best > best + 1e-6:
+            best, stale = gen_best, 0
+        else:
+            stale += 1
+
+        history.append({
+            "gen": gen,
+            "rows": engine.level_rows,
+            "max": gen_best,
+            "avg": float(np.mean(scores)),
+            "seconds": time.perf_counter() - gen_start,
+        })
+        if progress is not None:
+            progress(history[-1])
+
+    return pop, list(hof), history, stopped_early
+
+
+# ------------------------------------------------------------------------------
+# 向量化族群：整個族群是一個 (個體數, 特徵數) 的布林矩陣，遺傳算子都是陣列運算
+# ------------------------------------------------------------------------------
+
+def select_tournament(fitness, k, tournsize, rng):
+    """
+    錦標賽選擇（對應 `tools.selTournament`）：每次隨機抽 `tournsize` 個個體，取適應度最高者。
+
+    Returns:
+        np.ndarray: 被選中的 k 個個體索引。
+    """
+    aspirants = rng.integers(0, len(fitness), size=(k, tournsize))
+    return aspirants[np.arange(k), np.argmax(fitness[aspirants], axis=1)]
+
+
+def crossover_two_point(population, cxpb, rng):
+    """
+    兩點交配（對應 `tools.cxTwoPoint`）：相鄰的兩個個體以機率 `cxpb` 交換兩個切點之間的基因。
+
+    Returns:
+        tuple: (交配後的族群（新陣列）, 各個體是否參與交配的布林陣列)。
+    """
+    children = population.copy()
+    n_pairs, n_features = len(population) // 2, population.shape[1]
+    changed = np.zeros(len(population), dtype=bool)
+    if n_pairs == 0 or n_features < 2:
+        return children, changed
+    mate = rng.random(n_pairs) < cxpb
+    # 與 tools.cxTwoPoint 相同：第二個切點少抽一個位置，不小於第一個切點時加一，兩個切點必不相同
+    first_point = rng.integers(1, n_features + 1, size=n_pairs)
+    second_point = rng.integers(1, n_features, size=n_pairs)
+    second_point += second_point >= first_point
+    points = np.sort(np.column_stack([first_point, second_point]), axis=1)
+    genes = np.arange(n_features)
+    swap = mate[:, None] & (genes >= points[:, :1]) & (genes < points[:, 1:])
+    first, second = population[0:2 * n_pairs:2], population[1:2 * n_pairs:2]
+    children[0:2 * n_pairs:2] = np.where(swap, second, first)
+    children[1:2 * n_pairs:2] = np.where(swap, first, second)
+    changed[0:2 * n_pairs:2] = changed[1:2 * n_pairs:2] = mate
+    return children, changed
+
+
+def mutate_flip_bit(population, mutpb, indpb, rng):
+    """
+    位元翻轉突變（對應 `tools.mutFlipBit`）：每個個體以機率 `mutpb` 突變，突變時每個基因以機率 `indpb` 翻轉。
+
+    Returns:
+        tuple: (突變後的族群（就地修改）, 各個體是否突變的布林陣列)。
+    """
+    changed = rng.random(len(population)) < mutpb
+    population ^= (rng.random(population.shape) < indpb) & changed[:, None]
+    return population, changed
+
+
+def _update_hall_of_fame(hof, hof_fitness, population, fitness, size):
+    """保留適應度最高、且互不相同的 `size` 個個體。"""
+    candidates = np.vstack([hof, population])
+    scores = np.concatenate([hof_fitness, fitness])
+    order = np.argsort(-scores, kind='stable')
+    _, first = np.unique(np.packbits(candidates[order], axis=1), axis=0, return_index=True)
+    keep = order[np.sort(first)][:size]
+    return candidates[keep], scores[keep]
+
+
+def _evolve_packed(engine, rng, pop_size, ngen, cxpb, mutpb, fidelity_schedule, patience, hof_size=5,
+                   tournsize=3, indpb=0.05, progress=None):
+    """
+    與 `_evolve` 相同的世代演化迴圈（精度排程、提前停止與名人堂），但族群以布林矩陣表示；
+    切換精度時同樣先在新精度下重新評估整個族群，再重置名人堂並進行選擇。
+
+    Returns:
+        tuple: (最終族群, 最終族群的適應度, 名人堂候選個體（布林矩陣）, 每一代的紀錄列表, 是否提前停止)。
+    """
+    stages = sorted(fidelity_schedule, key=lambda stage: stage[0])
+    stage_idx = 0
+    n_features = engine.n_features
+    pop = rng.random((pop_size, n_features)) < 0.5
+    fitness = np.full(pop_size, np.nan)
+    hof, hof_fitness = np.empty((0, n_features), dtype=bool), np.empty(0)
+    history = []
+    best, stale = -np.inf, 0
+    stopped_early = False
+
+    for gen in range(ngen + 1):
+        gen_start = time.perf_counter()
+        while stage_idx + 1 < len(stages) and (gen >= stages[stage_idx + 1][0] or stale >= patience):
+            stage_idx += 1
+            stale = 0
+        if stale >= patience:
+            stopped_early = True
+            break
+
+        previous_level = engine.level
+        engine.set_level(stages[stage_idx][1])
+        if gen > 0 and engine.level != previous_level:
+            # 親代先在新精度下重新評估，選擇才不會比較到失效的分數
+            fitness = engine.evaluate_population(pop)
+            hof, hof_fitness = _update_hall_of_fame(hof[:0], hof_fitness[:0], pop, fitness, hof_size)
+            best = -np.inf
+
+        if gen > 0:
+            chosen = select_tournament(fitness, pop_size, tournsize, rng)
+            pop, fitness = pop[chosen], fitness[chosen]
+            pop, crossed = crossover_two_point(pop, cxpb, rng)
+            pop, mutated = mutate_flip_bit(pop, mutpb, indpb, rng)
+            fitness[crossed | mutated] = np.nan
+
+        invalid = np.isnan(fitness)
+        if invalid.any():
+            fitness[invalid] = engine.evaluate_population(pop[invalid])
+        hof, hof_fitness = _update_hall_of_fame(hof, hof_fitness, pop, fitness, hof_size)
+
+        gen_best = float(fitness.max())
+        if gen_best > best + 1e-6:
+            best, stale = gen_best, 0
+        else:
+            stale += 1
+
+        history.append({
+            "gen": gen,
+            "rows": engine.level_rows,
+            "max": gen_best,
+            "avg": float(fitness.mean()),
+            "seconds": time.perf_counter() - gen_start,
+        })
+        if progress is not None:
+            progress(history[-1])
+
+    return pop, fitness, hof, history, stopped_early
+
+
+@disk_memoize('genetic_selection', ignore=('n_workers', 'progress'))
+def run_genetic_selection(X, y, n_workers=None, ngen=15, patience=5,
+                          fidelity_schedule=DEFAULT_FIDELITY_SCHEDULE, progress=None,
+                          pop_size=40, representation='deap', random_state=None):
     """
     使用 DEAP 函式庫執行基因演算法進行特徵選擇。
-    使用 Streamlit 的快取來儲存結果。
+    結果依資料內容指紋與參數快取在磁碟上（見 `src.memo`），平行行程數不影響結果，不納入快取的鍵。
+
+    早期世代在分層抽樣的小樣本上排序個體，後期世代與名人堂則使用完整資料，
+    讓執行時間不再隨資料筆數線性成長。
+
+    Args:
+        X (pd.DataFrame): 標準化後的特徵。
+        y (array-like): 編碼後的標籤。
+        n_workers (int, optional): 平行評估的行程數，預設為 CPU 核心數。
+        ngen (int): 最大世代數。
+        patience (int): 最佳適應度連續幾代沒有進步就提前停止。
+        fidelity_schedule (tuple): 評估精度排程，格式為 ((起始世代, 抽樣筆數), ...)，
+            抽樣筆數為 None 代表完整資料。
+        progress (callable, optional): 每一代結束後以該代的紀錄 (gen、rows、max、avg、seconds) 呼叫，
+            可在其中拋出例外以中止演算法。
+        pop_size (int): 族群大小。
+        representation (str): 'deap' 以 DEAP 的個體列表演化；'packed' 以布林矩陣表示整個族群，
+            選擇、交配與突變都是陣列運算，族群與世代數較大時額外負擔較小。
+        random_state (int, optional): 亂數種子；None 時不固定亂數種子。結果會快取，相同資料與參數（包含 None）
+            再次呼叫時直接回傳第一次的結果，不會重新演化。
+
+    Returns:
+        tuple: (選擇的特徵列表, 最佳分數, 評估統計 dict)。
     """
-    n_features = _X.shape[1]
+    if representation not in ('deap', 'packed'):
+        raise ValueError(f"未知的族群表示法：{representation}")
+    n_features = X.shape[1]
+    if representation == 'deap' and random_state is not None:
+        random.seed(random_state)
 
     # --- 工具箱設定 ---
     toolbox = base.Toolbox()
@@ -31,38 +568,201 @@ def run_genetic_selection(_X, _y):
     # 定義如何產生一個族群（由多個個體組成）
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
 
-    # --- 評估函式 ---
-    def evaluate_features(individual):
-        selected_indices = [i for i, bit in enumerate(individual) if bit == 1]
-        if not selected_indices:
-            return 0.0,
+    # --- 執行演算法 ---
+    start = time.perf_counter()
+    sample_sizes = [size for _, size in fidelity_schedule]
+    with FitnessEngine(X, y, n_workers=n_workers, sample_sizes=sample_sizes) as engine:
+        # --- 註冊評估函式與遺傳算子 ---
+        toolbox.register("evaluate", engine.evaluate)
+        toolbox.register("map", engine.map)  # 每一代的評估經由快取與行程池
 
-        X_subset = _X.iloc[:, selected_indices]
-        estimator = RandomForestClassifier(n_estimators=20, random_state=42, n_jobs=-1)
-        score = np.mean(cross_val_score(estimator, X_subset, _y, cv=3, scoring='accuracy'))
-        return score,
+        if representation == 'packed':
+            pop, fitness, hof, history, stopped_early = _evolve_packed(
+                engine, np.random.default_rng(random_state), pop_size=pop_size, ngen=ngen, cxpb=0.5,
+                mutpb=0.2, fidelity_schedule=fidelity_schedule, patience=patience, progress=progress,
+            )
+            candidates = np.vstack([hof, pop[np.argsort(-fitness, kind='stable')[:5]]])
+        else:
+            toolbox.register("mate", tools.cxTwoPoint) # 交配
+            toolbox.register("mutate", tools.mutFlipBit, indpb=0.05) # 突變
+            toolbox.register("select", tools.selTournament, tournsize=3) # 選擇
+            pop, candidates, history, stopped_early = _evolve(
+                toolbox, engine, pop_size=pop_size, ngen=ngen, cxpb=0.5, mutpb=0.2,
+                fidelity_schedule=fidelity_schedule, patience=patience, progress=progress,
+            )
+            candidates += tools.selBest(pop, 5)
 
-    # --- 註冊遺傳算子 ---
-    toolbox.register("evaluate", evaluate_features)
-    toolbox.register("mate", tools.cxTwoPoint) # 交配
-    toolbox.register("mutate", tools.mutFlipBit, indpb=0.05) # 突變
-    toolbox.register("select", tools.selTournament, tournsize=3) # 選擇
+        # 名人堂與最終族群的前幾名一律在完整資料上重新評估後再決定最佳個體
+        engine.set_level(None)
+        full_scores = [score[0] for score in toolbox.map(toolbox.evaluate, candidates)]
+        best_idx = int(np.argmax(full_scores))
 
-    # --- 執行演算法 ---
-    with st.spinner("正在使用 DEAP 核心執行基因演算法...這可能需要幾分鐘。"):
-        pop = toolbox.population(n=40) # 族群大小
-        hof = tools.HallOfFame(1)      # 名人堂，儲存最佳個體
-        stats = tools.Statistics(lambda ind: ind.fitness.values)
-        stats.register("avg", np.mean)
-        stats.register("max", np.max)
-
-        # 執行演算法
-        pop, log = algorithms.eaSimple(pop, toolbox, cxpb=0.5, mutpb=0.2, ngen=15, 
-                                       stats=stats, halloffame=hof, verbose=False)
-
-        best_individual = hof[0]
-        selected_features_mask = np.array(best_individual).astype(bool)
-        selected_features = _X.columns[selected_features_mask].tolist()
-        best_score = best_individual.fitness.values[0]
-
-    return selected_features, best_score
\ No newline at end of file
+    report = engine.report()
+    report.update({
+        "total_seconds": time.perf_counter() - start,
+        "generation_times": [entry["seconds"] for entry in history],
+        "history": history,
+        "generations_run": len(history),
+        "stopped_early": stopped_early,
+        "pop_size": pop_size,
+        "representation": representation,
+    })
+
+    best_individual = candidates[best_idx]
+    selected_features_mask = np.array(best_individual).astype(bool)
+    selected_features = X.columns[selected_features_mask].tolist()
+    best_score = full_scores[best_idx]
+
+    return selected_features, best_score, report
+
+
+# ------------------------------------------------------------------------------
+# 多目標 (NSGA-II)：同時考量加權 F1、特徵數與每筆預測成本
+# ------------------------------------------------------------------------------
+
+def _ensure_nonempty(population):
+    """沒有選擇任何特徵的個體隨機開啟一個特徵，避免空集合以 0 個特徵、0 成本留在柏拉圖前緣。"""
+    for ind in population:
+        if not any(ind):
+            ind[random.randrange(len(ind))] = 1
+    return population
+
+
+def _evolve_nsga2(toolbox, engine, pop_size, ngen, cxpb, mutpb, fidelity_schedule, progress=None):
+    """
+    NSGA-II 世代演化迴圈：以擁擠距離錦標賽 (`tools.selTournamentDCD`) 產生子代，與親代合併後依非支配排序
+    與擁擠距離 (`tools.selNSGA2`) 保留 `pop_size` 個個體。
+
+    精度排程與 `_evolve` 相同：切換精度時先在新精度下重新評估整個族群並重新指派擁擠距離，再進行選擇；
+    多目標沒有單一的最佳分數，因此不提前停止。
+
+    Returns:
+        tuple: (最終族群, 每一代的紀錄列表)。
+    """
+    stages = sorted(fidelity_schedule, key=lambda stage: stage[0])
+    stage_idx = 0
+    pop = _ensure_nonempty(toolbox.population(n=pop_size))
+    history = []
+
+    for gen in range(ngen + 1):
+        gen_start = time.perf_counter()
+        while stage_idx + 1 < len(stages) and gen >= stages[stage_idx + 1][0]:
+            stage_idx += 1
+
+        previous_level = engine.level
+        engine.set_level(stages[stage_idx][1])
+        if gen > 0 and engine.level != previous_level:
+            # 親代先在新精度下重新評估，並重新做非支配排序，選擇才不會比較到失效的分數與擁擠距離
+            for ind, fit in zip(pop, toolbox.map(toolbox.evaluate, pop)):
+                ind.fitness.values = fit
+            pop = toolbox.select(pop, pop_size)
+
+        offspring = []
+        if gen > 0:
+            offspring = tools.selTournamentDCD(pop, len(pop))
+            offspring = _ensure_nonempty(algorithms.varAnd(offspring, toolbox, cxpb, mutpb))
+
+        invalid_ind = [ind for ind in pop + offspring if not ind.fitness.valid]
+        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+        # 非支配排序同時指派擁擠距離，供下一代的 selTournamentDCD 使用
+        pop = toolbox.select(pop + offspring, pop_size)
+
+        scores = [ind.fitness.values[0] for ind in pop]
+        history.append({
+            "gen": gen,
+            "rows": engine.level_rows,
+            "max": max(scores),
+            "avg": float(np.mean(scores)),
+            "front_size": len(tools.sortNondominated(pop, len(pop), first_front_only=True)[0]),
+            "seconds": time.perf_counter() - gen_start,
+        })
+        if progress is not None:
+            progress(history[-1])
+
+    return pop, history
+
+
+@disk_memoize('pareto_selection', ignore=('n_workers', 'progress'))
+def run_pareto_selection(X, y, n_workers=None, ngen=15, fidelity_schedule=DEFAULT_FIDELITY_SCHEDULE,
+                         progress=None, pop_size=40, random_state=None):
+    """
+    以 NSGA-II 進行多目標特徵選擇：最大化加權 F1，同時最小化特徵數與每筆預測走訪的節點數。
+    推論成本採用由樹結構計算的走訪節點數（見 `nodes_per_row`）而非實測的預測時間：
+    實測時間在單次評估中的誤差足以改變支配關係，又會隨適應度一起被快取，使前緣保留分數明顯較差的組合。
+    結果與 `run_genetic_selection` 一樣依資料內容指紋與參數快取在磁碟上。
+
+    演化結束後，最終族群的柏拉圖前緣在完整資料上重新評估並再做一次非支配排序，
+    前緣上的每個特徵組合都可以作為部署的選擇。
+
+    Args:
+        X (pd.DataFrame): 標準化後的特徵。
+        y (array-like): 編碼後的標籤。
+        n_workers (int, optional): 平行評估的行程數，預設為 CPU 核心數。
+        ngen (int): 世代數。
+        fidelity_schedule (tuple): 評估精度排程，格式同 `run_genetic_selection`。
+        progress (callable, optional): 每一代結束後以該代的紀錄 (gen、rows、max、avg、front_size、seconds) 呼叫。
+        pop_size (int): 族群大小，會進位到 4 的倍數（`tools.selTournamentDCD` 的限制）。
+        random_state (int, optional): 亂數種子。
+
+    Returns:
+        tuple: (加權 F1 最高的特徵列表, 其加權 F1, 評估統計 dict)；評估統計的 `pareto_front` 為前緣上的
+            特徵組合列表，每項包含 features、f1、n_features 與 nodes_per_row，依特徵數排序。
+    """
+    n_features = X.shape[1]
+    pop_size = max(4, -(-pop_size // 4) * 4)
+    if random_state is not None:
+        random.seed(random_state)
+
+    toolbox = base.Toolbox()
+    toolbox.register("attr_bool", random.randint, 0, 1)
+    toolbox.register("individual", tools.initRepeat, creator.ParetoIndividual, toolbox.attr_bool, n=n_features)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+
+    start = time.perf_counter()
+    sample_sizes = [size for _, size in fidelity_schedule]
+    with FitnessEngine(X, y, n_workers=n_workers, sample_sizes=sample_sizes, scorer=_pareto_scores) as engine:
+        toolbox.register("evaluate", engine.evaluate)
+        toolbox.register("map", engine.map)
+        toolbox.register("mate", tools.cxTwoPoint)
+        toolbox.register("mutate", tools.mutFlipBit, indpb=0.05)
+        toolbox.register("select", tools.selNSGA2)
+
+        pop, history = _evolve_nsga2(
+            toolbox, engine, pop_size=pop_size, ngen=ngen, cxpb=0.9, mutpb=0.2,
+            fidelity_schedule=fidelity_schedule, progress=progress,
+        )
+
+        # 前緣在完整資料上重新評估（重複的特徵組合只保留一個），再重新排序一次
+        front = tools.sortNondominated(pop, len(pop), first_front_only=True)[0]
+        candidates = list({mask_to_key(ind): creator.ParetoIndividual(ind) for ind in front}.values())
+        engine.set_level(None)
+        for ind, fit in zip(candidates, toolbox.map(toolbox.evaluate, candidates)):
+            ind.fitness.values = fit
+        front = tools.sortNondominated(candidates, len(candidates), first_front_only=True)[0]
+
+    pareto_front = sorted((
+        {
+            "features": X.columns[np.array(ind, dtype=bool)].tolist(),
+            "f1": ind.fitness.values[0],
+            "n_features": int(ind.fitness.values[1]),
+            "nodes_per_row": ind.fitness.values[2],
+        }
+        for ind in front
+    ), key=lambda item: (item["n_features"], -item["f1"]))
+    best = max(pareto_front, key=lambda item: (item["f1"], -item["n_features"]))
+
+    report = engine.report()
+    report.update({
+        "total_seconds": time.perf_counter() - start,
+        "generation_times": [entry["seconds"] for entry in history],
+        "history": history,
+        "generations_run": len(history),
+        "stopped_early": False,
+        "pop_size": pop_size,
+        "representation": 'deap',
+        "objective": 'pareto',
+        "pareto_front": pareto_front,
+    })
+    return best["features"], best["f1"], report
@@ -0,0 +1,287 @@
+"""
+此模組負責以新的擷取資料增量更新既有的模型套件，訓練成本只與新資料量有關，不需重跑整份歷史資料。
+
+- StandardScaler 以 `partial_fit` 併入新資料的統計量；既有樹模型的分割門檻依新舊標準化參數換算，
+  因此更新後的標準化器與所有樹（新舊）一致，舊樹的預測結果不變。
+- LabelEncoder 遇到新的攻擊類別時，新類別附加在既有類別之後，既有類別的編碼不變。
+- 隨機森林：以新資料訓練新增的樹並併入森林；HistGradientBoosting：以 warm start 繼續提升 (boosting)。
+
+套件中的物件可能在工作階段間共用，因此一律建立新物件，不就地修改傳入的套件。
+"""
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.inference import scale_in_place
+
+LABEL_COLUMN = 'Label'
+
+
+def extend_label_encoder(le, labels):
+    """
+    回傳納入新類別的 LabelEncoder 副本；新類別依名稱排序後附加在既有類別之後。
+
+    Returns:
+        tuple: (新的 LabelEncoder, 新增的類別列表)。
+    """
+    known = set(le.classes_)
+    added = sorted({label for label in pd.unique(np.asarray(labels, dtype=object)) if label not in known})
+    new_le = copy.copy(le)
+    # 字串標籤以對照表編碼，不要求 classes_ 排序，附加在後面可保留既有編碼
+    new_le.classes_ = np.concatenate([np.asarray(le.classes_, dtype=object), np.asarray(added, dtype=object)])
+    return new_le, added
+
+
+def _threshold_mapping(old_scaler, new_scaler, features):
+    """
+    回傳 (乘數, 位移)：舊標準化空間的門檻 t 對應到新標準化空間為 t * 乘數 + 位移。
+
+    (x - m_old) / s_old <= t 等價於 (x - m_new) / s_new <= (t * s_old + m_old - m_new) / s_new。
+    """
+    positions = pd.Index(old_scaler.feature_names_in_).get_indexer(features)
+    n = len(old_scaler.feature_names_in_)
+
+    def params(scaler):
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n)
+        return mean[positions], scale[positions]
+
+    old_mean, old_scale = params(old_scaler)
+    new_mean, new_scale = params(new_scaler)
+    return old_scale / new_scale, (old_mean - new_mean) / new_scale
+
+
+# ------------------------------------------------------------------------------
+# 隨機森林
+# ------------------------------------------------------------------------------
+
+def _rebuild_tree(estimator, n_classes, class_columns=None, factor=None, shift=None):
+    """
+    複製一棵決策樹，可同時換算分割門檻並將類別欄位擴充到 `n_classes`。
+
+    Args:
+        class_columns (np.ndarray, optional): 原本每個類別欄位對應的全域類別編碼；預設為 0..k-1。
+        factor, shift (np.ndarray, optional): 以特徵索引對應的門檻換算參數。
+    """
+    from sklearn.tree._tree import Tree
+
+    state = estimator.tree_.__getstate__()
+    nodes = state['nodes'].copy()
+    if factor is not None:
+        split = nodes['feature'] >= 0
+        features = nodes['feature'][split]
+        nodes['threshold'][split] = nodes['threshold'][split] * factor[features] + shift[features]
+
+    values = state['values']
+    if class_columns is None:
+        class_columns = np.arange(values.shape[2])
+    padded = np.zeros((values.shape[0], values.shape[1], n_classes), dtype=values.dtype)
+    padded[:, :, class_columns] = values
+
+    tree = Tree(estimator.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+    tree.__setstate__({**state, 'nodes': nodes, 'values': padded})
+
+    new_estimator = copy.copy(estimator)
+    new_estimator.tree_ = tree
+    new_estimator.classes_ = np.arange(n_classes)
+    new_estimator.n_classes_ = n_classes
+    return new_estimator
+
+
+def _extend_forest(model, X, y, n_classes, factor, shift, n_new_trees, random_state):
+    """以新資料訓練 `n_new_trees` 棵樹，與換算後的既有樹合併為新的森林。"""
+    new_trees = copy.deepcopy(model).set_params(
+        n_estimators=n_new_trees, warm_start=False, random_state=random_state
+    ).fit(X, y)
+
+    # 新資料不一定包含所有類別：新樹只有實際出現的類別欄位，合併前對齊到全域編碼
+    old_columns = np.asarray(model.classes_, dtype=int)
+    estimators = [_rebuild_tree(tree, n_classes, old_columns, factor, shift) for tree in model.estimators_]
+    new_columns = np.asarray(new_trees.classes_, dtype=int)
+    estimators += [_rebuild_tree(tree, n_classes, new_columns) for tree in new_trees.estimators_]
+
+    forest = copy.copy(model)
+    forest.estimators_ = estimators
+    forest.n_estimators = len(estimators)
+    forest.classes_ = np.arange(n_classes)
+    forest.n_classes_ = n_classes
+    return forest
+
+
+# ------------------------------------------------------------------------------
+# HistGradientBoosting
+# ------------------------------------------------------------------------------
+
+def _zero_predictor(template):
+    """只有一個葉節點、輸出 0 的樹，用於補齊新增類別在既有迭代中的位置。"""
+    from sklearn.ensemble._hist_gradient_boosting.predictor import TreePredictor
+
+    nodes = np.zeros(1, dtype=template.nodes.dtype)
+    nodes['is_leaf'] = 1
+    # 樣本數沿用同一迭代的樹，SHAP 的 TreeExplainer 需要葉節點的樣本數
+    nodes['count'] = template.nodes['count'][0]
+    return TreePredictor(nodes, template.binned_left_cat_bitsets, template.raw_left_cat_bitsets)
+
+
+def _expand_boosting_classes(model, n_classes):
+    """將提升模型的每次迭代補齊為 `n_classes` 棵樹；新類別在既有迭代的輸出為 0。"""
+    predictors = model._predictors
+    baseline = np.asarray(model._baseline_prediction, dtype=np.float64).reshape(1, -1)
+    if model.n_trees_per_iteration_ == 1:
+        # 二元模型 sigmoid(f) 等同於多類別 softmax([0, f])，轉換後既有類別的機率不變
+        predictors = [[_zero_predictor(trees[0])] + trees for trees in predictors]
+        baseline = np.hstack([np.zeros((1, 1)), baseline])
+    n_missing = n_classes - baseline.shape[1]
+    model._predictors = [trees + [_zero_predictor(trees[0]) for _ in range(n_missing)] for trees in predictors]
+    # 新類別的起始分數取既有類別中最低者（視為罕見類別），之後由新資料的提升修正
+    model._baseline_prediction = np.hstack([baseline, np.full((1, n_missing), baseline.min())]).astype(
+        model._baseline_prediction.dtype
+    )
+    model.n_trees_per_iteration_ = n_classes
+
+
+def _continue_boosting(model, X, y, n_classes, factor, shift, n_new_iter):
+    """以 warm start 在新資料上繼續提升 `n_new_iter` 次迭代。"""
+    from sklearn.preprocessing import LabelEncoder
+
+    model = copy.deepcopy(model)
+    for predictor in (predictor for trees in model._predictors for predictor in trees):
+        split = predictor.nodes['is_leaf'] == 0
+        features = predictor.nodes['feature_idx'][split]
+        predictor.nodes['num_threshold'][split] = (
+            predictor.nodes['num_threshold'][split] * factor[features] + shift[features]
+        )
+    if n_classes > len(model.classes_):
+        _expand_boosting_classes(model, n_classes)
+    # 既有迭代在新資料上的輸出，以原始數值與換算後的門檻精確計算
+    raw_predictions = np.asfortranarray(model._raw_predict(X))
+
+    # scikit-learn 的 warm start 會以新資料重新計算類別與分箱，以下兩處改寫只在這次 fit 期間生效：
+    # 1. 類別固定為全域編碼，新資料缺少某些類別時也不會改變每次迭代的樹數量
+    # 2. 既有樹的分箱門檻對應舊的分箱，無法在新的分箱上精確預測，因此起始預測值改用上面預先算好的結果
+    def encode_y(y):
+        model._label_encoder = LabelEncoder().fit(np.arange(n_classes))
+        model.classes_ = model._label_encoder.classes_
+        model.n_trees_per_iteration_ = 1 if n_classes <= 2 else n_classes
+        return np.asarray(y, dtype=np.float64)
+
+    def raw_predict(X, n_threads=None):
+        if getattr(model, '_in_fit', False) and X.shape[0] == raw_predictions.shape[0]:
+            return raw_predictions.copy(order='F')
+        return type(model)._raw_predict(model, X, n_threads)
+
+    # 已收斂的模型在新資料上多半預測得很有把握，hessian 接近 0，未正則化時葉節點值會暴增；
+    # 繼續訓練期間至少使用 1.0 的 L2 正則化
+    early_stopping, l2_regularization = model.early_stopping, model.l2_regularization
+    model.set_params(warm_start=True, max_iter=model.n_iter_ + n_new_iter, early_stopping=False,
+                     l2_regularization=max(l2_regularization, 1.0))
+    model._encode_y = encode_y
+    model._raw_predict = raw_predict
+    try:
+        model.fit(X, y)
+    finally:
+        del model._encode_y, model._raw_predict
+        model.set_params(warm_start=False, early_stopping=early_stopping, l2_regularization=l2_regularization)
+    return model
+
+
+# ------------------------------------------------------------------------------
+# 套件更新
+# ------------------------------------------------------------------------------
+
+def supports_incremental(model):
+    """模型是否支援增量更新（scikit-learn 的隨機森林或 HistGradientBoosting）。"""
+    return hasattr(model, 'estimators_') or hasattr(model, '_predictors')
+
+
+def update_model_package(package, new_df, n_new_trees=20, n_new_iter=50, eval_fraction=0.2, random_state=None):
+    """
+    以新的擷取資料增量更新模型套件。
+
+    Args:
+        package (dict): 既有的模型套件（model、scaler、le、selected_features）。
+        new_df (pd.DataFrame): 清理後的新資料，需包含標準化器的所有特徵欄位與 Label。
+        n_new_trees (int): 隨機森林新增的樹數量；新資料含有新類別時，至少新增與既有森林相同數量的樹。
+        n_new_iter (int): 提升模型繼續訓練的迭代次數。
+        eval_fraction (float): 保留不參與訓練、用來比較更新前後 F1 的新資料比例。
+        random_state (int, optional): 新增樹的隨機種子；預設依既有樹數量決定，避免與既有樹重複。
+
+    Returns:
+        tuple: (新的模型套件, 更新統計 dict；`added_class_recall` 為各新類別在保留資料上的召回率)。
+
+    Raises:
+        ValueError: 模型類型不支援增量更新，或新資料缺少特徵欄位。
+    """
+    from sklearn.metrics import f1_score
+
+    model, scaler, le = package['model'], package['scaler'], package['le']
+    selected_features = list(package['selected_features'])
+    if not supports_incremental(model):
+        raise ValueError(f"{type(model).__name__} 不支援增量更新，請改用完整訓練。")
+    missing = [column for column in scaler.feature_names_in_ if column not in new_df.columns]
+    if missing:
+        raise ValueError(f"新資料缺少 {len(missing)} 個特徵欄位：{', '.join(missing[:5])}")
+
+    start = time.perf_counter()
+    labels = new_df[LABEL_COLUMN].astype(str).to_numpy()
+    new_le, added_classes = extend_label_encoder(le, labels)
+    y = new_le.transform(labels)
+
+    # 標準化器併入新資料的統計量（只需新資料，不需歷史資料）
+    new_scaler = copy.deepcopy(scaler)
+    new_scaler.partial_fit(new_df[list(scaler.feature_names_in_)])
+    factor, shift = _threshold_mapping(scaler, new_scaler, selected_features)
+
+    def scaled(rows, scaler):
+        X = new_df[selected_features].to_numpy(dtype=np.float64)[rows]
+        scale_in_place(X, scaler, selected_features)
+        return pd.DataFrame(X, columns=selected_features, copy=False)
+
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(new_df))
+    n_eval = int(len(new_df) * eval_fraction)
+    eval_rows, train_rows = order[:n_eval], order[n_eval:]
+    X = scaled(train_rows, new_scaler)
+
+    n_classes = len(new_le.classes_)
+    if hasattr(model, 'estimators_'):
+        if random_state is None:
+            random_state = len(model.estimators_)
+        if added_classes:
+            # 森林以所有樹的機率平均投票，既有的樹對新類別的機率都是 0；新增的樹太少時新類別永遠無法勝出
+            n_new_trees = max(n_new_trees, len(model.estimators_))
+        new_model = _extend_forest(model, X, y[train_rows], n_classes, factor, shift, n_new_trees, random_state)
+        size_before, size_after = len(model.estimators_), len(new_model.estimators_)
+    else:
+        new_model = _continue_boosting(model, X, y[train_rows], n_classes, factor, shift, n_new_iter)
+        size_before, size_after = model.n_iter_, new_model.n_iter_
+
+    # 保留的新資料分別以更新前（舊標準化參數）與更新後的模型評估
+    f1_before = f1_after = float('nan')
+    added_class_recall = {label: float('nan') for label in added_classes}
+    if n_eval:
+        f1_before = f1_score(y[eval_rows], model.predict(scaled(eval_rows, scaler)), average='weighted')
+        predicted = new_model.predict(scaled(eval_rows, new_scaler))
+        f1_after = f1_score(y[eval_rows], predicted, average='weighted')
+        # 加權 F1 幾乎不受少數新類別影響，新類別是否學到需另外看召回率
+        for label, code in zip(added_classes, new_le.transform(added_classes)):
+            actual = y[eval_rows] == code
+            if actual.any():
+                added_class_recall[label] = float((predicted[actual] == code).mean())
+
+    report = {
+        'rows': len(new_df),
+        'train_rows': len(train_rows),
+        'added_classes': added_classes,
+        'added_class_recall': added_class_recall,
+        'size_before': size_before,
+        'size_after': size_after,
+        'f1_before': f1_before,
+        'f1_after': f1_after,
+        'seconds': time.perf_counter() - start,
+    }
+    new_package = {**package, 'model': new_model, 'scaler': new_scaler, 'le': new_le}
+    new_package.pop('explainer', None)
+    return new_package, report
@@ -0,0 +1,179 @@
+"""此模組負責批次推論：依欄位映射組成特徵矩陣、標準化並預測，不依賴 Streamlit，可供介面與批次腳本共用。"""
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# 欄位映射中代表「未提供此特徵」的值，未映射的特徵以 0 填補
+UNMAPPED = '未映射'
+BENIGN_LABEL = 'Benign'
+RESULT_COLUMN = '分析結果'
+PREDICTION_COLUMN = 'Predicted_Label'
+NORMAL_TEXT = '正常'
+ATTACK_TEXT = '攻擊'
+
+
+def build_model_matrix(df, column_mapping, selected_features, scaler):
+    """
+    依欄位映射將上傳資料組成模型所需的特徵矩陣，並就地完成標準化。
+
+    只組出模型使用的 `selected_features` 欄位：StandardScaler 對每個欄位獨立縮放，
+    因此直接套用對應欄位的平均值與標準差，結果與先組出完整矩陣再 `scaler.transform` 相同。
+    含有 NaN/Infinity 的列會被排除。
+
+    Args:
+        df (pd.DataFrame): 上傳的原始資料。
+        column_mapping (dict): 模型特徵 -> 上傳檔案欄位名稱（或 UNMAPPED）。
+        selected_features (list): 模型使用的特徵，決定矩陣欄位順序。
+        scaler (StandardScaler): 訓練時擬合的標準化器。
+
+    Returns:
+        tuple: (標準化後的特徵 DataFrame（索引為有效列的原始索引）, 有效列的布林遮罩)。
+    """
+    X = np.empty((len(df), len(selected_features)), dtype=np.float64)
+    for j, feature in enumerate(selected_features):
+        source = column_mapping.get(feature, UNMAPPED)
+        if source == UNMAPPED:
+            X[:, j] = 0.0
+        else:
+            X[:, j] = pd.to_numeric(df[source], errors='coerce')
+
+    valid = np.isfinite(X).all(axis=1)
+    if not valid.all():
+        X = X[valid]
+
+    scale_in_place(X, scaler, selected_features)
+    return pd.DataFrame(X, index=df.index[valid], columns=selected_features, copy=False), valid
+
+
+def scale_in_place(X, scaler, features):
+    """
+    以 StandardScaler 的參數就地標準化 `X` 中對應 `features` 的欄位（與 `scaler.transform` 的運算相同）。
+    """
+    positions = pd.Index(scaler.feature_names_in_).get_indexer(features)
+    if scaler.mean_ is not None:
+        X -= scaler.mean_[positions]
+    if scaler.scale_ is not None:
+        X /= scaler.scale_[positions]
+    return X
+
+
+def predict_labels(model, le, X):
+    """
+    預測並解碼為原始標籤名稱。
+
+    Returns:
+        np.ndarray: 預測的標籤名稱。
+    """
+    return le.classes_[model.predict(X)]
+
+
+def label_results(labels):
+    """將預測標籤向量化地對應為「正常」/「攻擊」。"""
+    return np.where(labels == BENIGN_LABEL, NORMAL_TEXT, ATTACK_TEXT)
+
+
+def score_batch(df, column_mapping, model, scaler, le, selected_features):
+    """
+    對一批流量資料執行完整的推論流程。
+
+    Args:
+        df (pd.DataFrame): 上傳的原始資料。
+        column_mapping (dict): 模型特徵 -> 上傳檔案欄位名稱（或 UNMAPPED）。
+        model: 已訓練的分類器。
+        scaler (StandardScaler): 訓練時擬合的標準化器。
+        le (LabelEncoder): 標籤編碼器。
+        selected_features (list): 模型使用的特徵。
+
+    Returns:
+        tuple: (附上 Predicted_Label 與 分析結果 欄位的有效列結果, 餵入模型的標準化特徵 DataFrame)。
+            沒有任何有效列時，兩者皆為空的 DataFrame。
+    """
+    features, valid = build_model_matrix(df, column_mapping, selected_features, scaler)
+    results = df[valid] if not valid.all() else df.copy()
+    if features.empty:
+        return results, features
+
+    labels = predict_labels(model, le, features)
+    results[PREDICTION_COLUMN] = labels
+    results[RESULT_COLUMN] = label_results(labels)
+    return results, features
+
+
+def score_csv_stream(source, column_mapping, model, scaler, le, selected_features, output_path,
+                     chunksize=100_000, preview_rows=1000, attack_rows=1000):
+    """
+    以分塊串流方式對大型 CSV 執行推論，結果逐塊附加寫入磁碟，記憶體中只保留統計與有限的預覽。
+
+    Args:
+        source (str or file-like): 待分析的 CSV 路徑或檔案物件（例如 Streamlit 的 UploadedFile）。
+        column_mapping (dict): 模型特徵 -> 上傳檔案欄位名稱（或 UNMAPPED）。
+        model: 已訓練的分類器。
+        scaler (StandardScaler): 訓練時擬合的標準化器。
+        le (LabelEncoder): 標籤編碼器。
+        selected_features (list): 模型使用的特徵。
+        output_path (str): 結果 CSV 的輸出路徑。
+        chunksize (int): 每個區塊的列數。
+        preview_rows (int): 保留的前幾筆結果預覽。
+        attack_rows (int): 另外保留的攻擊流量筆數（供 SHAP 深入分析）。
+
+    Returns:
+        dict: rows_read、rows_scored、label_counts（各預測標籤筆數）、result_counts（正常/攻擊筆數）、
+            preview（預覽與攻擊流量結果，索引為原始檔案的列號）、features（預覽列的標準化特徵）、
+            output_path 與 seconds。
+    """
+    start = time.perf_counter()
+    rows_read = 0
+    rows_scored = 0
+    label_counts = Counter()
+    preview_parts, feature_parts = [], []
+    n_preview, n_attacks = 0, 0
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        header = True
+        for chunk in pd.read_csv(source, chunksize=chunksize, low_memory=False):
+            rows_read += len(chunk)
+            results, features = score_batch(chunk, column_mapping, model, scaler, le, selected_features)
+            if features.empty:
+                continue
+            rows_scored += len(results)
+            label_counts.update(results[PREDICTION_COLUMN].value_counts().to_dict())
+            results.to_csv(out, header=header, index=False)
+            header = False
+
+            # 保留有限的預覽：前 preview_rows 筆結果，以及前 attack_rows 筆攻擊流量
+            keep = np.zeros(len(results), dtype=bool)
+            if n_preview < preview_rows:
+                keep[:preview_rows - n_preview] = True
+                n_preview += int(keep.sum())
+            if n_attacks < attack_rows:
+                attack_positions = np.flatnonzero(results[RESULT_COLUMN].to_numpy() == ATTACK_TEXT)
+                attack_positions = attack_positions[:attack_rows - n_attacks]
+                keep[attack_positions] = True
+                n_attacks += len(attack_positions)
+            if keep.any():
+                preview_parts.append(results[keep])
+                feature_parts.append(features[keep])
+
+    if preview_parts:
+        preview = pd.concat(preview_parts)
+        features = pd.concat(feature_parts)
+    else:
+        preview = pd.DataFrame()
+        features = pd.DataFrame(columns=selected_features)
+
+    result_counts = Counter()
+    for label, count in label_counts.items():
+        result_counts[NORMAL_TEXT if label == BENIGN_LABEL else ATTACK_TEXT] += count
+
+    return {
+        "rows_read": rows_read,
+        "rows_scored": rows_scored,
+        "label_counts": dict(label_counts),
+        "result_counts": dict(result_counts),
+        "preview": preview,
+        "features": features,
+        "output_path": output_path,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,369 @@
+"""
+此模組負責在背景工作行程中執行耗時的工作（基因演算法特徵選擇、模型訓練），不佔用 Streamlit 的執行緒。
+
+- 每個工作是 `data/.cache/jobs/<工作 ID>/` 目錄：輸入 (`input.joblib`)、狀態與進度 (`status.json`)、
+  結果 (`result.joblib`) 與工作行程的輸出 (`worker.log`)。
+- 工作 ID 由工作種類與輸入內容的指紋組成：相同的工作不會重複執行，重新整理頁面或其他工作階段
+  送出相同的工作時會接上正在執行或已完成的工作。
+- 工作行程以 `python -m src.jobs <工作目錄>` 啟動，與伺服器行程分離；取消時建立取消旗標並送出 SIGTERM。
+"""
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import traceback
+
+from src.memo import fingerprint
+
+JOBS_DIR = os.path.join('data', '.cache', 'jobs')
+# 保留最近幾個已結束的工作（含結果），更舊的在送出新工作時刪除
+KEEP_FINISHED_JOBS = 20
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+_STATUS_FILE = 'status.json'
+_INPUT_FILE = 'input.joblib'
+_RESULT_FILE = 'result.joblib'
+_CANCEL_FILE = 'cancel'
+_LOG_FILE = 'worker.log'
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 由本行程啟動的工作行程，查詢狀態時回收已結束的行程
+_processes = {}
+
+
+class JobCancelled(Exception):
+    """工作被取消。"""
+
+
+def _job_dir(job_id, jobs_dir=JOBS_DIR):
+    return os.path.join(jobs_dir, job_id)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(job_id, pid):
+    process = _processes.get(job_id)
+    if process is not None:
+        return process.poll() is None
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobReporter:
+    """
+    工作函式用來回報進度的物件，由工作行程建立並作為第一個參數傳入工作函式。
+
+    每次回報都會寫入 `status.json`，並檢查取消旗標。
+    """
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.status_path = os.path.join(job_dir, _STATUS_FILE)
+        self.status = _read_json(self.status_path) or {}
+
+    def _save(self, **fields):
+        self.status.update(fields, updated=time.time())
+        _write_json(self.status_path, self.status)
+
+    def check_cancelled(self):
+        """已要求取消時拋出 JobCancelled。"""
+        if os.path.exists(os.path.join(self.job_dir, _CANCEL_FILE)):
+            raise JobCancelled()
+
+    def update(self, fraction=None, message=None, record=None):
+        """
+        回報進度。
+
+        Args:
+            fraction (float, optional): 完成比例 (0 ~ 1)，用來估計剩餘時間。
+            message (str, optional): 目前進度的說明。
+            record (dict, optional): 附加到進度紀錄的一筆資料（例如每一代的分數）。
+
+        Raises:
+            JobCancelled: 已要求取消。
+        """
+        fields = {}
+        if fraction is not None:
+            elapsed = time.time() - self.status.get('started', time.time())
+            fields['fraction'] = fraction
+            fields['eta_seconds'] = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+        if message is not None:
+            fields['message'] = message
+        if record is not None:
+            fields['history'] = self.status.get('history', []) + [record]
+        self._save(**fields)
+        self.check_cancelled()
+
+
+def _task_functions():
+    """工作種類與對應的工作函式；工作函式的第一個參數為 JobReporter，回傳值會保存為工作結果。"""
+    return {
+        'genetic_selection': genetic_selection_task,
+        'train_model': train_model_task,
+    }
+
+
+def submit_job(task, **kwargs):
+    """
+    送出背景工作；相同種類與輸入的工作正在執行或已完成時直接回傳其 ID。
+
+    Args:
+        task (str): 工作種類，見 `_task_functions`。
+        **kwargs: 傳給工作函式的參數，會以 joblib 存到工作目錄。
+
+    Returns:
+        str: 工作 ID。
+
+    Raises:
+        ValueError: 未知的工作種類。
+    """
+    import joblib
+
+    if task not in _task_functions():
+        raise ValueError(f"未知的工作種類：{task}")
+    job_id = f"{task}-{fingerprint(sorted(kwargs.items()))[:16]}"
+    status = job_status(job_id)
+    if status is not None and status['state'] in (PENDING, RUNNING, DONE):
+        return job_id
+
+    job_dir = _job_dir(job_id)
+    shutil.rmtree(job_dir, ignore_errors=True)
+    os.makedirs(job_dir)
+    joblib.dump({'task': task, 'kwargs': kwargs}, os.path.join(job_dir, _INPUT_FILE))
+    now = time.time()
+    _write_json(os.path.join(job_dir, _STATUS_FILE), {
+        'job_id': job_id, 'task': task, 'state': PENDING, 'submitted': now, 'updated': now,
+    })
+
+    # 工作行程沿用目前的工作目錄（資料與快取路徑皆為相對路徑），並確保可以匯入本專案的 src 套件
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [_PROJECT_ROOT, env.get('PYTHONPATH')]))
+    with open(os.path.join(job_dir, _LOG_FILE), 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'src.jobs', job_dir],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=env,
+            start_new_session=True,  # 伺服器收到 Ctrl+C 時不連帶中斷工作
+        )
+    _processes[job_id] = process
+    prune_jobs()
+    return job_id
+
+
+def job_status(job_id):
+    """
+    工作的狀態與進度。
+
+    Returns:
+        dict or None: state、message、fraction、eta_seconds、history、error 等欄位；工作不存在時為 None。
+            工作行程已結束卻未回報結果時，狀態會改為 cancelled（已要求取消）或 failed。
+    """
+    job_dir = _job_dir(job_id)
+    status = _read_json(os.path.join(job_dir, _STATUS_FILE))
+    if status is None or status['state'] in FINISHED_STATES:
+        return status
+    # 工作行程啟動後才會寫入 pid，由其他伺服器行程送出的工作給予啟動的緩衝時間；
+    # 兩次讀取之間工作可能剛好結束，行程不在時重新讀一次狀態
+    if not _pid_alive(job_id, status.get('pid')) and (job_id in _processes or time.time() - status['submitted'] > 30):
+        status = _read_json(os.path.join(job_dir, _STATUS_FILE)) or status
+        if status['state'] not in FINISHED_STATES:
+            cancelled = os.path.exists(os.path.join(job_dir, _CANCEL_FILE))
+            status.update(state=CANCELLED if cancelled else FAILED,
+                          error=None if cancelled else "工作行程意外結束，詳見 worker.log。")
+            _write_json(os.path.join(job_dir, _STATUS_FILE), status)
+    return status
+
+
+def cancel_job(job_id):
+    """要求取消工作：建立取消旗標並通知工作行程，工作行程在下一次回報進度或收到訊號時結束。"""
+    job_dir = _job_dir(job_id)
+    status = _read_json(os.path.join(job_dir, _STATUS_FILE))
+    if status is None or status['state'] in FINISHED_STATES:
+        return
+    open(os.path.join(job_dir, _CANCEL_FILE), 'w').close()
+    if status.get('pid') and _pid_alive(job_id, status['pid']):
+        try:
+            os.kill(status['pid'], signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def load_job_result(job_id):
+    """
+    已完成工作的結果。
+
+    Raises:
+        RuntimeError: 工作尚未完成或未成功。
+    """
+    import joblib
+
+    status = job_status(job_id)
+    if status is None or status['state'] != DONE:
+        raise RuntimeError(f"工作 {job_id} 尚未完成")
+    return joblib.load(os.path.join(_job_dir(job_id), _RESULT_FILE))
+
+
+def prune_jobs(keep=KEEP_FINISHED_JOBS, jobs_dir=JOBS_DIR):
+    """刪除較舊的已結束工作，只保留最近的 `keep` 個。"""
+    finished = []
+    for job_id in os.listdir(jobs_dir) if os.path.isdir(jobs_dir) else ():
+        status = _read_json(os.path.join(jobs_dir, job_id, _STATUS_FILE))
+        if status is not None and status['state'] in FINISHED_STATES:
+            finished.append((status.get('updated', 0), job_id))
+    for _, job_id in sorted(finished, reverse=True)[keep:]:
+        shutil.rmtree(os.path.join(jobs_dir, job_id), ignore_errors=True)
+
+
+# ------------------------------------------------------------------------------
+# 工作函式
+# ------------------------------------------------------------------------------
+
+def genetic_selection_task(reporter, X, y, le, scaler, ngen, patience, fidelity_schedule,
+                           pop_size=40, representation='deap', screening=None, objective='accuracy'):
+    """
+    背景執行基因演算法特徵選擇，每一代回報分數與進度。
+
+    `screening` 不為 None 時，先以 `src.feature_screening.screen_features(X, y, **screening)` 預篩選特徵，
+    基因演算法只在保留的特徵中搜尋；並各量測一次全部特徵與保留特徵的適應度評估耗時。
+    `objective` 為 'pareto' 時改以 NSGA-II 同時最佳化加權 F1、特徵數與每筆預測成本
+    （見 `src.feature_selector.run_pareto_selection`），report 中附有柏拉圖前緣。
+
+    Returns:
+        dict: selected_features、best_score、report、screening（預篩選統計，未預篩選時為 None），
+            以及還原工作階段所需的 le、scaler 與 num_total_features。
+    """
+    from src.feature_screening import screen_features
+    from src.feature_selector import fitness_seconds, run_genetic_selection, run_pareto_selection
+    from src.preprocessing import take
+
+    screening_report = None
+    if screening is not None:
+        reporter.update(fraction=0.0, message="以過濾法預篩選特徵...")
+        screening_report = screen_features(X, y, **screening)
+        X_search = take(X, columns=screening_report['kept'])
+        reporter.update(fraction=0.0, message="量測預篩選前後的評估耗時...")
+        screening_report['eval_seconds_before'] = fitness_seconds(X, y)
+        screening_report['eval_seconds_after'] = fitness_seconds(X_search, y)
+    else:
+        X_search = X
+
+    def on_generation(entry):
+        # 提前停止時實際世代數會較少，完成比例以最大世代數估計
+        reporter.update(
+            fraction=min((entry['gen'] + 1) / (ngen + 2), 1.0),
+            message=f"第 {entry['gen']} / {ngen} 代：最佳 {entry['max']:.4f}，平均 {entry['avg']:.4f}",
+            record=entry,
+        )
+
+    reporter.update(fraction=0.0, message="執行基因演算法中...")
+    if objective == 'pareto':
+        selected_features, best_score, report = run_pareto_selection(
+            X_search, y, ngen=ngen, fidelity_schedule=fidelity_schedule, progress=on_generation, pop_size=pop_size,
+        )
+    else:
+        selected_features, best_score, report = run_genetic_selection(
+            X_search, y, ngen=ngen, patience=patience, fidelity_schedule=fidelity_schedule, progress=on_generation,
+            pop_size=pop_size, representation=representation,
+        )
+    return {
+        'selected_features': selected_features, 'best_score': best_score, 'report': report,
+        'screening': screening_report, 'le': le, 'scaler': scaler, 'num_total_features': X.shape[1],
+    }
+
+
+def train_model_task(reporter, X, y, class_names, backend, le, scaler, selected_features,
+                     train_rows=None, test_rows=None):
+    """
+    背景訓練並評估模型。
+
+    `train_rows`/`test_rows` 未提供時以分層抽樣分割；提供時（例如訓練列經過 `src.sampling` 縮減）直接使用，
+    測試列維持原本的類別分佈。
+
+    Returns:
+        dict: metrics、model、cm_df，以及還原工作階段所需的 le、scaler 與 selected_features。
+    """
+    from src.model_trainer import train_and_evaluate
+    from src.preprocessing import split_indices, take
+
+    reporter.update(fraction=0.0, message="分割訓練/測試資料...")
+    # 以列索引分割，直接從（記憶體映射的）輸入取出訓練與測試資料
+    if train_rows is None or test_rows is None:
+        train_rows, test_rows = split_indices(y)
+    X_train, X_test = take(X, train_rows), take(X, test_rows)
+    y_train, y_test = y[train_rows], y[test_rows]
+    reporter.update(fraction=0.1, message="模型訓練與評估中...")
+    metrics, model, cm_df = train_and_evaluate(X_train, X_test, y_train, y_test, class_names, backend=backend)
+    return {
+        'metrics': metrics, 'model': model, 'cm_df': cm_df,
+        'le': le, 'scaler': scaler, 'selected_features': selected_features,
+    }
+
+
+# ------------------------------------------------------------------------------
+# 工作行程
+# ------------------------------------------------------------------------------
+
+def _raise_cancelled(signum, frame):
+    raise JobCancelled()
+
+
+def run_job(job_dir):
+    """在目前行程中執行工作目錄中的工作，並將結果與最終狀態寫回工作目錄。"""
+    import joblib
+
+    signal.signal(signal.SIGTERM, _raise_cancelled)
+    reporter = JobReporter(job_dir)
+    try:
+        reporter._save(state=RUNNING, started=time.time(), pid=os.getpid())
+        reporter.check_cancelled()
+        # 以記憶體映射讀取輸入：大型特徵矩陣不會再複製一份到工作行程的記憶體中
+        payload = joblib.load(os.path.join(job_dir, _INPUT_FILE), mmap_mode='r')
+        result = _task_functions()[payload['task']](reporter, **payload['kwargs'])
+        result_path = os.path.join(job_dir, _RESULT_FILE)
+        joblib.dump(result, f"{result_path}.tmp")
+        os.replace(f"{result_path}.tmp", result_path)
+        reporter._save(state=DONE, fraction=1.0, eta_seconds=0.0, message="完成")
+    except JobCancelled:
+        reporter._save(state=CANCELLED, message="已取消")
+    except Exception as e:
+        traceback.print_exc()
+        reporter._save(state=FAILED, error=f"{type(e).__name__}: {e}")
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # 輸入只在執行時需要，結束後刪除以節省磁碟空間
+        try:
+            os.remove(os.path.join(job_dir, _INPUT_FILE))
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    run_job(sys.argv[1])
@@ -0,0 +1,197 @@
+"""
+此模組提供以輸入內容指紋為鍵、保存在磁碟上的函式結果快取（memoization），取代無法辨識大型參數的
+`st.cache_data`（底線開頭的參數不會被雜湊，不同資料集可能取回前一份資料的結果）。
+
+- 鍵 = 函式名稱 + 版本 + scikit-learn 版本 + 每個參數的內容指紋（資料的形狀、欄位、型別與內容雜湊，
+  其餘參數的值）。
+- 結果以 joblib 存放在 `data/.cache/memo/<函式名稱>/`，總大小超過上限時刪除最久未使用的結果；
+  上限可用環境變數 IDS_MEMO_CACHE_MB 設定。
+- 同一個鍵同時只會計算一次，其他呼叫等待並直接取用結果。
+"""
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+MEMO_CACHE_DIR = os.path.join('data', '.cache', 'memo')
+MEMO_BUDGET_ENV = 'IDS_MEMO_CACHE_MB'
+DEFAULT_MEMO_BUDGET_MB = 2048
+
+# 小於此大小的陣列雜湊完整內容；更大的陣列雜湊抽樣列與每欄的總和
+FULL_HASH_MAX_BYTES = 64 * 1024 * 1024
+SAMPLE_ROWS = 4096
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def _key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _update_array(digest, array):
+    array = np.asarray(array)
+    digest.update(f"{array.dtype.str}{array.shape}".encode('utf-8'))
+    if array.dtype == object:
+        # 字串等物件陣列：以 pandas 的向量化雜湊取得每個元素的 64 位元雜湊
+        array = pd.util.hash_array(array.ravel()).reshape(array.shape)
+    if array.nbytes <= FULL_HASH_MAX_BYTES:
+        digest.update(np.ascontiguousarray(array).tobytes())
+        return
+    # 大型陣列：平均間隔抽樣的列（含頭尾）加上每欄的總和，改動任何一個數值幾乎都會改變總和
+    rows = np.unique(np.linspace(0, len(array) - 1, SAMPLE_ROWS).astype(np.int64))
+    digest.update(np.ascontiguousarray(array[rows]).tobytes())
+    if array.dtype.kind in 'biufc':
+        digest.update(np.ascontiguousarray(array.sum(axis=0, dtype=np.float64)).tobytes())
+
+
+def _update(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(f"DataFrame{value.shape}".encode('utf-8'))
+        for column in value.columns:
+            digest.update(repr(column).encode('utf-8'))
+            _update(digest, value[column])
+    elif isinstance(value, pd.Series):
+        digest.update(f"Series{value.name!r}{value.dtype}".encode('utf-8'))
+        if isinstance(value.dtype, pd.CategoricalDtype):
+            _update_array(digest, np.asarray(value.cat.categories, dtype=object))
+            _update_array(digest, value.cat.codes.to_numpy())
+        else:
+            _update_array(digest, value.to_numpy())
+    elif isinstance(value, np.ndarray):
+        _update_array(digest, value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode('utf-8'))
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode('utf-8'))
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode('utf-8'))
+            _update(digest, value[key])
+    elif value is None or isinstance(value, (bool, int, float, str, bytes, np.generic)):
+        digest.update(f"{type(value).__name__}:{value!r}".encode('utf-8'))
+    else:
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def fingerprint(value):
+    """
+    計算參數的內容指紋。
+
+    DataFrame、Series 與 NumPy 陣列依形狀、欄位名稱、型別與內容雜湊；超過 FULL_HASH_MAX_BYTES 的陣列只雜湊
+    抽樣的列與每欄總和，成本與資料大小無關（總和為一次向量化運算）。其他參數依其值雜湊。
+
+    Returns:
+        str: 十六進位的指紋。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+def _library_version():
+    try:
+        return metadata.version('scikit-learn')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def _budget_bytes():
+    return int(float(os.environ.get(MEMO_BUDGET_ENV, DEFAULT_MEMO_BUDGET_MB)) * 1024 * 1024)
+
+
+def _cache_files(cache_dir):
+    files = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            if name.endswith('.joblib'):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+
+def evict(cache_dir=MEMO_CACHE_DIR, max_bytes=None):
+    """刪除最久未使用的結果，直到快取總大小不超過上限。"""
+    max_bytes = _budget_bytes() if max_bytes is None else max_bytes
+    files = sorted(_cache_files(cache_dir))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def cache_stats(cache_dir=MEMO_CACHE_DIR):
+    """快取的結果數量與總大小 (MB)。"""
+    files = _cache_files(cache_dir)
+    return {
+        'entries': len(files),
+        'total_mb': sum(size for _, size, _ in files) / (1024 * 1024),
+        'budget_mb': _budget_bytes() / (1024 * 1024),
+    }
+
+
+def disk_memoize(name, version=1, ignore=(), cache_dir=MEMO_CACHE_DIR):
+    """
+    將函式結果依參數內容指紋快取在磁碟上的裝飾器。
+
+    Args:
+        name (str): 快取的名稱（子目錄名稱）。
+        version (int): 函式邏輯或回傳格式改變時遞增，使舊的結果失效。
+        ignore (tuple): 不影響結果、不納入鍵的參數名稱（例如平行行程數）。
+        cache_dir (str): 快取目錄。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            import joblib
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.blake2b(digest_size=20)
+            digest.update(f"{name}:{version}:{_library_version()}".encode('utf-8'))
+            for arg_name, value in bound.arguments.items():
+                if arg_name not in ignore:
+                    digest.update(f"{arg_name}={fingerprint(value)};".encode('utf-8'))
+            path = os.path.join(cache_dir, name, f"{digest.hexdigest()}.joblib")
+
+            with _key_lock(path):
+                if os.path.exists(path):
+                    try:
+                        result = joblib.load(path)
+                        os.utime(path)  # 更新最後使用時間，供淘汰順序使用
+                        return result
+                    except Exception:
+                        # 檔案損毀或版本不相容：重新計算並覆寫
+                        pass
+
+                result = func(*args, **kwargs)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                joblib.dump(result, tmp_path)
+                os.replace(tmp_path, path)
+                evict(cache_dir)
+            return result
+
+        wrapper.cache_dir = os.path.join(cache_dir, name)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,107 @@
+"""
+此模組定義可替換的模型後端：隨機森林、HistGradientBoosting，以及已安裝時可用的 LightGBM 與 XGBoost。
+
+所有後端都提供相同的介面：以整數編碼的標籤訓練、`predict` 回傳類別索引（可直接對應 `le.classes_`），
+並且都是 `shap.TreeExplainer` 支援的樹模型。第三方套件在建立模型時才匯入。
+"""
+import importlib.util
+import pickle
+
+
+class ModelBackend:
+    """
+    模型後端。
+
+    Args:
+        name (str): 後端識別名稱。
+        label (str): 介面上顯示的名稱。
+        module (str or None): 需要的選用套件；None 表示只需要 scikit-learn。
+        factory (callable): `factory(random_state)` 回傳未訓練的模型。
+    """
+
+    def __init__(self, name, label, module, factory):
+        self.name = name
+        self.label = label
+        self.module = module
+        self._factory = factory
+
+    def is_available(self):
+        """需要的套件是否已安裝。"""
+        return self.module is None or importlib.util.find_spec(self.module) is not None
+
+    def create(self, random_state=42):
+        """建立未訓練的模型。"""
+        if not self.is_available():
+            raise ImportError(f"模型後端 {self.label} 需要安裝 {self.module}")
+        return self._factory(random_state)
+
+    def fit(self, X, y, random_state=42):
+        """建立並訓練模型。"""
+        model = self.create(random_state)
+        model.fit(X, y)
+        return model
+
+
+def _random_forest(random_state):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, random_state=random_state, n_jobs=-1)
+
+
+def _hist_gradient_boosting(random_state):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(max_iter=200, random_state=random_state)
+
+
+def _lightgbm(random_state):
+    from lightgbm import LGBMClassifier
+    return LGBMClassifier(n_estimators=200, random_state=random_state, n_jobs=-1, verbose=-1)
+
+
+def _xgboost(random_state):
+    from xgboost import XGBClassifier
+    return XGBClassifier(n_estimators=200, tree_method='hist', random_state=random_state, n_jobs=-1)
+
+
+BACKENDS = {
+    backend.name: backend for backend in (
+        ModelBackend('random_forest', '隨機森林 (RandomForest)', None, _random_forest),
+        ModelBackend('hist_gradient_boosting', 'HistGradientBoosting', None, _hist_gradient_boosting),
+        ModelBackend('lightgbm', 'LightGBM', 'lightgbm', _lightgbm),
+        ModelBackend('xgboost', 'XGBoost', 'xgboost', _xgboost),
+    )
+}
+DEFAULT_BACKEND = 'random_forest'
+
+
+def get_backend(name):
+    """
+    依名稱取得模型後端。
+
+    Raises:
+        ValueError: 未知的後端名稱。
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"未知的模型後端：{name}") from None
+
+
+def available_backends():
+    """已安裝所需套件的後端名稱列表。"""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+class _ByteCounter:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        # 協定 5 的大型陣列可能以 PickleBuffer 直接寫入
+        self.size += memoryview(data).nbytes
+
+
+def model_size_mb(model):
+    """模型序列化後的大小 (MB)；只計算位元組數，不在記憶體中保留序列化結果。"""
+    counter = _ByteCounter()
+    pickle.dump(model, counter, protocol=pickle.HIGHEST_PROTOCOL)
+    return counter.size / (1024 * 1024)
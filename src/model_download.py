@@ -0,0 +1,198 @@
+"""
+此模組負責從 URL 下載模型套件：以串流方式寫入本機快取目錄，支援 HTTP Range 續傳與 SHA-256 驗證，
+同一個 URL 再次載入時直接使用快取檔案，不需重新下載。
+"""
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urldefrag
+
+MODEL_CACHE_DIR = os.path.join('data', '.cache', 'models')
+CHUNK_SIZE = 1024 * 1024
+# 每次從連線讀取的位元組數；小於 CHUNK_SIZE，連線中斷時最多只損失一次讀取的資料
+READ_SIZE = 64 * 1024
+
+# 同一個 URL 同時只允許一個下載寫入快取
+_url_locks = {}
+_url_locks_guard = threading.Lock()
+
+
+class DownloadError(Exception):
+    """下載失敗、回應不是檔案或內容驗證不通過。"""
+
+
+def _url_lock(key):
+    with _url_locks_guard:
+        return _url_locks.setdefault(key, threading.Lock())
+
+
+def _file_sha256(path, digest=None, block_size=8 * 1024 * 1024):
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest
+
+
+def _read_meta(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path, meta):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _open_stream(session, url, headers, timeout):
+    """送出 GET 請求；Google Drive 大檔案的病毒掃描確認頁會自動帶上確認碼重新請求。"""
+    response = session.get(url, headers=headers, stream=True, timeout=timeout)
+    token = next((value for key, value in response.cookies.items() if key.startswith('download_warning')), None)
+    if token:
+        response.close()
+        separator = '&' if '?' in url else '?'
+        response = session.get(f"{url}{separator}confirm={token}", headers=headers, stream=True, timeout=timeout)
+    return response
+
+
+def _check_is_file(response):
+    content_type = response.headers.get('Content-Type', '')
+    if content_type.startswith('text/html') and 'Content-Disposition' not in response.headers:
+        text = response.text
+        response.close()
+        if 'Google Drive' in text and 'virus scan' in text:
+            raise DownloadError("下載失敗：無法自動繞過 Google Drive 的病毒掃描警告。")
+        raise DownloadError("下載失敗：回應不是一個檔案，而是一個 HTML 頁面。請檢查 URL 和共用權限。")
+
+
+def download_model(url, cache_dir=MODEL_CACHE_DIR, expected_sha256=None, progress=None,
+                   session=None, timeout=60, chunk_size=CHUNK_SIZE):
+    """
+    下載模型檔案到本機快取並回傳路徑。
+
+    - 已完整下載過的 URL 直接使用快取檔案（大小與預期雜湊相符時不連線）。
+    - 中斷的下載保留在 `.part` 檔（已收到、尚未寫入的部分也會在中斷時寫入），下次以 `Range` 標頭
+      從中斷處續傳；伺服器不支援續傳時重新下載。
+    - 下載過程同時計算 SHA-256，並與 `expected_sha256`（或 URL 中的 `#sha256=...`）及
+      Content-Length 比對，不符時刪除檔案並拋出 DownloadError。
+
+    Args:
+        url (str): 模型檔案的 URL，可附加 `#sha256=<hex>` 指定預期雜湊。
+        cache_dir (str): 快取目錄。
+        expected_sha256 (str, optional): 預期的 SHA-256（十六進位）。
+        progress (callable, optional): 進度回呼 `progress(已下載位元組, 總位元組或 None)`。
+        session (requests.Session, optional): 使用的 HTTP session，預設建立新的。
+        timeout (float): 連線與讀取逾時（秒）。
+        chunk_size (int): 累積多少位元組寫入一次檔案。
+
+    Returns:
+        tuple: (快取檔案路徑, 檔案內容的 SHA-256)。
+
+    Raises:
+        DownloadError: 下載失敗或驗證不通過。
+    """
+    import requests
+
+    url, fragment = urldefrag(url)
+    if not expected_sha256 and fragment.startswith('sha256='):
+        expected_sha256 = fragment[len('sha256='):]
+    expected_sha256 = expected_sha256.strip().lower() if expected_sha256 else None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    key = hashlib.blake2b(url.encode('utf-8'), digest_size=10).hexdigest()
+    final_path = os.path.join(cache_dir, f"{key}.joblib")
+    part_path = final_path + '.part'
+    meta_path = final_path + '.json'
+
+    with _url_lock(key):
+        meta = _read_meta(meta_path)
+        if (os.path.exists(final_path) and 'sha256' in meta and meta.get('size') == os.path.getsize(final_path)
+                and (expected_sha256 is None or meta.get('sha256') == expected_sha256)):
+            return final_path, meta['sha256']
+
+        session = session or requests.Session()
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # 不接受壓縮傳輸，確保位元組範圍與 Content-Length 對應檔案本身
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            # 遠端檔案已變更時，If-Range 讓伺服器改回傳完整內容
+            validator = meta.get('etag') or meta.get('last_modified')
+            if validator:
+                headers['If-Range'] = validator
+
+        try:
+            response = _open_stream(session, url, headers, timeout)
+            if response.status_code == 416:
+                # 要求的範圍超出檔案大小：快取的片段已失效，重新下載
+                response.close()
+                os.remove(part_path)
+                offset = 0
+                response = _open_stream(session, url, {'Accept-Encoding': 'identity'}, timeout)
+            response.raise_for_status()
+            _check_is_file(response)
+
+            digest = hashlib.sha256()
+            if response.status_code == 206 and offset:
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f"bytes {offset}-"):
+                    response.close()
+                    raise DownloadError(f"續傳失敗：伺服器回傳的範圍不符 ({content_range})")
+                total = int(content_range.rsplit('/', 1)[-1]) if not content_range.endswith('/*') else None
+                _file_sha256(part_path, digest)
+                mode = 'ab'
+            else:
+                offset = 0
+                length = response.headers.get('Content-Length')
+                total = int(length) if length is not None else None
+                mode = 'wb'
+
+            _write_meta(meta_path, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'size': total,
+            })
+
+            done = offset
+            buffer = bytearray()
+            with response, open(part_path, mode) as f:
+                try:
+                    for chunk in response.iter_content(chunk_size=min(READ_SIZE, chunk_size)):
+                        if chunk:
+                            buffer += chunk
+                            digest.update(chunk)
+                            done += len(chunk)
+                            if len(buffer) >= chunk_size:
+                                f.write(buffer)
+                                buffer.clear()
+                            if progress is not None:
+                                progress(done, total)
+                finally:
+                    # 連線中斷時也寫入已收到的資料，續傳的起點才不會退回上一個完整區塊
+                    f.write(buffer)
+        except requests.HTTPError as e:
+            raise DownloadError(f"下載失敗：{e}") from e
+        except requests.RequestException as e:
+            raise DownloadError(f"下載中斷（已保留 {os.path.getsize(part_path) if os.path.exists(part_path) else 0:,} 位元組，"
+                                f"重新載入時會續傳）：{e}") from e
+
+        sha256 = digest.hexdigest()
+        size = os.path.getsize(part_path)
+        if total is not None and size != total:
+            raise DownloadError(f"下載不完整：預期 {total:,} 位元組，實際 {size:,} 位元組。重新載入時會續傳。")
+        if expected_sha256 is not None and sha256 != expected_sha256:
+            os.remove(part_path)
+            raise DownloadError(f"檔案驗證失敗：SHA-256 為 {sha256}，預期為 {expected_sha256}。")
+
+        os.replace(part_path, final_path)
+        meta = _read_meta(meta_path)
+        meta.update({'size': size, 'sha256': sha256})
+        _write_meta(meta_path, meta)
+        return final_path, sha256
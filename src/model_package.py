@@ -0,0 +1,329 @@
+"""
+此模組負責模型套件（模型、標準化器、標籤編碼器與選擇的特徵）的儲存與載入。
+joblib 在實際載入或儲存時才匯入，避免拖慢應用程式啟動。
+
+套件格式（版本 1）有兩種模式：
+
+- mmap：未壓縮的 joblib 模型資料，檔尾附上 JSON 標頭。模型可用 `mmap_mode='r'` 載入，
+  大型 NumPy 陣列直接對應到檔案，多個工作行程共用同一份唯讀分頁。
+  檔案本身仍是合法的 joblib 檔（內容為模型物件）。
+      [joblib 模型資料][JSON 標頭][標頭長度 uint32 LE][MMAP_MAGIC]
+- compact：將整個 mmap 檔案壓縮，供網路傳輸；標頭放在檔頭。載入時解壓縮到本機快取後以 mmap 模式讀取。
+      [COMPACT_MAGIC][標頭長度 uint32 LE][JSON 標頭][壓縮後的 mmap 檔案]
+
+標頭包含標準化器參數、標籤類別、選擇的特徵與模型摘要，不需載入模型即可讀取（見 `read_package_header`）。
+舊版以 `joblib.dump(dict)` 儲存的套件仍可載入。
+"""
+import hashlib
+import io
+import json
+import lzma
+import os
+import struct
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.model_download import MODEL_CACHE_DIR
+
+# 側邊欄「💾 儲存模型」產生的套件內容
+PACKAGE_KEYS = ('model', 'scaler', 'le', 'selected_features')
+DEFAULT_PACKAGE_NAME = 'ids_model_package.joblib'
+DEFAULT_COMPACT_PACKAGE_NAME = 'ids_model_package.idspkg'
+
+FORMAT_NAME = 'ids-model-package'
+FORMAT_VERSION = 1
+MMAP_MAGIC = b'IDSPKGM1'
+COMPACT_MAGIC = b'IDSPKGZ1'
+_LENGTH = struct.Struct('<I')
+_COMPRESSORS = {
+    'lzma': lambda: lzma.LZMACompressor(preset=6),
+    'zlib': lambda: zlib.compressobj(6),
+}
+_DECOMPRESSORS = {
+    'lzma': lzma.LZMADecompressor,
+    'zlib': zlib.decompressobj,
+}
+_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _json_safe(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    return None
+
+
+def _scaler_header(scaler):
+    return {
+        'class': f"{type(scaler).__module__}.{type(scaler).__name__}",
+        'with_mean': scaler.with_mean,
+        'with_std': scaler.with_std,
+        'feature_names_in': [str(name) for name in scaler.feature_names_in_],
+        'mean': None if scaler.mean_ is None else scaler.mean_.tolist(),
+        'scale': None if scaler.scale_ is None else scaler.scale_.tolist(),
+        'var': None if scaler.var_ is None else scaler.var_.tolist(),
+        'n_samples_seen': np.asarray(scaler.n_samples_seen_).tolist(),
+    }
+
+
+def _scaler_from_header(header):
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler(with_mean=header['with_mean'], with_std=header['with_std'])
+    scaler.feature_names_in_ = np.asarray(header['feature_names_in'], dtype=object)
+    scaler.n_features_in_ = len(header['feature_names_in'])
+    scaler.mean_ = None if header['mean'] is None else np.asarray(header['mean'], dtype=np.float64)
+    scaler.scale_ = None if header['scale'] is None else np.asarray(header['scale'], dtype=np.float64)
+    scaler.var_ = None if header['var'] is None else np.asarray(header['var'], dtype=np.float64)
+    # 保持 NumPy 型別（純量為 NumPy 純量）：`partial_fit` 增量更新時需要 `.shape` 等屬性
+    n_samples_seen = np.asarray(header['n_samples_seen'], dtype=np.int64)
+    scaler.n_samples_seen_ = n_samples_seen[()] if n_samples_seen.ndim == 0 else n_samples_seen
+    return scaler
+
+
+def _label_encoder_from_header(classes):
+    from sklearn.preprocessing import LabelEncoder
+
+    le = LabelEncoder()
+    le.classes_ = np.asarray(classes, dtype=object)
+    return le
+
+
+def _model_header(model):
+    params = {key: _json_safe(value) for key, value in model.get_params().items()}
+    return {
+        'class': f"{type(model).__module__}.{type(model).__name__}",
+        'params': params,
+        'n_features_in': _json_safe(getattr(model, 'n_features_in_', None)),
+        'n_estimators': len(model.estimators_) if hasattr(model, 'estimators_') else None,
+    }
+
+
+def build_package_header(package):
+    """
+    建立套件標頭：不需載入模型即可使用的標準化器、標籤類別、特徵與模型摘要。
+
+    Args:
+        package (dict): 至少包含 model、scaler、le、selected_features 的 dict。
+
+    Returns:
+        dict: 可序列化為 JSON 的標頭。
+    """
+    return {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'selected_features': [str(feature) for feature in package['selected_features']],
+        'classes': [_json_safe(label) for label in package['le'].classes_],
+        'scaler': _scaler_header(package['scaler']),
+        'model': _model_header(package['model']),
+    }
+
+
+def _write_mmap_file(package, path, header):
+    import joblib
+
+    joblib.dump(package['model'], path)
+    header_bytes = json.dumps(dict(header, mode='mmap'), ensure_ascii=False).encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(header_bytes)
+        f.write(_LENGTH.pack(len(header_bytes)))
+        f.write(MMAP_MAGIC)
+
+
+def save_model_package(package, path=DEFAULT_PACKAGE_NAME, mode='mmap', compression='lzma'):
+    """
+    將模型套件儲存為版本化的套件檔。
+
+    Args:
+        package (dict): 至少包含 model、scaler、le、selected_features 的 dict。
+        path (str): 輸出路徑。
+        mode (str): 'mmap'（本機與伺服器使用，可記憶體映射載入）或 'compact'（壓縮，供網路傳輸）。
+        compression (str): compact 模式的壓縮方式，'lzma' 或 'zlib'。
+
+    Returns:
+        str: 輸出路徑。
+    """
+    if mode not in ('mmap', 'compact'):
+        raise ValueError(f"不支援的套件模式：{mode}")
+    header = build_package_header(package)
+    tmp_path = path + '.tmp'
+
+    if mode == 'mmap':
+        _write_mmap_file(package, tmp_path, header)
+        os.replace(tmp_path, path)
+        return path
+
+    # compact：先寫出 mmap 檔，再串流壓縮整個檔案
+    mmap_path = path + '.mmap.tmp'
+    _write_mmap_file(package, mmap_path, header)
+    try:
+        compressor = _COMPRESSORS[compression]()
+        header_bytes = json.dumps(dict(header, mode='compact', payload={
+            'compression': compression,
+            'size': os.path.getsize(mmap_path),
+        }), ensure_ascii=False).encode('utf-8')
+        with open(mmap_path, 'rb') as src, open(tmp_path, 'wb') as out:
+            out.write(COMPACT_MAGIC)
+            out.write(_LENGTH.pack(len(header_bytes)))
+            out.write(header_bytes)
+            for block in iter(lambda: src.read(_BLOCK_SIZE), b''):
+                out.write(compressor.compress(block))
+            out.write(compressor.flush())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(mmap_path):
+            os.remove(mmap_path)
+    return path
+
+
+def _open_source(source):
+    """回傳 (檔案物件, 是否需要由此函式關閉)。"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb'), True
+    source.seek(0)
+    return source, False
+
+
+def _read_header(f):
+    """讀取已開啟檔案的標頭，回傳 (模式, 標頭)；舊版 joblib 套件回傳 (None, None)。"""
+    f.seek(0)
+    if f.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC:
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        return 'compact', json.loads(f.read(length).decode('utf-8'))
+
+    f.seek(0, io.SEEK_END)
+    file_size = f.tell()
+    trailer_size = _LENGTH.size + len(MMAP_MAGIC)
+    if file_size >= trailer_size:
+        f.seek(file_size - trailer_size)
+        trailer = f.read(trailer_size)
+        if trailer[_LENGTH.size:] == MMAP_MAGIC:
+            (length,) = _LENGTH.unpack(trailer[:_LENGTH.size])
+            f.seek(file_size - trailer_size - length)
+            return 'mmap', json.loads(f.read(length).decode('utf-8'))
+    return None, None
+
+
+def read_package_header(source):
+    """
+    只讀取套件標頭，不載入模型。
+
+    Args:
+        source (str or file-like): 套件路徑或檔案物件。
+
+    Returns:
+        dict or None: 套件標頭（含 mode 欄位）；舊版 joblib 套件沒有標頭，回傳 None。
+    """
+    f, owned = _open_source(source)
+    try:
+        return _read_header(f)[1]
+    finally:
+        if owned:
+            f.close()
+
+
+def _expand_compact(f, header, cache_dir):
+    """將 compact 套件解壓縮到本機快取（已存在時直接使用），回傳 mmap 檔路徑。"""
+    f.seek(len(COMPACT_MAGIC))
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    payload_offset = len(COMPACT_MAGIC) + _LENGTH.size + length
+
+    # 以壓縮內容的雜湊命名，同一份套件只需解壓縮一次
+    digest = hashlib.sha256()
+    f.seek(payload_offset)
+    for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+        digest.update(block)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{digest.hexdigest()[:20]}.expanded.joblib")
+    if os.path.exists(path) and os.path.getsize(path) == header['payload']['size']:
+        return path
+
+    decompressor = _DECOMPRESSORS[header['payload']['compression']]()
+    tmp_path = path + '.tmp'
+    f.seek(payload_offset)
+    with open(tmp_path, 'wb') as out:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            out.write(decompressor.decompress(block))
+        if hasattr(decompressor, 'flush'):
+            out.write(decompressor.flush())
+    if os.path.getsize(tmp_path) != header['payload']['size']:
+        os.remove(tmp_path)
+        raise ValueError("模型套件解壓縮後的大小不符，檔案可能已損毀。")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _copy_to_cache(f, cache_dir):
+    """將上傳的 mmap 套件寫入本機快取，讓模型可以記憶體映射載入。"""
+    digest = hashlib.sha256()
+    f.seek(0)
+    for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+        digest.update(block)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{digest.hexdigest()[:20]}.joblib")
+    if not os.path.exists(path):
+        tmp_path = path + '.tmp'
+        f.seek(0)
+        with open(tmp_path, 'wb') as out:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+                out.write(block)
+        os.replace(tmp_path, path)
+    return path
+
+
+def load_model_package(source, mmap_mode='r', cache_dir=MODEL_CACHE_DIR):
+    """
+    載入模型套件並檢查必要欄位。
+
+    版本化的套件只從檔案載入模型本身，標準化器與標籤編碼器由標頭重建；
+    上傳的檔案物件與 compact 套件會先寫入 `cache_dir`，以便記憶體映射。
+
+    Args:
+        source (str or file-like): 套件路徑或檔案物件。
+        mmap_mode (str or None): 版本化套件的模型載入方式，'r' 為唯讀記憶體映射，None 則完整讀入記憶體。
+        cache_dir (str): 解壓縮與上傳檔案的快取目錄。
+
+    Returns:
+        dict: 包含 model、scaler、le、selected_features 的模型套件；版本化的套件另含 header。
+
+    Raises:
+        ValueError: 檔案不是有效的模型套件。
+    """
+    import joblib
+
+    f, owned = _open_source(source)
+    try:
+        mode, header = _read_header(f)
+        if mode is None:
+            f.seek(0)
+            package = joblib.load(source if owned else f)
+        else:
+            if header.get('format') != FORMAT_NAME or header.get('version', 0) > FORMAT_VERSION:
+                raise ValueError(f"不支援的模型套件版本：{header.get('format')} v{header.get('version')}")
+            if mode == 'compact':
+                path = _expand_compact(f, header, cache_dir)
+            elif owned:
+                path = source
+            else:
+                path = _copy_to_cache(f, cache_dir)
+            package = {
+                'model': joblib.load(path, mmap_mode=mmap_mode),
+                'scaler': _scaler_from_header(header['scaler']),
+                'le': _label_encoder_from_header(header['classes']),
+                'selected_features': list(header['selected_features']),
+                'header': header,
+            }
+    finally:
+        if owned:
+            f.close()
+
+    if not isinstance(package, dict):
+        raise ValueError("模型檔案格式錯誤：內容不是模型套件。")
+    missing = [key for key in PACKAGE_KEYS if key not in package]
+    if missing:
+        raise ValueError(f"模型套件缺少必要欄位：{', '.join(missing)}")
+    return package
@@ -1,30 +1,81 @@
 """此模組負責模型訓練、評估與預測。"""
-import streamlit as st
+import time
+
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 
-@st.cache_data(show_spinner=False)
-def train_and_evaluate(_X_train, _X_test, _y_train, _y_test, class_names):
+from src.memo import disk_memoize
+from src.model_backends import BACKENDS, DEFAULT_BACKEND, available_backends, get_backend, model_size_mb
+
+
+def _fit_and_score(backend, X_train, X_test, y_train, y_test):
+    """訓練指定後端並在測試集上量測，回傳 (模型, 預測結果, 量測數據)。"""
+    start = time.perf_counter()
+    model = backend.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    stats = {
+        "backend": backend.name,
+        "train_seconds": train_seconds,
+        "predict_rows_per_sec": len(X_test) / predict_seconds if predict_seconds > 0 else float('nan'),
+        "model_mb": model_size_mb(model),
+    }
+    return model, y_pred, stats
+
+
+@disk_memoize('train_and_evaluate')
+def train_and_evaluate(X_train, X_test, y_train, y_test, class_names, backend=DEFAULT_BACKEND):
     """
-    訓練隨機森林模型並評估其效能。
+    以指定的模型後端訓練模型並評估其效能。
+    結果依資料內容指紋與參數快取在磁碟上（見 `src.memo`），相同的資料與後端不會重新訓練。
+
+    Args:
+        backend (str): 模型後端名稱，見 `src.model_backends.BACKENDS`。
+
+    Returns:
+        tuple: (指標 dict（含訓練時間、預測速度與模型大小）, 模型, 混淆矩陣 DataFrame)。
     """
-    with st.spinner("正在訓練隨機森林模型..."):
-        model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-        model.fit(_X_train, _y_train)
+    model_backend = get_backend(backend)
+    model, y_pred, stats = _fit_and_score(model_backend, X_train, X_test, y_train, y_test)
 
-    with st.spinner("正在評估模型效能..."):
-        y_pred = model.predict(_X_test)
+    metrics = {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred, average='weighted'),
+        "recall": recall_score(y_test, y_pred, average='weighted'),
+        "f1_score": f1_score(y_test, y_pred, average='weighted'),
+        **stats,
+    }
 
-        metrics = {
-            "accuracy": accuracy_score(_y_test, y_pred),
-            "precision": precision_score(_y_test, y_pred, average='weighted'),
-            "recall": recall_score(_y_test, y_pred, average='weighted'),
-            "f1_score": f1_score(_y_test, y_pred, average='weighted')
-        }
+    # 計算混淆矩陣
+    cm = confusion_matrix(y_test, y_pred)
+    cm_df = pd.DataFrame(cm, index=class_names, columns=class_names)
 
-        # 計算混淆矩陣
-        cm = confusion_matrix(_y_test, y_pred)
-        cm_df = pd.DataFrame(cm, index=class_names, columns=class_names)
+    return metrics, model, cm_df
 
-    return metrics, model, cm_df
\ No newline at end of file
+
+def compare_backends(X_train, X_test, y_train, y_test, backends=None):
+    """
+    在相同的訓練/測試分割上比較各模型後端。
+
+    Args:
+        backends (list, optional): 要比較的後端名稱；預設為所有已安裝的後端。
+
+    Returns:
+        pd.DataFrame: 每個後端的訓練秒數、預測速度 (筆/秒)、模型大小 (MB) 與加權 F1。
+    """
+    rows = []
+    for name in backends or available_backends():
+        model, y_pred, stats = _fit_and_score(get_backend(name), X_train, X_test, y_train, y_test)
+        rows.append({
+            "後端": BACKENDS[name].label,
+            "訓練秒數": stats["train_seconds"],
+            "預測速度 (筆/秒)": stats["predict_rows_per_sec"],
+            "模型大小 (MB)": stats["model_mb"],
+            "加權 F1": f1_score(y_test, y_pred, average='weighted'),
+        })
+        del model
+    return pd.DataFrame(rows)
@@ -0,0 +1,133 @@
+"""
+此模組負責訓練前的資料預處理：標籤編碼與特徵標準化，並盡量避免產生整份資料的副本。
+
+- 標準化後的特徵只保存一份 float32、以欄為主 (Fortran order) 的矩陣，`X_scaled` 是包著這個矩陣的
+  DataFrame（不複製）；選取特徵子集時每一欄都是連續的記憶體，隨機森林也可直接使用 float32 資料。
+- 標準化器以 `partial_fit` 逐區塊擬合，轉換時逐欄、逐區塊寫入矩陣，暫存空間只與區塊大小有關。
+- 訓練/測試分割只產生列索引，再以 `take` 一次取出需要的列與欄，不會先複製整個特徵子集。
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import current_rss_mb, peak_rss_mb
+
+# 擬合標準化器時每個區塊的列數（區塊會轉為 float64，暫存空間約為 列數 x 特徵數 x 8 位元組）
+FIT_CHUNK_ROWS = 65_536
+# 轉換時每欄每次處理的列數
+TRANSFORM_CHUNK_ROWS = 1 << 20
+
+
+def encode_labels(labels):
+    """
+    編碼標籤，結果與 `LabelEncoder().fit_transform(labels)` 相同。
+
+    類別型欄位直接由類別代碼對應，不需將每一列轉為字串陣列。
+
+    Returns:
+        tuple: (編碼後的標籤 np.ndarray, 擬合好的 LabelEncoder)。
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    le = LabelEncoder()
+    if not isinstance(labels.dtype, pd.CategoricalDtype):
+        return le.fit_transform(labels), le
+    labels = labels.cat.remove_unused_categories()
+    categories = np.asarray(labels.cat.categories, dtype=object)
+    le.fit(categories)
+    mapping = np.searchsorted(le.classes_, categories)
+    return mapping[labels.cat.codes.to_numpy()], le
+
+
+def scale_features(df, feature_columns, fit_chunk_rows=FIT_CHUNK_ROWS, transform_chunk_rows=TRANSFORM_CHUNK_ROWS):
+    """
+    以 float32 標準化特徵，結果寫入單一的欄主序矩陣。
+
+    Args:
+        df (pd.DataFrame): 原始資料（不會被修改）。
+        feature_columns (list): 特徵欄位。
+
+    Returns:
+        tuple: (標準化後的特徵 DataFrame（共用同一個 float32 矩陣）, 擬合好的 StandardScaler)。
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    features = df[feature_columns]
+    n_rows = len(features)
+    scaler = StandardScaler()
+    for start in range(0, n_rows, fit_chunk_rows):
+        scaler.partial_fit(features.iloc[start:start + fit_chunk_rows])
+
+    matrix = np.empty((n_rows, len(feature_columns)), dtype=np.float32, order='F')
+    for j, column in enumerate(feature_columns):
+        values = features[column].to_numpy()
+        mean, scale = scaler.mean_[j], scaler.scale_[j]
+        for start in range(0, n_rows, transform_chunk_rows):
+            stop = start + transform_chunk_rows
+            # 以 float64 計算後寫回 float32，精度與 scaler.transform 後再轉型相同
+            matrix[start:stop, j] = (values[start:stop] - mean) / scale
+    X_scaled = pd.DataFrame(matrix, columns=pd.Index(feature_columns), copy=False)
+    return X_scaled, scaler
+
+
+def preprocess_dataset(df, label_column='Label', drop_columns=('Timestamp',)):
+    """
+    編碼標籤並標準化所有特徵。
+
+    Args:
+        df (pd.DataFrame): 清理後的資料（不會被修改）。
+        label_column (str): 目標變數欄位。
+        drop_columns (tuple): 不作為特徵的其他欄位。
+
+    Returns:
+        dict: X_scaled、y_encoded、le、scaler，以及 report（rss_before_mb、rss_after_mb、peak_rss_mb、
+            matrix_mb、seconds）。
+    """
+    start = time.perf_counter()
+    rss_before = current_rss_mb()
+    y_encoded, le = encode_labels(df[label_column])
+    feature_columns = [col for col in df.columns if col != label_column and col not in drop_columns]
+    X_scaled, scaler = scale_features(df, feature_columns)
+    report = {
+        "rss_before_mb": rss_before,
+        "rss_after_mb": current_rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "matrix_mb": X_scaled.to_numpy().nbytes / (1024 * 1024),
+        "seconds": time.perf_counter() - start,
+    }
+    return {'X_scaled': X_scaled, 'y_encoded': y_encoded, 'le': le, 'scaler': scaler, 'report': report}
+
+
+def split_indices(y, test_size=0.2, random_state=42):
+    """
+    分層抽樣的訓練/測試列索引，與 `train_test_split(X, y, test_size, random_state, stratify=y)` 的分割相同。
+
+    Returns:
+        tuple: (訓練列索引, 測試列索引)。
+    """
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y)
+
+
+def take(X, rows=None, columns=None):
+    """
+    一次取出指定的列與欄，只複製需要的資料。
+
+    Args:
+        X (pd.DataFrame): 特徵。
+        rows (array-like, optional): 列索引，None 代表全部。
+        columns (list, optional): 欄位名稱，None 代表全部。
+
+    Returns:
+        pd.DataFrame: 取出的資料（欄主序，列索引重新編號）。
+    """
+    columns = X.columns if columns is None else pd.Index(columns)
+    values = X.to_numpy()
+    rows = np.arange(len(values)) if rows is None else np.asarray(rows)
+    subset = np.empty((len(rows), len(columns)), dtype=values.dtype, order='F')
+    # 逐欄取出，直接寫入結果矩陣的連續欄位，不產生中間副本
+    for k, j in enumerate(X.columns.get_indexer(columns)):
+        np.take(values[:, j], rows, out=subset[:, k])
+    return pd.DataFrame(subset, columns=columns, copy=False)
@@ -0,0 +1,37 @@
+"""此模組提供量測記憶體用量的輔助函式，供資料載入與前處理流程回報資源使用情況。"""
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """
+    回傳目前行程至今的最高常駐記憶體 (peak RSS)，單位為 MB。
+
+    Returns:
+        float: 最高常駐記憶體；平台不支援時回傳 NaN。
+    """
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以 bytes 回報，Linux 以 KB 回報
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """
+    回傳目前行程的常駐記憶體 (RSS)，單位為 MB。
+
+    Returns:
+        float: 目前的常駐記憶體；平台不支援 (沒有 /proc) 時回傳 NaN。
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return float('nan')
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
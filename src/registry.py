@@ -0,0 +1,196 @@
+"""
+此模組提供行程層級的共用資源登錄表：同一份模型套件或清理後的資料集在整個伺服器行程中只保留一份，
+各工作階段只持有指向它的控制代碼 (handle)。介面端以 `st.cache_resource` 建立唯一的實例。
+
+資源以內容雜湊等穩定的鍵識別，並以參照計數追蹤使用中的工作階段；總用量超過記憶體預算時，
+依最近最少使用 (LRU) 的順序釋放已無人使用的資源。使用中的資源不會被釋放。
+登錄表中的物件由多個工作階段共用，使用端必須視為唯讀。
+"""
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_nbytes(obj):
+    """
+    估計物件佔用的記憶體位元組數（DataFrame、NumPy 陣列、樹模型與其組成的容器）。
+
+    Args:
+        obj: 要估計的物件。
+
+    Returns:
+        int: 估計的位元組數。
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(value) for value in obj)
+    if hasattr(obj, 'estimators_'):
+        # 森林模型：加總每棵樹的節點陣列與葉節點數值
+        estimators = np.ravel(obj.estimators_)
+        return sum(estimate_nbytes(estimator) for estimator in estimators)
+    if hasattr(obj, '_predictors'):
+        # HistGradientBoosting：每次迭代、每個類別一棵以結構化陣列儲存節點的樹
+        return sum(int(predictor.nodes.nbytes) for predictors in obj._predictors for predictor in predictors)
+    if hasattr(obj, 'tree_'):
+        tree = obj.tree_
+        # sklearn 的每個節點紀錄約 64 位元組
+        return int(tree.node_count * 64 + tree.value.nbytes)
+    return sys.getsizeof(obj)
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'refcount')
+
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+        self.refcount = 0
+
+
+class ResourceHandle:
+    """
+    指向登錄表中資源的控制代碼。
+
+    呼叫 `release()` 或控制代碼被回收（例如工作階段結束、session_state 被清除）時，自動減少參照計數。
+    """
+
+    def __init__(self, registry, key, value):
+        self.key = key
+        self._value = value
+        self._finalizer = weakref.finalize(self, registry._release, key)
+
+    @property
+    def value(self):
+        if not self._finalizer.alive:
+            raise RuntimeError(f"資源 {self.key} 的控制代碼已釋放")
+        return self._value
+
+    def release(self):
+        """釋放此控制代碼；重複呼叫不會有作用。"""
+        self._value = None
+        self._finalizer()
+
+
+class ResourceRegistry:
+    """
+    以參照計數與 LRU 管理的共用資源登錄表。
+
+    Args:
+        max_bytes (int): 記憶體預算（位元組）；超過時釋放已無人使用的資源，使用中的資源不受影響。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # 控制代碼可能在持有鎖時被垃圾回收而觸發釋放，因此使用可重入鎖
+        self._lock = threading.RLock()
+        self._build_locks = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key, factory, size_fn=estimate_nbytes):
+        """
+        取得資源的控制代碼；資源不存在時呼叫 `factory()` 建立，同一個鍵同時只會建立一次。
+
+        Args:
+            key (hashable): 資源的鍵（例如內容雜湊）。
+            factory (callable): 建立資源的函式；回傳 None 表示建立失敗，不會登錄。
+            size_fn (callable): 估計資源大小（位元組）的函式。
+
+        Returns:
+            ResourceHandle or None: 資源的控制代碼；`factory` 回傳 None 時為 None。
+        """
+        handle = self._acquire_existing(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            # 等待期間其他工作階段可能已建立完成
+            handle = self._acquire_existing(key)
+            if handle is not None:
+                return handle
+            try:
+                value = factory()
+                if value is None:
+                    return None
+                entry = _Entry(value, int(size_fn(value)))
+                with self._lock:
+                    entry.refcount = 1
+                    self._entries[key] = entry
+                    self.total_bytes += entry.nbytes
+                    self.misses += 1
+                    self._evict_locked()
+                return ResourceHandle(self, key, value)
+            finally:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+
+    def _acquire_existing(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.refcount += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ResourceHandle(self, key, entry.value)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+                self._evict_locked()
+
+    def _evict_locked(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in [key for key, entry in self._entries.items() if entry.refcount == 0]:
+            entry = self._entries.pop(key)
+            self.total_bytes -= entry.nbytes
+            self.evictions += 1
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def clear_unused(self):
+        """立即釋放所有已無人使用的資源。"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.refcount == 0]:
+                self.total_bytes -= self._entries.pop(key).nbytes
+                self.evictions += 1
+
+    def stats(self):
+        """
+        登錄表統計。
+
+        Returns:
+            dict: 各資源的鍵、大小 (MB) 與參照計數，以及總用量、預算與命中/建立/釋放次數。
+        """
+        with self._lock:
+            entries = [
+                {"key": str(key), "mb": entry.nbytes / (1024 * 1024), "refcount": entry.refcount}
+                for key, entry in self._entries.items()
+            ]
+            return {
+                "entries": entries,
+                "total_mb": self.total_bytes / (1024 * 1024),
+                "budget_mb": self.max_bytes / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,141 @@
+"""
+此模組負責在特徵選擇與訓練前縮減訓練資料：移除重複的資料列，並依類別設定筆數上限抽樣。
+
+流量資料中絕大多數是彼此幾乎相同的正常流量，完整資料的大部分運算都花在這些列上。
+
+- 重複列以雜湊判斷：逐區塊計算每一列（特徵值與標籤）的 64 位元雜湊，再一次找出重複的雜湊，
+  只保留第一次出現的列；不需要複製或排序整個特徵矩陣。
+- 各類別的抽樣以跨區塊的水庫抽樣 (reservoir sampling) 進行：每一列給一個隨機優先值，每個類別保留優先值
+  最小的 `class_cap` 列，結果等同於在該類別中均勻抽樣；筆數未超過上限的類別（通常是少數的攻擊類別）全部保留。
+- 只回傳保留的列索引（遞增排序），再以 `src.preprocessing.take` 取出需要的資料。
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+# 計算雜湊與抽樣時每個區塊的列數
+SAMPLE_CHUNK_ROWS = 1 << 18
+
+
+def row_hashes(X, y=None, chunk_rows=SAMPLE_CHUNK_ROWS):
+    """
+    逐區塊計算每一列的 64 位元雜湊。
+
+    Args:
+        X (pd.DataFrame): 特徵。
+        y (array-like, optional): 標籤；提供時一併納入雜湊，特徵相同但標籤不同的列不視為重複。
+        chunk_rows (int): 每個區塊的列數。
+
+    Returns:
+        np.ndarray: uint64 雜湊，長度與 X 的列數相同。
+    """
+    hashes = np.empty(len(X), dtype=np.uint64)
+    for start in range(0, len(X), chunk_rows):
+        stop = start + chunk_rows
+        chunk_hash = pd.util.hash_pandas_object(X.iloc[start:stop], index=False).to_numpy()
+        if y is not None:
+            labels = pd.util.hash_array(np.asarray(y[start:stop]))
+            chunk_hash = pd.util.hash_pandas_object(pd.DataFrame({'x': chunk_hash, 'y': labels}), index=False).to_numpy()
+        hashes[start:stop] = chunk_hash
+    return hashes
+
+
+class StratifiedReservoir:
+    """
+    逐區塊的分層水庫抽樣：每個類別最多保留 `cap` 列。
+
+    Args:
+        cap (int or None): 每個類別的筆數上限；None 代表不設上限（全部保留）。
+        random_state (int): 亂數種子，相同的資料與設定得到相同的樣本。
+    """
+
+    def __init__(self, cap=None, random_state=42):
+        self.cap = cap
+        self._rng = np.random.default_rng(random_state)
+        self._rows = {}
+        self._keys = {}
+
+    def update(self, rows, labels):
+        """
+        將一個區塊的候選列併入樣本。
+
+        Args:
+            rows (np.ndarray): 列索引。
+            labels (np.ndarray): 對應的類別。
+        """
+        keys = self._rng.random(len(rows))
+        for label in np.unique(labels):
+            mask = labels == label
+            rows_c = np.concatenate([self._rows.get(label, np.empty(0, dtype=np.int64)), rows[mask]])
+            keys_c = np.concatenate([self._keys.get(label, np.empty(0)), keys[mask]])
+            if self.cap is not None and len(keys_c) > self.cap:
+                keep = np.argpartition(keys_c, self.cap)[:self.cap]
+                rows_c, keys_c = rows_c[keep], keys_c[keep]
+            self._rows[label], self._keys[label] = rows_c, keys_c
+
+    def result(self):
+        """
+        Returns:
+            np.ndarray: 所有類別保留的列索引（遞增排序）。
+        """
+        if not self._rows:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(list(self._rows.values())))
+
+
+def downsample(X, y, class_cap=None, dedup=True, rows=None, random_state=42, chunk_rows=SAMPLE_CHUNK_ROWS):
+    """
+    移除重複列並依類別上限抽樣。
+
+    Args:
+        X (pd.DataFrame): 特徵（通常為標準化後的特徵矩陣）。
+        y (np.ndarray): 編碼後的標籤。
+        class_cap (int, optional): 每個類別的筆數上限，None 代表不設上限。
+        dedup (bool): 是否移除特徵與標籤完全相同的重複列。
+        rows (array-like, optional): 候選列索引（例如訓練集），None 代表全部。
+        random_state (int): 抽樣的亂數種子。
+        chunk_rows (int): 每個區塊的列數。
+
+    Returns:
+        tuple: (保留的列索引 np.ndarray（遞增排序）, 統計 dict：rows_before、duplicates、rows_after、
+            mb_before、mb_after、seconds，以及 per_class（各類別的原始、去除重複後與抽樣後筆數）)。
+    """
+    start = time.perf_counter()
+    y = np.asarray(y)
+    rows = np.arange(len(y)) if rows is None else np.sort(np.asarray(rows))
+    labels = y[rows]
+
+    unique = np.ones(len(rows), dtype=bool)
+    if dedup:
+        hashes = np.empty(len(rows), dtype=np.uint64)
+        for begin in range(0, len(rows), chunk_rows):
+            block = rows[begin:begin + chunk_rows]
+            hashes[begin:begin + chunk_rows] = row_hashes(X.iloc[block], labels[begin:begin + chunk_rows], chunk_rows)
+        unique = ~pd.Series(hashes).duplicated(keep='first').to_numpy()
+
+    reservoir = StratifiedReservoir(class_cap, random_state)
+    for begin in range(0, len(rows), chunk_rows):
+        keep = unique[begin:begin + chunk_rows]
+        reservoir.update(rows[begin:begin + chunk_rows][keep], labels[begin:begin + chunk_rows][keep])
+    kept = reservoir.result()
+
+    classes = np.unique(labels)
+    before = pd.Series(labels).value_counts().reindex(classes, fill_value=0)
+    after_dedup = pd.Series(labels[unique]).value_counts().reindex(classes, fill_value=0)
+    after = pd.Series(y[kept]).value_counts().reindex(classes, fill_value=0)
+    row_mb = X.shape[1] * X.to_numpy().dtype.itemsize / (1024 * 1024)
+    report = {
+        "rows_before": len(rows),
+        "duplicates": int((~unique).sum()),
+        "rows_after": len(kept),
+        "mb_before": len(rows) * row_mb,
+        "mb_after": len(kept) * row_mb,
+        "seconds": time.perf_counter() - start,
+        "per_class": [
+            {"class": int(label), "before": int(before[label]), "unique": int(after_dedup[label]),
+             "after": int(after[label])}
+            for label in classes
+        ],
+    }
+    return kept, report
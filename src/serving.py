@@ -0,0 +1,283 @@
+"""
+此模組提供本機模型推論服務：載入一次模型套件，透過 HTTP 接收單筆或多筆流量，
+並將短時間窗口內到達的請求合併成一次 `predict` 呼叫（micro-batching），降低每次呼叫的固定開銷。
+本模組不依賴 Streamlit。
+
+啟動方式（於專案根目錄）：
+    python -m src.serving ids_model_package.joblib --port 8765
+
+API：
+    POST /predict   {"flow": {特徵: 值, ...}} 或 {"flows": [{...}, ...]}
+                    -> {"predictions": [{"label": "Benign", "result": "正常"}, ...]}
+                       缺少特徵或含 NaN/Infinity 的流量對應 null。
+    GET  /metrics   延遲百分位數 (p50/p99)、佇列深度與批次大小統計。
+    GET  /health    服務狀態。
+"""
+import argparse
+import copy
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src.inference import build_model_matrix, label_results, predict_labels
+from src.model_package import load_model_package
+from src.tree_engine import compile_model
+
+
+class MicroBatcher:
+    """
+    將並行到達的推論請求合併成批次。
+
+    背景執行緒取得第一個請求後，最多再等待 `max_wait_ms` 毫秒收集後續請求，
+    或累積到 `max_batch_rows` 筆為止，再以一次 `predict` 處理整批資料。
+
+    Args:
+        package (dict): load_model_package 載入的模型套件。
+        max_wait_ms (float): 收集同一批請求的最長等待時間（毫秒）。
+        max_batch_rows (int): 單一批次的最大筆數。
+        latency_window (int): 計算延遲百分位數時保留的最近請求數。
+    """
+
+    def __init__(self, package, max_wait_ms=5.0, max_batch_rows=4096, latency_window=10_000):
+        self.model = package['model']
+        self.scaler = package['scaler']
+        self.le = package['le']
+        self.selected_features = list(package['selected_features'])
+        self._identity_mapping = {feature: feature for feature in self.selected_features}
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.requests_served = 0
+        self.rows_served = 0
+        self.max_queue_depth = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, flows):
+        """
+        送出一組流量（dict 列表）並回傳 Future，結果為每筆流量的預測（無效流量為 None）。
+        """
+        future = Future()
+        self._queue.put((flows, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def predict(self, flows, timeout=30.0):
+        """同步版本的 submit。"""
+        return self.submit(flows).result(timeout=timeout)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _collect(self):
+        """取得一批請求：阻塞等待第一個請求，之後在時間窗口內盡量收集。"""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            records = [flow for flows, _, _ in batch for flow in flows]
+            try:
+                predictions = self._score(records)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            offset = 0
+            with self._lock:
+                self._batch_sizes.append(len(records))
+                for flows, future, enqueued in batch:
+                    future.set_result(predictions[offset:offset + len(flows)])
+                    offset += len(flows)
+                    self._latencies.append(done - enqueued)
+                self.requests_served += len(batch)
+                self.rows_served += len(records)
+
+    def _score(self, records):
+        # 缺少的特徵為 NaN，會與 NaN/Infinity 一樣被判定為無效流量
+        df = pd.DataFrame.from_records(records, columns=self.selected_features)
+        features, valid = build_model_matrix(df, self._identity_mapping, self.selected_features, self.scaler)
+        predictions = [None] * len(records)
+        if not features.empty:
+            labels = predict_labels(self.model, self.le, features)
+            for position, label, result in zip(np.flatnonzero(valid), labels, label_results(labels)):
+                predictions[position] = {"label": str(label), "result": str(result)}
+        return predictions
+
+    def metrics(self):
+        """
+        回傳服務統計。
+
+        Returns:
+            dict: 請求數、筆數、延遲 p50/p99（毫秒，自排入佇列至取得結果）、目前與最大佇列深度、平均批次大小。
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            batch_sizes = np.array(self._batch_sizes)
+            served = (self.requests_served, self.rows_served)
+        return {
+            "requests": served[0],
+            "rows": served[1],
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if latencies.size else None,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if latencies.size else None,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "mean_batch_rows": float(batch_sizes.mean()) if batch_sizes.size else None,
+        }
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    """每個連線一個執行緒的 HTTP 服務；加大 listen backlog 以承受感測器的突發連線。"""
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_handler(batcher):
+    """建立綁定指定 MicroBatcher 的 HTTP 請求處理類別。"""
+
+    class InferenceHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, batcher.metrics())
+            elif self.path == '/health':
+                self._send_json(200, {"status": "ok", "features": batcher.selected_features})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if 'flow' in payload:
+                    flows = [payload['flow']]
+                else:
+                    flows = payload['flows']
+                if not isinstance(flows, list) or not all(isinstance(flow, dict) for flow in flows):
+                    raise ValueError("flows 必須是物件列表")
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {"error": f"請求格式錯誤：{e}"})
+                return
+            if not flows:
+                self._send_json(200, {"predictions": []})
+                return
+            try:
+                self._send_json(200, {"predictions": batcher.predict(flows)})
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # 高頻率請求下不逐筆輸出存取紀錄
+            pass
+
+    return InferenceHandler
+
+
+def create_server(package, host='127.0.0.1', port=8765, max_wait_ms=5.0, max_batch_rows=4096, model_jobs=1,
+                  fast_engine=True):
+    """
+    建立推論服務。
+
+    Args:
+        package (dict): 模型套件。
+        host (str): 監聽位址。
+        port (int): 監聽埠號。
+        max_wait_ms (float): micro-batching 的收集窗口（毫秒）。
+        max_batch_rows (int): 單一批次的最大筆數。
+        model_jobs (int): 模型預測使用的執行緒數；小批次下單執行緒的固定開銷最低。
+        fast_engine (bool): 是否改用扁平陣列推論引擎 (`src.tree_engine`)；不支援的模型自動沿用原模型。
+
+    Returns:
+        tuple: (InferenceHTTPServer, MicroBatcher)。
+    """
+    model = package['model']
+    if hasattr(model, 'n_jobs'):
+        # 套件可能與其他使用者共用（見 `src.registry`），只在淺層複本上設定執行緒數，不修改原模型
+        model = copy.copy(model)
+        model.n_jobs = model_jobs
+    if fast_engine:
+        engine = compile_model(model)
+        if engine is not None:
+            model = engine
+    package = {**package, 'model': model}
+    batcher = MicroBatcher(package, max_wait_ms=max_wait_ms, max_batch_rows=max_batch_rows)
+    server = InferenceHTTPServer((host, port), make_handler(batcher))
+    return server, batcher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.serving', description="啟動本機模型推論服務。")
+    parser.add_argument('package', help="模型套件路徑 (例如 ids_model_package.joblib)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="合併請求的時間窗口 (毫秒)")
+    parser.add_argument('--max-batch-rows', type=int, default=4096, help="單一批次的最大筆數")
+    parser.add_argument('--model-jobs', type=int, default=1, help="模型預測使用的執行緒數")
+    parser.add_argument('--no-fast-engine', action='store_true', help="不使用扁平陣列推論引擎，直接呼叫模型的 predict")
+    args = parser.parse_args(argv)
+
+    package = load_model_package(args.package)
+    server, batcher = create_server(package, args.host, args.port, args.max_wait_ms,
+                                    args.max_batch_rows, args.model_jobs, fast_engine=not args.no_fast_engine)
+    engine = getattr(batcher.model, 'backend', None)
+    print(f"推論服務已啟動：http://{args.host}:{args.port} (特徵數 {len(batcher.selected_features)}"
+          f"{f'，扁平陣列推論引擎 ({engine})' if engine else ''})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
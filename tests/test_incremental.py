@@ -0,0 +1,84 @@
+"""
+`src.incremental` 的增量更新測試：版本化套件存檔、載入、更新後再存檔與載入，以及隨機森林學到新類別。
+
+執行方式（於專案根目錄）：
+    python -m unittest tests.test_incremental
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from src.incremental import update_model_package
+from src.model_package import load_model_package, save_model_package
+
+FEATURES = [f"f{i}" for i in range(6)]
+
+
+def _make_flows(n_rows, labels, seed):
+    """每個類別的特徵集中在不同的中心附近。"""
+    rng = np.random.default_rng(seed)
+    y = rng.choice(labels, n_rows)
+    centers = {label: np.random.default_rng(sum(map(ord, label))).normal(scale=4, size=len(FEATURES))
+               for label in labels}
+    X = np.stack([centers[label] for label in y]) + rng.normal(size=(n_rows, len(FEATURES)))
+    df = pd.DataFrame(X, columns=FEATURES)
+    df['Label'] = y
+    return df
+
+
+def _train_package(model, df):
+    scaler = StandardScaler().fit(df[FEATURES])
+    le = LabelEncoder().fit(df['Label'])
+    X = pd.DataFrame(scaler.transform(df[FEATURES]), columns=FEATURES)
+    return {'model': model.fit(X, le.transform(df['Label'])), 'scaler': scaler, 'le': le,
+            'selected_features': FEATURES}
+
+
+class UpdateModelPackageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.history = _make_flows(3000, ['Benign', 'DoS'], seed=0)
+        # 新一天的擷取資料出現新的攻擊類別
+        self.new_day = _make_flows(2000, ['Benign', 'DoS', 'Bot'], seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _round_trip(self, package, mode):
+        path = save_model_package(package, os.path.join(self.tmp_dir, f"package-{mode}"), mode=mode)
+        return load_model_package(path, cache_dir=self.tmp_dir)
+
+    def test_versioned_package_can_be_updated_and_saved_again(self):
+        for mode in ('mmap', 'compact'):
+            for model in (RandomForestClassifier(n_estimators=20, random_state=0),
+                          HistGradientBoostingClassifier(max_iter=20, random_state=0)):
+                with self.subTest(mode=mode, model=type(model).__name__):
+                    loaded = self._round_trip(_train_package(model, self.history), mode)
+                    updated, report = update_model_package(loaded, self.new_day, n_new_trees=5, n_new_iter=5,
+                                                           random_state=0)
+                    self.assertEqual(report['added_classes'], ['Bot'])
+
+                    reloaded = self._round_trip(updated, mode)
+                    self.assertEqual(list(reloaded['le'].classes_), ['Benign', 'DoS', 'Bot'])
+                    np.testing.assert_allclose(reloaded['scaler'].mean_, updated['scaler'].mean_)
+                    self.assertEqual(int(reloaded['scaler'].n_samples_seen_), 5000)
+                    X = pd.DataFrame(reloaded['scaler'].transform(self.new_day[FEATURES]), columns=FEATURES)
+                    np.testing.assert_array_equal(reloaded['model'].predict(X), updated['model'].predict(X))
+
+    def test_forest_learns_added_class(self):
+        package = _train_package(RandomForestClassifier(n_estimators=50, random_state=0), self.history)
+        # 要求新增的樹少於既有森林時，仍需新增足夠的樹讓新類別能在平均投票中勝出
+        updated, report = update_model_package(package, self.new_day, n_new_trees=5, random_state=0)
+        self.assertEqual(report['size_after'], 100)
+        self.assertGreater(report['added_class_recall']['Bot'], 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+`src.model_download` 的續傳與驗證測試：以標準函式庫的 `http.server` 在本機提供支援 Range 的模型檔案。
+
+執行方式（於專案根目錄）：
+    python -m unittest tests.test_model_download
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.model_download import DownloadError, download_model
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 12345)
+PAYLOAD_SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+ETAG = '"model-v1"'
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """提供 PAYLOAD，支援 `Range` 與 `If-Range`；`server.truncate_next` 設定時只送出部分內容後中斷連線。"""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range', ETAG) == ETAG:
+            start = int(match.group(1))
+        body = PAYLOAD[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        if start:
+            self.send_header('Content-Range', f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.end_headers()
+
+        truncate, self.server.truncate_next = self.server.truncate_next, None
+        self.wfile.write(body[:truncate] if truncate else body)
+        self.wfile.flush()
+        if truncate:
+            # 宣告的 Content-Length 尚未送完就關閉連線，模擬下載中斷
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloadModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+        self.server.requests = []
+        self.server.truncate_next = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/model.joblib"
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def test_interrupted_download_resumes_from_partial_file(self):
+        self.server.truncate_next = 1024 * 1024 + 300 * 1024
+        with self.assertRaises(DownloadError):
+            download_model(self.url, cache_dir=self.cache_dir)
+        part_files = [name for name in os.listdir(self.cache_dir) if name.endswith('.part')]
+        self.assertEqual(len(part_files), 1)
+        kept = os.path.getsize(os.path.join(self.cache_dir, part_files[0]))
+        # 未滿一個寫入區塊的資料也已寫入
+        self.assertGreater(kept, 1024 * 1024)
+
+        path, sha256 = download_model(self.url, cache_dir=self.cache_dir)
+        self.assertEqual(self.server.requests[-1]['Range'], f"bytes={kept}-")
+        self.assertEqual(self.server.requests[-1]['If-Range'], ETAG)
+        self.assertEqual(sha256, PAYLOAD_SHA256)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_sha256_mismatch_is_rejected(self):
+        with self.assertRaises(DownloadError):
+            download_model(self.url, cache_dir=self.cache_dir, expected_sha256='0' * 64)
+        # 驗證失敗的檔案不會留在快取中
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if not name.endswith('.json')], [])
+
+        path, _ = download_model(f"{self.url}#sha256={PAYLOAD_SHA256}", cache_dir=self.cache_dir)
+        self.assertTrue(os.path.exists(path))
+
+    def test_repeat_load_uses_cache_without_network(self):
+        first_path, first_sha256 = download_model(self.url, cache_dir=self.cache_dir, expected_sha256=PAYLOAD_SHA256)
+        requests_made = len(self.server.requests)
+
+        path, sha256 = download_model(self.url, cache_dir=self.cache_dir, expected_sha256=PAYLOAD_SHA256)
+        self.assertEqual(len(self.server.requests), requests_made)
+        self.assertEqual((path, sha256), (first_path, first_sha256))
+
+
+if __name__ == '__main__':
+    unittest.main()
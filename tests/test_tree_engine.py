@@ -0,0 +1,78 @@
+"""
+`src.tree_engine` 的預測比對測試：扁平陣列推論引擎與 scikit-learn 的 `predict_proba`、`predict` 結果一致。
+
+涵蓋隨機森林與 HistGradientBoosting、二元與多類別、單列到超過 `NUMBA_MAX_ROWS` 的批次，
+以及 numba 與 NumPy 兩種走訪方式（未安裝 numba 時只測 NumPy）。
+
+執行方式（於專案根目錄）：
+    python -m unittest tests.test_tree_engine
+"""
+import importlib.util
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from src import tree_engine
+from src.tree_engine import FlatTreeEngine
+
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+# 1 列、一般批次、超過 NUMBA_MAX_ROWS（NumPy 走訪時也會分成多個區塊）
+ROW_COUNTS = (1, 100, tree_engine.NUMBA_MAX_ROWS + 500)
+
+
+def _make_data(n_classes, n_rows, seed):
+    X, y = make_classification(n_samples=n_rows, n_features=8, n_informative=5, n_classes=n_classes,
+                               random_state=seed)
+    # 少量缺失值，涵蓋 missing_go_to_left 的分支
+    X[np.random.default_rng(seed).random(X.shape) < 0.02] = np.nan
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])]), y
+
+
+class FlatTreeEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cases = []
+        for n_classes in (2, 4):
+            X_train, y_train = _make_data(n_classes, 1500, seed=n_classes)
+            X_test, _ = _make_data(n_classes, max(ROW_COUNTS), seed=100 + n_classes)
+            for model in (RandomForestClassifier(n_estimators=15, max_depth=10, random_state=0),
+                          HistGradientBoostingClassifier(max_iter=15, random_state=0)):
+                cls.cases.append((model.fit(X_train, y_train), n_classes, X_test))
+
+    def _backends(self):
+        return (True, False) if HAS_NUMBA else (False,)
+
+    def test_matches_sklearn(self):
+        # 放寬改用 scikit-learn 的列數門檻，並縮小 NumPy 的區塊，讓大批次也走引擎本身的分塊路徑
+        with mock.patch.object(tree_engine, 'NUMBA_MAX_ROWS', max(ROW_COUNTS)), \
+                mock.patch.object(tree_engine, 'NUMPY_MAX_ROWS', max(ROW_COUNTS)), \
+                mock.patch.object(tree_engine, '_CHUNK_CELLS', 1 << 14):
+            for model, n_classes, X_test in self.cases:
+                for use_numba in self._backends():
+                    engine = FlatTreeEngine.from_model(model, use_numba=use_numba)
+                    self.assertEqual(engine.backend, 'numba' if use_numba else 'numpy')
+                    for n_rows in ROW_COUNTS:
+                        with self.subTest(model=type(model).__name__, n_classes=n_classes,
+                                          backend=engine.backend, n_rows=n_rows):
+                            X = X_test.iloc[:n_rows]
+                            np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X),
+                                                       rtol=1e-12, atol=1e-12)
+                            np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+
+    def test_large_batches_fall_back_to_sklearn(self):
+        model, _, X_test = self.cases[0]
+        for use_numba in self._backends():
+            engine = FlatTreeEngine.from_model(model, use_numba=use_numba)
+            X = X_test.iloc[:max(ROW_COUNTS)]
+            with mock.patch.object(engine, '_accumulate') as accumulate:
+                np.testing.assert_array_equal(engine.predict_proba(X), model.predict_proba(X))
+            accumulate.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
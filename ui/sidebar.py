@@ -1,22 +1,100 @@
 import streamlit as st
 import io
-import requests
-import joblib
-import shap
+import numpy as np
 import pandas as pd
 import traceback
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.model_selection import train_test_split
 
-from src.data_loader import load_data, clean_data
-from src.feature_selector import run_genetic_selection
-from src.model_trainer import train_and_evaluate
-from ui.utils import download_file_from_gdrive
+# 基因演算法 (deap)、scikit-learn 與 shap 匯入較慢，延後到實際使用的步驟才匯入，以縮短應用程式啟動時間
+from src.data_loader import clean_data_cache_key, load_cached_clean_data
+from src.incremental import supports_incremental
+from src.jobs import DONE, FINISHED_STATES, job_status, load_job_result, submit_job
+from src.memo import cache_stats as memo_cache_stats
+from src.preprocessing import preprocess_dataset, split_indices, take
+from src.sampling import downsample
+from src.model_backends import BACKENDS, available_backends
+from src.model_download import download_model
+from src.model_package import (
+    DEFAULT_COMPACT_PACKAGE_NAME, DEFAULT_PACKAGE_NAME, load_model_package, save_model_package,
+)
+from ui.state import (
+    GA_JOB, TRAIN_JOB, acquire_dataset, acquire_model_package, acquire_preprocessed, acquire_trained_model,
+    clear_job, content_digest, get_dataset, get_dataset_key, get_explainer, get_job, get_model, get_model_key,
+    get_preprocessed, get_registry, is_job_applied, mark_job_applied, set_job,
+)
+
+
+def _use_model_package(package):
+    """將共用模型套件中的小型物件放入 session_state；模型本身只透過控制代碼存取。"""
+    st.session_state['scaler'] = package['scaler']
+    st.session_state['le'] = package['le']
+    st.session_state['selected_features'] = package['selected_features']
+    st.session_state['model_loaded'] = True
+    st.session_state['selection_done'] = True
+
+
+def _preprocess():
+    """標準化目前資料集的特徵 (float32，單一矩陣) 並編碼標籤。"""
+    return preprocess_dataset(get_dataset(), label_column='Label', drop_columns=('Timestamp',))
+
+
+def _sampled_rows(preprocessed, settings):
+    """
+    取得目前資料集縮減後的訓練列與未經抽樣的測試列。
+
+    結果依資料集與抽樣設定保存在工作階段中，讓步驟 2 與步驟 3 使用相同的資料列。
+    """
+    key = (get_dataset_key(), settings)
+    sampling = st.session_state.get('sampling')
+    if sampling is None or sampling['key'] != key:
+        X_scaled, y_encoded = preprocessed['X_scaled'], preprocessed['y_encoded']
+        train_rows, test_rows = split_indices(y_encoded)
+        class_cap, dedup = settings
+        kept, report = downsample(X_scaled, y_encoded, class_cap=class_cap, dedup=dedup, rows=train_rows)
+        sampling = {'key': key, 'train_rows': kept, 'test_rows': test_rows}
+        st.session_state['sampling'] = sampling
+        st.session_state['sampling_report'] = report
+    return sampling['train_rows'], sampling['test_rows']
+
+
+def _apply_finished_jobs():
+    """將已完成、尚未套用的背景工作結果（特徵選擇、模型訓練）放入目前工作階段。"""
+    for name in (GA_JOB, TRAIN_JOB):
+        job_id = get_job(name)
+        if job_id is None or is_job_applied(job_id):
+            continue
+        status = job_status(job_id)
+        if status is None:
+            # 工作目錄已被清除
+            clear_job(name)
+            continue
+        if status['state'] != DONE:
+            continue
+
+        result = load_job_result(job_id)
+        st.session_state['scaler'] = result['scaler']
+        st.session_state['le'] = result['le']
+        if name == GA_JOB:
+            st.session_state['best_ga_score'] = result['best_score']
+            st.session_state['ga_report'] = result['report']
+            st.session_state['screening_report'] = result.get('screening')
+            st.session_state['num_total_features'] = result['num_total_features']
+            st.session_state['selected_features'] = result['selected_features']
+            st.session_state['selection_done'] = True
+        else:
+            # 工作 ID 由資料內容、特徵與後端決定，相同的模型在所有工作階段間共用
+            trained = acquire_trained_model(job_id, lambda: (result['metrics'], result['model'], result['cm_df']))
+            st.session_state['selected_features'] = result['selected_features']
+            st.session_state['metrics'] = trained['metrics']
+            st.session_state['cm_df'] = trained['cm_df']
+        mark_job_applied(job_id)
+
 
 def display_sidebar():
     """
     Displays the sidebar UI components for model loading and training.
     """
+    _apply_finished_jobs()
+
     with st.sidebar:
         st.header("⚙️ 模型管理與訓練")
 
@@ -24,27 +102,30 @@ def display_sidebar():
         with st.expander("載入預訓練模型", expanded=False):
             st.subheader("選項一：從 URL 載入")
             model_url = st.text_input("請輸入模型檔案的 Raw URL", help="請確保提供的是指向模型檔案本身的 Raw 連結。")
+            model_sha256 = st.text_input(
+                "SHA-256 驗證碼 (選填)",
+                help="填寫後會在下載完成時驗證檔案內容；也可以在 URL 結尾加上 #sha256=<驗證碼>。"
+            )
             if st.button("從 URL 載入模型"):
                 if model_url:
                     with st.spinner("正在從 URL 下載並載入模型... (大檔案可能需要數分鐘)"):
                         try:
-                            # 使用新的下載函數
-                            file_content = download_file_from_gdrive(model_url)
-                            
-                            model_file = io.BytesIO(file_content)
-                            loaded_data = joblib.load(model_file)
-                            
-                            st.session_state['trained_model'] = loaded_data['model']
-                            st.session_state['scaler'] = loaded_data['scaler']
-                            st.session_state['le'] = loaded_data['le']
-                            st.session_state['selected_features'] = loaded_data['selected_features']
-                            
-                            st.session_state['model_loaded'] = True
-                            st.session_state['selection_done'] = True
-                            
-                            with st.spinner("建立 SHAP 解釋器..."):
-                                explainer = shap.TreeExplainer(st.session_state['trained_model'])
-                                st.session_state['shap_explainer'] = explainer
+                            # 串流下載到本機快取：中斷可續傳，已下載過的 URL 不會重新連線
+                            progress_bar = st.progress(0.0, text="下載模型中...")
+
+                            def update_progress(done, total):
+                                if total:
+                                    progress_bar.progress(min(done / total, 1.0), text=f"下載模型中... {done / 1e6:,.1f} / {total / 1e6:,.1f} MB")
+                                else:
+                                    progress_bar.progress(0.0, text=f"下載模型中... {done / 1e6:,.1f} MB")
+
+                            model_path, sha256 = download_model(model_url, expected_sha256=model_sha256 or None,
+                                                                progress=update_progress)
+                            progress_bar.empty()
+
+                            # 相同內容的模型套件在所有工作階段間共用，SHAP 解釋器在背景建立
+                            package = acquire_model_package(sha256, lambda: load_model_package(model_path))
+                            _use_model_package(package)
 
                             st.success("模型從 URL 載入成功！")
                         except Exception as e:
@@ -56,28 +137,88 @@ def display_sidebar():
             st.write("---")
 
             st.subheader("選項二：從本機檔案載入")
-            uploaded_model_file = st.file_uploader("上傳 .joblib 模型檔案", type=['joblib'])
-            if uploaded_model_file is not None:
+            uploaded_model_file = st.file_uploader("上傳 .joblib / .idspkg 模型檔案", type=['joblib', 'idspkg'])
+            # 同一個上傳檔案只在第一次出現時載入，之後的重新執行直接沿用
+            if uploaded_model_file is not None and st.session_state.get('model_file_id') != uploaded_model_file.file_id:
                 with st.spinner("正在從本機檔案載入模型..."):
                     try:
-                        loaded_data = joblib.load(uploaded_model_file)
-                        
-                        st.session_state['trained_model'] = loaded_data['model']
-                        st.session_state['scaler'] = loaded_data['scaler']
-                        st.session_state['le'] = loaded_data['le']
-                        st.session_state['selected_features'] = loaded_data['selected_features']
-                        
-                        st.session_state['model_loaded'] = True
-                        st.session_state['selection_done'] = True
-                        
-                        with st.spinner("建立 SHAP 解釋器..."):
-                            explainer = shap.TreeExplainer(st.session_state['trained_model'])
-                            st.session_state['shap_explainer'] = explainer
+                        file_content = uploaded_model_file.getvalue()
+                        package = acquire_model_package(
+                            content_digest(file_content),
+                            lambda: load_model_package(io.BytesIO(file_content)),
+                        )
+                        _use_model_package(package)
+                        st.session_state['model_file_id'] = uploaded_model_file.file_id
 
                         st.success("模型從本機檔案載入成功！")
                     except Exception as e:
                         st.error(f"從本機檔案載入模型失敗：{e}")
 
+        explainer = get_explainer()
+        if explainer is not None:
+            if not explainer.ready:
+                st.caption("⏳ SHAP 解釋器背景建立中，完成前預測解釋需稍候。")
+            elif explainer.error is not None:
+                st.caption(f"⚠️ SHAP 解釋器建立失敗：{explainer.error}")
+            else:
+                st.caption(f"✅ SHAP 解釋器已就緒 ({explainer.seconds:.1f} 秒)")
+
+        # --- 以新的擷取資料增量更新模型 ---
+        if get_model() is not None and supports_incremental(get_model()):
+            with st.expander("以新資料增量更新模型", expanded=False):
+                st.caption("只以新的擷取資料更新標準化器、類別與模型，不需重跑完整的載入、特徵選擇與訓練流程。")
+                new_data_path = st.text_input("新擷取資料的 CSV 路徑", placeholder="data/03-02-2018.csv")
+                is_forest = hasattr(get_model(), 'estimators_')
+                n_new = st.number_input(
+                    "新增的樹數量" if is_forest else "繼續提升的迭代次數",
+                    min_value=1, value=20 if is_forest else 50, step=1,
+                    help="新資料含有新的攻擊類別時，隨機森林至少新增與既有森林相同數量的樹，新類別才能在平均投票中勝出。"
+                    if is_forest else None,
+                )
+                if st.button("更新模型"):
+                    from src.incremental import update_model_package
+
+                    with st.spinner("正在載入新資料並增量更新模型..."):
+                        new_df, _ = load_cached_clean_data(new_data_path) if new_data_path else (None, None)
+                        if new_df is not None:
+                            try:
+                                package = {
+                                    'model': get_model(),
+                                    'scaler': st.session_state['scaler'],
+                                    'le': st.session_state['le'],
+                                    'selected_features': st.session_state['selected_features'],
+                                }
+
+                                def update():
+                                    updated, report = update_model_package(
+                                        package, new_df, n_new_trees=int(n_new), n_new_iter=int(n_new)
+                                    )
+                                    return {**updated, 'update_report': report}
+
+                                # 同一模型以同一份新資料更新的結果在所有工作階段間共用
+                                update_key = content_digest(
+                                    f"{get_model_key()}|{clean_data_cache_key(new_data_path)}|{int(n_new)}".encode('utf-8')
+                                )
+                                updated = acquire_model_package(update_key, update)
+                                _use_model_package(updated)
+                                st.session_state.pop('metrics', None)
+                                st.session_state.pop('cm_df', None)
+                                st.session_state.setdefault('update_reports', []).append(updated['update_report'])
+                                st.success("模型已更新！更新紀錄請至儀表板查看。")
+                                missed = {
+                                    label: recall for label, recall in updated['update_report']['added_class_recall'].items()
+                                    if recall < 0.5
+                                }
+                                if missed:
+                                    st.warning("新類別的召回率偏低，模型可能尚未學到："
+                                               + "、".join(f"{label} ({recall:.2f})" for label, recall in missed.items()))
+                            except Exception as e:
+                                st.error(f"增量更新失敗：{e}")
+                        elif new_data_path:
+                            st.error(f"無法從 {new_data_path} 載入資料。")
+                        else:
+                            st.warning("請先輸入新資料的 CSV 路徑。")
+
         st.write("---")
 
         # ==============================================================================
@@ -87,95 +228,228 @@ def display_sidebar():
         if not st.session_state.get('model_loaded', False):
             st.header("本機訓練流程")
             st.info("偵測到無預載模型，您可以在此執行完整的資料讀取與訓練流程。")
-            DATA_PATH = "data/03-01-2018.csv"
-            
-            # Use session state to cache the loaded and cleaned dataframe
-            if 'df_cleaned' not in st.session_state:
+            data_source = st.text_input(
+                "資料來源", value="data/03-01-2018.csv",
+                help="CSV 檔案、目錄或萬用字元 (例如 data/*.csv)；多個檔案會平行解析、協調欄位後合併成一份資料集。",
+            )
+
+            # 清理後的資料集在所有工作階段間共用，session_state 只保存控制代碼
+            if get_dataset() is None:
                 if st.button("1. 載入與清理資料"):
-                    with st.spinner("載入原始資料..."):
-                        df_raw = load_data(DATA_PATH)
-                        if df_raw is not None:
-                            feature_cols = df_raw.columns.drop(['Label', 'Timestamp'])
-                            for col in feature_cols:
-                                df_raw[col] = pd.to_numeric(df_raw[col], errors='coerce')
-                            st.session_state['df_cleaned'] = clean_data(df_raw.copy())
+                    with st.spinner("載入清理後的資料 (首次載入會以串流方式解析並建立快取)..."):
+                        dataset = acquire_dataset(data_source)
+                        if dataset is not None:
+                            st.session_state['load_report'] = dict(dataset['report'])
                             st.success(f"資料載入與清理完成！")
                             st.rerun()
                         else:
-                            st.error(f"無法從 {DATA_PATH} 載入資料。")
+                            st.error(f"無法從 {data_source} 載入資料。")
             
-            if 'df_cleaned' in st.session_state:
+            if get_dataset() is not None:
                 st.success("步驟 1：資料已載入")
 
+                # --- 訓練資料抽樣 ---
+                with st.expander("訓練資料抽樣", expanded=False):
+                    use_sampling = st.checkbox(
+                        "特徵選擇與訓練前縮減訓練資料", value=True,
+                        help="先保留 20% 分層抽樣的測試集 (維持原本的類別分佈)，再對其餘的訓練列移除重複列並依類別上限抽樣。"
+                    )
+                    class_cap = st.number_input(
+                        "每個類別的筆數上限 (0 代表不設上限)", min_value=0, value=50_000, step=10_000,
+                        disabled=not use_sampling,
+                    )
+                    dedup = st.checkbox("移除特徵與標籤完全相同的重複列", value=True, disabled=not use_sampling)
+                sampling_settings = (int(class_cap) or None, bool(dedup)) if use_sampling else None
+                if sampling_settings is None:
+                    st.session_state.pop('sampling_report', None)
+
                 # --- 特徵選擇 ---
-                if st.button("2. 開始特徵選擇"):
-                    df_cleaned = st.session_state['df_cleaned']
+                with st.expander("基因演算法設定", expanded=False):
+                    ga_objective = st.selectbox(
+                        "最佳化目標", ('accuracy', 'pareto'),
+                        format_func=lambda name: "準確率" if name == 'accuracy' else "多目標 (加權 F1、特徵數、預測成本)",
+                        help="多目標以 NSGA-II 搜尋柏拉圖前緣，完成後可在儀表板比較各特徵組合的 F1 與推論成本，"
+                             "並挑選要部署的組合；多目標模式固定使用 DEAP 個體列表，且不提前停止。"
+                    )
+                    ga_ngen = st.number_input("最大世代數", min_value=1, value=15, step=1)
+                    ga_patience = st.number_input("最佳分數連續幾代未進步即提前停止", min_value=1, value=5, step=1)
+                    ga_pop_size = st.number_input("族群大小", min_value=4, value=40, step=10)
+                    ga_representation = st.selectbox(
+                        "族群表示法", ('packed', 'deap'),
+                        format_func=lambda name: "向量化布林矩陣" if name == 'packed' else "DEAP 個體列表",
+                        help="向量化布林矩陣以陣列運算進行選擇、交配與突變，族群與世代數較大時額外負擔遠低於 DEAP 個體列表。",
+                    )
+                    ga_sample_size = st.number_input(
+                        "初期世代的分層抽樣筆數", min_value=1000, value=20000, step=1000,
+                        help="前三分之一的世代以小樣本排序個體，中段使用 5 倍樣本，最後階段與名人堂使用完整資料。"
+                    )
+                    fidelity_schedule = (
+                        (0, int(ga_sample_size)),
+                        (int(ga_ngen) // 3, int(ga_sample_size) * 5),
+                        (2 * int(ga_ngen) // 3, None),
+                    )
+                    use_screening = st.checkbox(
+                        "過濾法預篩選", value=True,
+                        help="先移除常數欄位與高度相關的重複特徵，並依互資訊或卡方排序，基因演算法只在保留的特徵中搜尋。"
+                    )
+                    screening_threshold = st.slider(
+                        "相關係數門檻", min_value=0.5, max_value=1.0, value=0.95, step=0.01,
+                        disabled=not use_screening,
+                    )
+                    screening_method = st.selectbox(
+                        "排序方式", ('mutual_info', 'chi2'),
+                        format_func=lambda name: "互資訊" if name == 'mutual_info' else "卡方",
+                        disabled=not use_screening,
+                    )
+                    screening_top_k = st.number_input(
+                        "最多保留的特徵數 (0 代表不設上限)", min_value=0, value=0, step=5, disabled=not use_screening,
+                    )
+                screening = dict(
+                    correlation_threshold=float(screening_threshold), method=screening_method,
+                    top_k=int(screening_top_k) or None,
+                ) if use_screening else None
+
+                ga_job = get_job(GA_JOB)
+                ga_status = job_status(ga_job) if ga_job else None
+                if ga_status is not None and ga_status['state'] not in FINISHED_STATES:
+                    st.info("步驟 2：特徵選擇在背景執行中，進度請至儀表板查看。")
+                elif st.button("2. 開始特徵選擇"):
                     with st.spinner("正在進行資料預處理..."):
-                        X = df_cleaned.drop(columns=['Label', 'Timestamp'])
-                        y = df_cleaned['Label']
-                        le = LabelEncoder()
-                        y_encoded = le.fit_transform(y)
-                        scaler = StandardScaler()
-                        X_scaled = scaler.fit_transform(X)
-                        X_scaled = pd.DataFrame(X_scaled, columns=X.columns)
-                        st.session_state['scaler'] = scaler
+                        # 同一資料集的預處理結果在所有工作階段間共用
+                        preprocessed = acquire_preprocessed(_preprocess)
+                        st.session_state['preprocess_report'] = preprocessed['report']
                     st.success("資料預處理完成！")
 
-                    with st.spinner("執行基因演算法中..."):
-                        selected_features, best_score = run_genetic_selection(X_scaled, y_encoded)
-                    
-                    st.session_state['best_ga_score'] = best_score
-                    st.session_state['num_total_features'] = len(X.columns)
-                    st.session_state['selection_done'] = True
-                    st.session_state['selected_features'] = selected_features
-                    st.session_state['X_scaled'] = X_scaled
-                    st.session_state['y_encoded'] = y_encoded
-                    st.session_state['le'] = le
-                    st.success("步驟 2：特徵選擇完成！結果請至儀表板查看。")
+                    X_ga, y_ga = preprocessed['X_scaled'], preprocessed['y_encoded']
+                    if sampling_settings is not None:
+                        with st.spinner("正在縮減訓練資料..."):
+                            # 特徵選擇只使用縮減後的訓練列，測試列留給步驟 3 評估
+                            train_rows, _ = _sampled_rows(preprocessed, sampling_settings)
+                            X_ga, y_ga = take(X_ga, train_rows), y_ga[train_rows]
+
+                    with st.spinner("正在啟動背景工作..."):
+                        # 基因演算法在獨立的工作行程中執行；相同的資料與設定會接上已在執行或已完成的工作
+                        job_id = submit_job(
+                            'genetic_selection', X=X_ga, y=y_ga,
+                            le=preprocessed['le'], scaler=preprocessed['scaler'], ngen=int(ga_ngen),
+                            patience=int(ga_patience), fidelity_schedule=fidelity_schedule,
+                            pop_size=int(ga_pop_size), representation=ga_representation, screening=screening,
+                            objective=ga_objective,
+                        )
+                    set_job(GA_JOB, job_id)
+                    clear_job(TRAIN_JOB)
                     st.rerun()
 
                 if st.session_state.get('selection_done', False):
                     st.success("步驟 2：特徵選擇已完成")
+                    screening_report = st.session_state.get('screening_report')
+                    if screening_report:
+                        n_before, n_after = screening_report['n_before'], screening_report['n_after']
+                        before, after = screening_report['eval_seconds_before'], screening_report['eval_seconds_after']
+                        st.caption(
+                            f"預篩選：特徵 {n_before} → {n_after} 個，搜尋空間 2^{n_before} → 2^{n_after}；"
+                            f"每次適應度評估 {before:.2f} → {after:.2f} 秒 ({before / max(after, 1e-9):.1f}x)"
+                        )
                     # --- 模型訓練 ---
-                    if st.button("3. 訓練模型"):
-                        with st.spinner("正在準備訓練資料..."):
-                            X_selected = st.session_state['X_scaled'][st.session_state['selected_features']]
-                            y_encoded = st.session_state['y_encoded']
-                            le = st.session_state['le']
-                            X_train, X_test, y_train, y_test = train_test_split(
-                                X_selected, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+                    backend = st.selectbox(
+                        "模型後端",
+                        available_backends(),
+                        format_func=lambda name: BACKENDS[name].label,
+                        help="HistGradientBoosting、LightGBM 與 XGBoost 以直方圖分箱訓練，大型資料集通常比隨機森林快，模型也較小。"
+                             "LightGBM 與 XGBoost 需另外安裝。"
+                    )
+                    selected_features = st.session_state['selected_features']
+
+                    def preprocessed_data():
+                        # 重新整理頁面後接回特徵選擇結果時，預處理結果需重新取得
+                        return get_preprocessed() or acquire_preprocessed(_preprocess)
+
+                    train_job = get_job(TRAIN_JOB)
+                    train_status = job_status(train_job) if train_job else None
+                    if train_status is not None and train_status['state'] not in FINISHED_STATES:
+                        st.info("步驟 3：模型在背景訓練中，進度請至儀表板查看。")
+                    elif st.button("3. 訓練模型"):
+                        with st.spinner("正在啟動背景工作..."):
+                            # 相同資料集、特徵組合與後端的模型只訓練一次，結果在所有工作階段間共用
+                            preprocessed = preprocessed_data()
+                            X_scaled, y_encoded = preprocessed['X_scaled'], preprocessed['y_encoded']
+                            task_kwargs = dict(
+                                class_names=st.session_state['le'].classes_, backend=backend,
+                                le=st.session_state['le'], scaler=st.session_state['scaler'],
+                                selected_features=selected_features,
                             )
-                        st.success("資料分割完成！")
-
-                        with st.spinner("模型訓練與評估中..."):
-                            metrics, model, cm_df = train_and_evaluate(X_train, X_test, y_train, y_test, le.classes_)
-                        
-                        st.session_state['trained_model'] = model
-                        st.session_state['metrics'] = metrics
-                        st.session_state['cm_df'] = cm_df
-
-                        with st.spinner("建立 SHAP 解釋器..."):
-                            explainer = shap.TreeExplainer(model)
-                            st.session_state['shap_explainer'] = explainer
-                        st.success("步驟 3：模型訓練完成！評估結果請至儀表板查看。")
+                            if sampling_settings is None:
+                                # 只取出選擇的特徵欄位；訓練/測試分割在工作行程中以列索引進行
+                                job_id = submit_job('train_model', X=take(X_scaled, columns=selected_features),
+                                                    y=y_encoded, **task_kwargs)
+                            else:
+                                # 只傳入縮減後的訓練列與完整的測試列
+                                train_rows, test_rows = _sampled_rows(preprocessed, sampling_settings)
+                                rows = np.concatenate([train_rows, test_rows])
+                                job_id = submit_job(
+                                    'train_model', X=take(X_scaled, rows, selected_features), y=y_encoded[rows],
+                                    train_rows=np.arange(len(train_rows)),
+                                    test_rows=np.arange(len(train_rows), len(rows)), **task_kwargs,
+                                )
+                        set_job(TRAIN_JOB, job_id)
                         st.rerun()
+
+                    if st.button("比較模型後端"):
+                        from src.model_trainer import compare_backends
+
+                        with st.spinner("正在以相同的資料分割訓練並比較所有後端..."):
+                            preprocessed = preprocessed_data()
+                            X_scaled, y_encoded = preprocessed['X_scaled'], preprocessed['y_encoded']
+                            if sampling_settings is None:
+                                train_rows, test_rows = split_indices(y_encoded)
+                            else:
+                                train_rows, test_rows = _sampled_rows(preprocessed, sampling_settings)
+                            st.session_state['backend_comparison'] = compare_backends(
+                                take(X_scaled, train_rows, selected_features), take(X_scaled, test_rows, selected_features),
+                                y_encoded[train_rows], y_encoded[test_rows],
+                            )
+                        st.success("後端比較完成！結果請至儀表板查看。")
             
-            if st.session_state.get('trained_model'):
+            if get_model() is not None:
                 st.success("步驟 3：模型已訓練")
                 # --- 儲存模型區塊 ---
                 st.subheader("儲存已訓練模型")
                 st.info("將目前訓練好的模型、特徵列表與所有相關設定打包儲存。")
+                package_mode = st.radio(
+                    "套件格式",
+                    ('mmap', 'compact'),
+                    format_func=lambda mode: "記憶體映射 (本機與伺服器載入最快)" if mode == 'mmap' else "壓縮 (適合網路傳輸)",
+                    help="記憶體映射格式可讓多個行程共用同一份模型資料；壓縮格式檔案較小，載入時會先解壓縮到本機快取。"
+                )
                 if st.button("💾 儲存模型"):
                     with st.spinner("正在打包並儲存模型..."):
                         try:
                             data_to_save = {
-                                'model': st.session_state['trained_model'],
+                                'model': get_model(),
                                 'scaler': st.session_state['scaler'],
                                 'le': st.session_state['le'],
                                 'selected_features': st.session_state['selected_features']
                             }
-                            filename = "ids_model_package.joblib"
-                            joblib.dump(data_to_save, filename)
+                            filename = save_model_package(
+                                data_to_save,
+                                DEFAULT_PACKAGE_NAME if package_mode == 'mmap' else DEFAULT_COMPACT_PACKAGE_NAME,
+                                mode=package_mode,
+                            )
                             st.success(f"模型已成功儲存為 **{filename}**！")
                         except Exception as e:
-                            st.error(f"儲存模型時發生錯誤：{e}")
\ No newline at end of file
+                            st.error(f"儲存模型時發生錯誤：{e}")
+
+        # --- 共用資源狀態 ---
+        with st.expander("共用資源狀態", expanded=False):
+            registry_stats = get_registry().stats()
+            st.caption(
+                f"記憶體用量 {registry_stats['total_mb']:,.0f} / {registry_stats['budget_mb']:,.0f} MB · "
+                f"共用命中 {registry_stats['hits']} 次 · 新建 {registry_stats['misses']} 次 · 釋放 {registry_stats['evictions']} 次"
+            )
+            if registry_stats['entries']:
+                st.dataframe(pd.DataFrame(registry_stats['entries']), hide_index=True)
+            memo_stats = memo_cache_stats()
+            st.caption(
+                f"訓練與特徵選擇結果快取 {memo_stats['entries']} 筆 · "
+                f"{memo_stats['total_mb']:,.0f} / {memo_stats['budget_mb']:,.0f} MB"
+            )
@@ -0,0 +1,276 @@
+"""
+跨工作階段共用的模型與資料集。
+
+模型、SHAP 解釋器、清理後的資料集與標準化後的訓練資料等大型物件存放在整個伺服器行程共用的
+ResourceRegistry 中，以內容雜湊為鍵；st.session_state 只保存控制代碼，多位使用者載入同一份模型或資料時
+只佔用一份記憶體。共用的物件不可就地修改。
+記憶體預算可用環境變數 IDS_REGISTRY_BUDGET_MB 設定。
+"""
+import hashlib
+import json
+import os
+
+import streamlit as st
+
+from src.data_loader import clean_data_cache_key, load_cached_clean_data
+from src.dataset_builder import build_dataset, resolve_sources
+from src.explainer import BackgroundExplainer
+from src.registry import ResourceRegistry, estimate_nbytes
+from src.tree_engine import compile_model
+
+REGISTRY_BUDGET_ENV = 'IDS_REGISTRY_BUDGET_MB'
+DEFAULT_REGISTRY_BUDGET_MB = 4096
+
+# session_state 中存放控制代碼的鍵
+MODEL_HANDLE = 'model_handle'
+DATASET_HANDLE = 'dataset_handle'
+PREPROCESSED_HANDLE = 'preprocessed_handle'
+
+# session_state 中存放背景工作 ID 的鍵；同時寫入網址參數，重新整理頁面後仍可接回執行中或已完成的工作
+GA_JOB = 'ga_job'
+TRAIN_JOB = 'train_job'
+APPLIED_JOBS = 'applied_jobs'
+
+
+@st.cache_resource
+def get_registry():
+    """整個伺服器行程唯一的資源登錄表。"""
+    budget_mb = float(os.environ.get(REGISTRY_BUDGET_ENV, DEFAULT_REGISTRY_BUDGET_MB))
+    return ResourceRegistry(int(budget_mb * 1024 * 1024))
+
+
+def content_digest(data):
+    """位元組內容的 SHA-256，作為共用資源的鍵（與 URL 下載的驗證碼相同，上傳與下載的同一檔案可共用）。"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _set_handle(name, handle):
+    """將控制代碼存入 session_state，並釋放同一位置原本的控制代碼。"""
+    previous = st.session_state.get(name)
+    st.session_state[name] = handle
+    if previous is not None and previous is not handle:
+        previous.release()
+
+
+def release_handle(name):
+    """釋放目前工作階段持有的指定資源。"""
+    handle = st.session_state.pop(name, None)
+    if handle is not None:
+        handle.release()
+
+
+def _get_value(name):
+    handle = st.session_state.get(name)
+    return handle.value if handle is not None else None
+
+
+def _model_size(entry):
+    # TreeExplainer 會另外複製一份樹結構，大小約與模型本身相當
+    predictor = entry['predictor']
+    return 2 * estimate_nbytes(entry['model']) + getattr(predictor, 'nbytes', 0) + estimate_nbytes(
+        {key: value for key, value in entry.items() if key not in ('model', 'explainer', 'predictor')}
+    )
+
+
+# ------------------------------------------------------------------------------
+# 模型
+# ------------------------------------------------------------------------------
+
+def acquire_model_package(content_hash, load_package):
+    """
+    取得共用的模型套件；同一內容的套件只會載入一次，並在背景建立 SHAP 解釋器。
+
+    Args:
+        content_hash (str): 模型檔案內容的雜湊。
+        load_package (callable): 未共用時載入模型套件的函式。
+
+    Returns:
+        dict: 模型套件（model、scaler、le、selected_features）加上 explainer 與 predictor。
+    """
+    def build():
+        package = dict(load_package())
+        package['explainer'] = BackgroundExplainer(package['model'])
+        package['predictor'] = compile_model(package['model']) or package['model']
+        return package
+
+    handle = get_registry().acquire(f"package:{content_hash}", build, size_fn=_model_size)
+    _set_handle(MODEL_HANDLE, handle)
+    return handle.value
+
+
+def acquire_trained_model(key, train):
+    """
+    取得共用的已訓練模型；相同資料集與特徵組合的模型只會訓練一次。
+
+    Args:
+        key (str): 由資料集與特徵組成的鍵。
+        train (callable): 未共用時訓練模型的函式，回傳 (metrics, model, cm_df)。
+
+    Returns:
+        dict: model、explainer、predictor、metrics 與 cm_df。
+    """
+    def build():
+        metrics, model, cm_df = train()
+        return {'model': model, 'explainer': BackgroundExplainer(model), 'predictor': compile_model(model) or model,
+                'metrics': metrics, 'cm_df': cm_df}
+
+    handle = get_registry().acquire(f"trained:{key}", build, size_fn=_model_size)
+    _set_handle(MODEL_HANDLE, handle)
+    return handle.value
+
+
+def get_model():
+    """目前工作階段使用的模型；尚未載入或訓練時為 None。"""
+    entry = _get_value(MODEL_HANDLE)
+    return entry['model'] if entry is not None else None
+
+
+def get_predictor():
+    """
+    目前模型的預測器：支援時為扁平陣列推論引擎（結果與模型相同、少量資料時延遲較低），否則為模型本身。
+    尚未載入模型時為 None。
+    """
+    entry = _get_value(MODEL_HANDLE)
+    return entry['predictor'] if entry is not None else None
+
+
+def get_explainer():
+    """目前模型的 SHAP 解釋器 (BackgroundExplainer)；尚未載入模型時為 None。"""
+    entry = _get_value(MODEL_HANDLE)
+    return entry['explainer'] if entry is not None else None
+
+
+def get_model_key():
+    """目前模型在登錄表中的鍵，可作為模型的識別。"""
+    handle = st.session_state.get(MODEL_HANDLE)
+    return handle.key if handle is not None else None
+
+
+# ------------------------------------------------------------------------------
+# 資料集
+# ------------------------------------------------------------------------------
+
+def _sources_key(sources):
+    """多檔資料集的鍵：各檔案的路徑、大小與修改時間（不需讀取檔案內容）。"""
+    stats = [(os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in sources]
+    return hashlib.sha256(json.dumps(stats).encode('utf-8')).hexdigest()
+
+
+def acquire_dataset(source):
+    """
+    取得共用的清理後資料集。
+
+    單一檔案以來源檔案內容與清理參數為鍵；目錄或萬用字元符合多個檔案時，以 `src.dataset_builder`
+    平行解析並合併，以檔案組合為鍵。
+
+    Args:
+        source (str): CSV 檔案、目錄或萬用字元。
+
+    Returns:
+        dict or None: df、report（首次載入時的統計）與 profile（資料集摘要）；載入失敗時為 None。
+    """
+    sources = resolve_sources(source)
+    if not sources:
+        st.error(f"錯誤：找不到檔案 {source}")
+        return None
+
+    if len(sources) == 1:
+        key = f"dataset:{clean_data_cache_key(sources[0])}"
+
+        def load():
+            return load_cached_clean_data(sources[0])
+    else:
+        key = f"dataset:combined:{_sources_key(sources)}"
+
+        def load():
+            try:
+                return build_dataset(sources)
+            except (OSError, ValueError) as e:
+                st.error(f"合併資料集失敗：{e}")
+                return None, None
+
+    def build():
+        df, report = load()
+        if df is None:
+            return None
+        profile = report.pop('profile')
+        return {'df': df, 'report': report, 'profile': profile}
+
+    handle = get_registry().acquire(key, build)
+    if handle is None:
+        return None
+    _set_handle(DATASET_HANDLE, handle)
+    return handle.value
+
+
+def get_dataset():
+    """目前工作階段使用的清理後資料集；尚未載入時為 None。"""
+    entry = _get_value(DATASET_HANDLE)
+    return entry['df'] if entry is not None else None
+
+
+def get_dataset_profile():
+    """目前資料集的摘要（見 `src.dataset_profile`）；尚未載入時為 None。"""
+    entry = _get_value(DATASET_HANDLE)
+    return entry['profile'] if entry is not None else None
+
+
+def get_dataset_key():
+    """目前資料集在登錄表中的鍵。"""
+    handle = st.session_state.get(DATASET_HANDLE)
+    return handle.key if handle is not None else None
+
+
+def acquire_preprocessed(build):
+    """
+    取得目前資料集共用的預處理結果（標準化後的特徵、編碼後的標籤與對應的轉換器）。
+
+    Args:
+        build (callable): 未共用時執行預處理的函式，回傳 dict。
+
+    Returns:
+        dict: 預處理結果。
+    """
+    handle = get_registry().acquire(f"preprocessed:{get_dataset_key()}", build)
+    _set_handle(PREPROCESSED_HANDLE, handle)
+    return handle.value
+
+
+def get_preprocessed():
+    """目前工作階段使用的預處理結果；尚未執行時為 None。"""
+    return _get_value(PREPROCESSED_HANDLE)
+
+
+# ------------------------------------------------------------------------------
+# 背景工作
+# ------------------------------------------------------------------------------
+
+def set_job(name, job_id):
+    """記錄目前工作階段的背景工作，並寫入網址參數。"""
+    st.session_state[name] = job_id
+    st.query_params[name] = job_id
+
+
+def get_job(name):
+    """目前工作階段的背景工作 ID；工作階段中沒有時由網址參數接回（例如重新整理頁面後）。"""
+    job_id = st.session_state.get(name)
+    if job_id is None and name in st.query_params:
+        job_id = st.session_state[name] = st.query_params[name]
+    return job_id
+
+
+def clear_job(name):
+    """不再追蹤指定的背景工作。"""
+    st.session_state.pop(name, None)
+    if name in st.query_params:
+        del st.query_params[name]
+
+
+def is_job_applied(job_id):
+    """背景工作的結果是否已套用到目前工作階段。"""
+    return job_id in st.session_state.get(APPLIED_JOBS, ())
+
+
+def mark_job_applied(job_id):
+    """記錄背景工作的結果已套用到目前工作階段。"""
+    st.session_state.setdefault(APPLIED_JOBS, set()).add(job_id)
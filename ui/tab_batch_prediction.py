@@ -1,9 +1,52 @@
+import glob
+import os
+import tempfile
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 
 # We need the summary function
 from ui.utils import generate_shap_summary
+from src.inference import UNMAPPED, score_batch, score_csv_stream
+from src.explainer import ShapExplanationService
+from ui.state import get_explainer, get_model_key, get_predictor
+
+# 超過此大小 (MB) 的上傳檔案預設使用串流模式，只在記憶體中保留統計與預覽
+STREAMING_THRESHOLD_MB = 100
+STREAM_PREVIEW_ROWS = 1000
+# 串流模式結果檔的檔名前綴；其他已結束的工作階段留下、超過保留時數的結果檔會被清除
+RESULT_FILE_PREFIX = "ids_batch_"
+RESULT_FILE_MAX_AGE_HOURS = 24
+
+
+def _clear_batch_results():
+    """清除上一次的分析結果，並刪除串流模式留下的暫存結果檔。"""
+    for key in ('batch_results_df', 'final_batch_for_model', 'batch_summary', 'shap_service'):
+        st.session_state.pop(key, None)
+    result_path = st.session_state.pop('batch_result_path', None)
+    if result_path and os.path.exists(result_path):
+        os.remove(result_path)
+
+
+def _remove_stale_results(max_age_hours=RESULT_FILE_MAX_AGE_HOURS):
+    """刪除已結束的工作階段留下、超過保留時數的串流模式結果檔（工作階段結束時沒有清理的時機）。"""
+    cutoff = time.time() - max_age_hours * 3600
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{RESULT_FILE_PREFIX}*.csv")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            # 其他工作階段可能同時清除同一個檔案
+            pass
+
+
+def _read_result_file(path):
+    """下載時才讀取結果檔，避免每次重新執行都將整個檔案載入伺服器記憶體。"""
+    with open(path, 'rb') as result_file:
+        return result_file.read()
+
 
 def display_batch_prediction_tab():
     """
@@ -34,12 +77,22 @@ def display_batch_prediction_tab():
         # Clear previous results if a new file is uploaded
         if 'current_file_name' not in st.session_state or st.session_state.current_file_name != uploaded_file.name:
             st.session_state.current_file_name = uploaded_file.name
-            if 'batch_results_df' in st.session_state:
-                del st.session_state['batch_results_df']
+            _clear_batch_results()
+
+        streaming = st.toggle(
+            "串流模式 (適用大型檔案)",
+            value=uploaded_file.size > STREAMING_THRESHOLD_MB * 1024 * 1024,
+            help="分塊讀取與分析上傳檔案，結果寫入暫存檔，畫面只保留統計與前幾筆預覽，避免大型檔案耗盡伺服器記憶體。"
+        )
 
         try:
-            batch_df_raw = pd.read_csv(uploaded_file)
-            batch_df_raw.replace([np.inf, -np.inf], np.nan, inplace=True)
+            if streaming:
+                # 串流模式只讀取前幾筆資料供預覽與欄位映射，完整檔案在分析時分塊讀取
+                batch_df_raw = pd.read_csv(uploaded_file, nrows=STREAM_PREVIEW_ROWS)
+                uploaded_file.seek(0)
+            else:
+                batch_df_raw = pd.read_csv(uploaded_file)
+                batch_df_raw.replace([np.inf, -np.inf], np.nan, inplace=True)
             
             with st.expander("點此查看上傳的原始資料 (前 5 筆)"):
                 st.dataframe(batch_df_raw.head())
@@ -54,63 +107,75 @@ def display_batch_prediction_tab():
                     default_index = uploaded_columns.index(feature) + 1 if feature in uploaded_columns else 0
                     column_mapping[feature] = st.selectbox(
                         f"模型特徵: {feature}",
-                        ['未映射'] + uploaded_columns,
+                        [UNMAPPED] + uploaded_columns,
                         index=default_index,
                         key=f"map_{feature}"
                     )
             
             # --- Run Analysis ---
             if st.button("🚀 開始分析流量"):
-                with st.spinner("正在根據映射設定處理資料並進行分析..."):
-                    # Create a DataFrame with the correct feature columns
-                    batch_X_mapped_user = pd.DataFrame(0.0, index=batch_df_raw.index, columns=st.session_state['selected_features'])
-                    for model_feature, uploaded_col in column_mapping.items():
-                        if uploaded_col != '未映射':
-                            batch_X_mapped_user[model_feature] = pd.to_numeric(batch_df_raw[uploaded_col], errors='coerce')
-                    
-                    batch_X_mapped_user.replace([np.inf, -np.inf], np.nan, inplace=True)
-                    batch_X_mapped_user.dropna(inplace=True)
-
-                    if batch_X_mapped_user.empty:
-                        st.warning("預處理後，上傳檔案中沒有有效資料可供分析。")
-                        if 'batch_results_df' in st.session_state:
-                            del st.session_state['batch_results_df']
-                    else:
-                        scaler = st.session_state['scaler']
-                        model = st.session_state['trained_model']
-                        le = st.session_state['le']
-
-                        required_features_for_scaler = scaler.feature_names_in_
-                        batch_df_full = pd.DataFrame(0.0, index=batch_X_mapped_user.index, columns=required_features_for_scaler)
-                        
-                        for col in batch_X_mapped_user.columns:
-                            if col in batch_df_full.columns:
-                                batch_df_full[col] = batch_X_mapped_user[col]
-
-                        batch_scaled_full = scaler.transform(batch_df_full)
-                        batch_scaled_df = pd.DataFrame(batch_scaled_full, index=batch_df_full.index, columns=required_features_for_scaler)
-                        final_batch_for_model = batch_scaled_df[st.session_state['selected_features']]
-                        st.session_state['final_batch_for_model'] = final_batch_for_model
-
-                        batch_predictions_encoded = model.predict(final_batch_for_model)
-                        batch_predictions_label = le.inverse_transform(batch_predictions_encoded)
-
-                        batch_df_results = batch_df_raw.loc[final_batch_for_model.index].copy()
-                        batch_df_results['Predicted_Label'] = batch_predictions_label
-                        batch_df_results['分析結果'] = batch_df_results['Predicted_Label'].apply(lambda x: '攻擊' if x != 'Benign' else '正常')
-                        st.session_state['batch_results_df'] = batch_df_results
+                # 先刪除上一次的結果檔再寫入新的結果
+                _clear_batch_results()
+                if streaming:
+                    with st.spinner("正在以串流模式分塊分析上傳檔案..."):
+                        _remove_stale_results()
+                        result_file = tempfile.NamedTemporaryFile(prefix=RESULT_FILE_PREFIX, suffix=".csv", delete=False)
+                        result_file.close()
+                        st.session_state['batch_result_path'] = result_file.name
+                        summary = score_csv_stream(
+                            uploaded_file,
+                            column_mapping,
+                            get_predictor(),
+                            st.session_state['scaler'],
+                            st.session_state['le'],
+                            st.session_state['selected_features'],
+                            result_file.name,
+                            preview_rows=STREAM_PREVIEW_ROWS,
+                        )
+                        uploaded_file.seek(0)
+
+                        if summary['rows_scored'] == 0:
+                            st.warning("預處理後，上傳檔案中沒有有效資料可供分析。")
+                            _clear_batch_results()
+                        else:
+                            st.session_state['batch_results_df'] = summary.pop('preview')
+                            st.session_state['final_batch_for_model'] = summary.pop('features')
+                            st.session_state['batch_summary'] = summary
+                else:
+                    with st.spinner("正在根據映射設定處理資料並進行分析..."):
+                        batch_df_results, final_batch_for_model = score_batch(
+                            batch_df_raw,
+                            column_mapping,
+                            get_predictor(),
+                            st.session_state['scaler'],
+                            st.session_state['le'],
+                            st.session_state['selected_features'],
+                        )
+
+                        if final_batch_for_model.empty:
+                            st.warning("預處理後，上傳檔案中沒有有效資料可供分析。")
+                        else:
+                            st.session_state['final_batch_for_model'] = final_batch_for_model
+                            st.session_state['batch_results_df'] = batch_df_results
 
         except Exception as e:
             st.error(f"處理上傳檔案時發生錯誤：{e}")
-            if 'batch_results_df' in st.session_state:
-                del st.session_state['batch_results_df']
+            _clear_batch_results()
 
         # --- Display Results ---
         if 'batch_results_df' in st.session_state:
             batch_df_results = st.session_state['batch_results_df']
+            batch_summary = st.session_state.get('batch_summary')
             
             st.subheader("📊 分析結果總覽")
-            prediction_counts = batch_df_results['分析結果'].value_counts()
+            if batch_summary:
+                prediction_counts = pd.Series(batch_summary['result_counts'], name='count')
+                st.caption(
+                    f"串流模式：共讀取 {batch_summary['rows_read']:,} 筆，分析 {batch_summary['rows_scored']:,} 筆有效資料，"
+                    f"耗時 {batch_summary['seconds']:.1f} 秒 ({batch_summary['rows_read'] / max(batch_summary['seconds'], 1e-9):,.0f} 筆/秒)。"
+                )
+            else:
+                prediction_counts = batch_df_results['分析結果'].value_counts()
             st.bar_chart(prediction_counts)
 
             st.subheader("📄 詳細分析結果")
@@ -128,7 +193,20 @@ def display_batch_prediction_tab():
             else:
                 filtered_df = batch_df_results
 
-            if not filtered_df.empty:
+            if batch_summary:
+                st.info(f"串流模式下僅顯示前 {STREAM_PREVIEW_ROWS:,} 筆結果與部分攻擊流量；下載檔案包含全部分析結果。")
+                if not filtered_df.empty:
+                    st.dataframe(filtered_df)
+                result_path = st.session_state.get('batch_result_path')
+                if result_path and os.path.exists(result_path):
+                    # 傳入函式，只在按下下載時才讀取結果檔
+                    st.download_button(
+                        label="📥 下載完整分析結果",
+                        data=lambda: _read_result_file(result_path),
+                        file_name="traffic_analysis_results.csv",
+                        mime="text/csv"
+                    )
+            elif not filtered_df.empty:
                 st.dataframe(filtered_df)
                 csv_results = filtered_df.to_csv(index=False).encode('utf-8')
                 st.download_button(
@@ -144,6 +222,27 @@ def display_batch_prediction_tab():
             if attack_df.empty:
                 st.info("在目前的分析結果中，沒有偵測到攻擊流量可供深入分析。")
             else:
+                final_batch_for_model = st.session_state['final_batch_for_model']
+                le = st.session_state['le']
+
+                # 在背景批次計算所有攻擊流量的 SHAP 值，之後切換流量時直接從快取取得
+                shap_service = st.session_state.get('shap_service')
+                if shap_service is None:
+                    shap_service = ShapExplanationService(
+                        get_explainer(),
+                        get_model_key(),
+                        le.classes_,
+                    )
+                    attack_rows = attack_df.index.intersection(final_batch_for_model.index)
+                    shap_service.start(
+                        final_batch_for_model.loc[attack_rows],
+                        attack_df.loc[attack_rows, 'Predicted_Label'],
+                    )
+                    st.session_state['shap_service'] = shap_service
+
+                if not get_explainer().ready:
+                    st.info("SHAP 解釋器仍在背景建立中，完成後會自動開始計算攻擊流量的 SHAP 值。")
+
                 selected_index = st.selectbox(
                     "選擇一筆攻擊流量的索引 (Index) 進行分析：",
                     options=attack_df.index
@@ -152,41 +251,9 @@ def display_batch_prediction_tab():
                 if selected_index is not None:
                     with st.spinner("正在為您選擇的流量產生 SHAP 分析..."):
                         try:
-                            explainer = st.session_state['shap_explainer']
-                            final_batch_for_model = st.session_state['final_batch_for_model']
-                            le = st.session_state['le']
-
                             single_instance = final_batch_for_model.loc[[selected_index]]
                             single_prediction_label = batch_df_results.loc[selected_index, 'Predicted_Label']
-                            single_prediction_index = list(le.classes_).index(single_prediction_label)
-
-                            shap_values = explainer.shap_values(single_instance)
-                            
-                            base_value = explainer.expected_value
-                            if isinstance(base_value, (list, np.ndarray)):
-                                if single_prediction_index < len(base_value):
-                                    shap_base_value = base_value[single_prediction_index]
-                                else:
-                                    shap_base_value = base_value[0]
-                            else:
-                                shap_base_value = base_value
-
-                            if isinstance(shap_values, list):
-                                if single_prediction_index < len(shap_values):
-                                    shap_values_for_class = shap_values[single_prediction_index]
-                                else:
-                                    shap_values_for_class = shap_values[0]
-                            else:
-                                if single_prediction_index == 0:
-                                    shap_values_for_class = -shap_values
-                                else:
-                                    shap_values_for_class = shap_values
-                                    
-                            shap_values_for_class = shap_values_for_class.flatten()
-
-                            features_for_plot = single_instance.iloc[0]
-                            if len(shap_values_for_class) == len(features_for_plot) + 1:
-                                shap_values_for_class = shap_values_for_class[:-1]
+                            shap_values_for_class, shap_base_value = shap_service.explain(selected_index)
 
                             summary_text = generate_shap_summary(
                                 shap_values_for_class, 
@@ -199,4 +266,19 @@ def display_batch_prediction_tab():
                         except KeyError:
                             st.error(f"發生錯誤：無法在已處理的資料中找到索引 {selected_index}。")
                         except Exception as e:
-                            st.warning(f"無法產生 SHAP 分析：{e}")
\ No newline at end of file
+                            st.warning(f"無法產生 SHAP 分析：{e}")
+
+                # --- Per-class SHAP importance ---
+                st.subheader("📊 各攻擊類別的關鍵特徵 (平均 |SHAP| 值)")
+                if shap_service.error is not None:
+                    st.warning(f"批次 SHAP 計算失敗：{shap_service.error}")
+                elif not shap_service.ready:
+                    st.progress(
+                        shap_service.done_rows / max(shap_service.total_rows, 1),
+                        text=f"背景計算中：{shap_service.done_rows:,} / {shap_service.total_rows:,} 筆攻擊流量"
+                    )
+                    st.button("🔄 更新計算進度")
+                importance = shap_service.class_importance()
+                if not importance.empty:
+                    st.caption("數值越大，代表該特徵對模型判斷為此類別的影響越大。")
+                    st.dataframe(importance.loc[importance.max(axis=1).sort_values(ascending=False).index])
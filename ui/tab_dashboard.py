@@ -1,21 +1,180 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
+import time
+
+from src.dataset_profile import QUANTILE_SAMPLE_ROWS
+from src.explainer import PLOTTING_IMPORT_LOCK
+from src.jobs import CANCELLED, FAILED, FINISHED_STATES, cancel_job, job_status
+from src.model_backends import BACKENDS
+from ui.state import (
+    GA_JOB, MODEL_HANDLE, TRAIN_JOB, clear_job, get_dataset_profile, get_job, get_model, is_job_applied, release_handle,
+)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _confusion_matrix_png(cm_df):
+    """
+    Renders the confusion-matrix heatmap to PNG bytes, cached by the matrix content.
+    """
+    # matplotlib/seaborn 匯入較慢，只在需要繪製混淆矩陣時才匯入；
+    # 與背景執行緒匯入 shap 互斥，避免同時匯入 IPython 造成循環匯入錯誤
+    with PLOTTING_IMPORT_LOCK:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        fig, ax = plt.subplots(figsize=(10, 8))
+        sns.heatmap(cm_df, annot=True, fmt='d', cmap='Blues', ax=ax)
+        ax.set_title('Confusion Matrix')
+        ax.set_xlabel('Predicted Label')
+        ax.set_ylabel('True Label')
+        plt.xticks(rotation=45, ha='right')
+        plt.yticks(rotation=0)
+        plt.tight_layout()
+        buffer = io.BytesIO()
+        # 與 st.pyplot 的預設輸出相同
+        fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+@st.fragment(run_every=1.0)
+def _display_running_job(job_id, title):
+    """
+    Shows live progress of a background job and refreshes every second.
+    Triggers a full rerun once the job finishes so the sidebar can apply its results.
+    """
+    status = job_status(job_id)
+    if status is None or status['state'] in FINISHED_STATES:
+        st.rerun()
+
+    st.write(f"**{title}**")
+    st.progress(min(status.get('fraction') or 0.0, 1.0), text=status.get('message') or "等待工作行程啟動...")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    elapsed = time.time() - status.get('started', status['submitted'])
+    col1.metric("已執行", f"{elapsed:.0f} 秒")
+    eta = status.get('eta_seconds')
+    col2.metric("預估剩餘", f"{eta:.0f} 秒" if eta is not None else "-")
+    if col3.button("取消", key=f"cancel_{job_id}"):
+        cancel_job(job_id)
+    if status.get('history'):
+        history = pd.DataFrame(status['history']).set_index('gen')
+        st.line_chart(history[['max', 'avg']].rename(columns={'max': '最佳分數', 'avg': '平均分數'}))
+
+
+def _display_jobs():
+    """
+    Displays background jobs of this session that have not been applied yet.
+    """
+    for name, title in ((GA_JOB, "基因演算法特徵選擇"), (TRAIN_JOB, "模型訓練")):
+        job_id = get_job(name)
+        if job_id is None or is_job_applied(job_id):
+            continue
+        status = job_status(job_id)
+        if status is None:
+            continue
+        if status['state'] == FAILED:
+            st.error(f"{title}失敗：{status.get('error')}")
+        elif status['state'] == CANCELLED:
+            st.warning(f"{title}已取消。")
+        elif status['state'] not in FINISHED_STATES:
+            _display_running_job(job_id, title)
+
+
+def _display_sampling_report(report):
+    """
+    Displays how much training data the sampling stage removed, per class.
+    """
+    st.subheader("訓練資料抽樣")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("訓練列", f"{report['rows_before']:,} → {report['rows_after']:,}")
+    col2.metric("重複列", f"{report['duplicates']:,}")
+    col3.metric("縮減倍數", f"{report['rows_before'] / max(report['rows_after'], 1):,.1f}x")
+    col4.metric("特徵矩陣", f"{report['mb_before']:,.0f} → {report['mb_after']:,.0f} MB")
+    st.caption(
+        f"抽樣耗時 {report['seconds']:.1f} 秒；測試集未經抽樣，維持原本的類別分佈。"
+        "此處不會另外以完整訓練集訓練來比較，實際節省的時間請以 "
+        "`python -m benchmarks.bench_sampling` 量測 (完整與縮減後訓練集的適應度評估與訓練耗時)。"
+    )
+    le = st.session_state.get('le')
+    st.dataframe(pd.DataFrame([{
+        "類別": le.classes_[item['class']] if le is not None else item['class'],
+        "原始筆數": item['before'],
+        "去除重複後": item['unique'],
+        "抽樣後": item['after'],
+    } for item in report['per_class']]), hide_index=True)
+
+
+def _display_screening_report(report):
+    """
+    Displays which features the filter pre-screening kept or dropped, ranked by score.
+    """
+    method = "互資訊" if report['method'] == 'mutual_info' else "卡方"
+    with st.expander(f"過濾法預篩選：{report['n_before']} → {report['n_after']} 個特徵"):
+        st.caption(
+            f"依{method}排序，篩選耗時 {report['seconds']:.1f} 秒；每次適應度評估 "
+            f"{report['eval_seconds_before']:.2f} → {report['eval_seconds_after']:.2f} 秒。"
+        )
+        scores = report['scores'].sort_values(ascending=False)
+        st.dataframe(pd.DataFrame({
+            "分數": scores.round(4),
+            "結果": [report['dropped'].get(feature, "保留") for feature in scores.index],
+        }))
+
+
+def _display_pareto_front(front):
+    """
+    Displays the Pareto front of the multi-objective search and lets the user pick the feature subset to deploy.
+    """
+    st.write("**柏拉圖前緣 (加權 F1 vs. 每筆預測成本，點的大小代表特徵數)：**")
+    st.caption("預測成本為隨機森林每筆預測平均走訪的節點數 (所有樹加總)，由樹的結構計算，不受計時誤差影響。")
+    front_df = pd.DataFrame([{
+        "特徵數": item['n_features'], "加權 F1": item['f1'], "走訪節點數/筆": item['nodes_per_row'],
+    } for item in front])
+    st.scatter_chart(front_df, x="走訪節點數/筆", y="加權 F1", size="特徵數")
+    st.dataframe(front_df.round({"加權 F1": 4, "走訪節點數/筆": 1}), hide_index=True)
+
+    current = st.session_state['selected_features']
+    chosen = st.selectbox(
+        "要部署的特徵組合",
+        range(len(front)),
+        index=next((i for i, item in enumerate(front) if item['features'] == current), 0),
+        format_func=lambda i: (
+            f"{front[i]['n_features']} 個特徵：F1 {front[i]['f1']:.4f}，每筆走訪 {front[i]['nodes_per_row']:.0f} 個節點"
+        ),
+    )
+    if front[chosen]['features'] != current and st.button("使用此特徵組合"):
+        st.session_state['selected_features'] = front[chosen]['features']
+        st.session_state['best_ga_score'] = front[chosen]['f1']
+        # 已訓練的模型使用原本的特徵組合，需以新的組合重新訓練 (步驟 3)
+        clear_job(TRAIN_JOB)
+        release_handle(MODEL_HANDLE)
+        st.session_state.pop('metrics', None)
+        st.session_state.pop('cm_df', None)
+        st.rerun()
+
+
+def _display_class_recall(cm_df):
+    """
+    Displays per-class recall computed from the confusion matrix (rows are true labels).
+    """
+    support = cm_df.sum(axis=1)
+    recall = pd.Series(cm_df.to_numpy().diagonal(), index=cm_df.index) / support.where(support > 0)
+    st.write("**各類別召回率 (Recall)：**")
+    st.dataframe(pd.DataFrame({"測試筆數": support, "召回率": recall.round(4)}))
 
-from src.data_loader import load_data, clean_data
 
 def display_dashboard_tab():
     """
     Displays the UI for the Dashboard & Model Evaluation tab.
     """
     st.header("📈 儀表板 & 模型評估")
+    _display_jobs()
 
     # This tab shows different things depending on what's available in session_state
     
     # If a model is trained or loaded, show its performance
-    if st.session_state.get('trained_model'):
+    if get_model() is not None:
         st.subheader("模型評估指標")
         if 'metrics' in st.session_state:
             metrics = st.session_state['metrics']
@@ -24,42 +183,121 @@ def display_dashboard_tab():
             col2.metric("Precision", f"{metrics['precision']:.4f}")
             col3.metric("Recall", f"{metrics['recall']:.4f}")
             col4.metric("F1-Score", f"{metrics['f1_score']:.4f}")
+            if 'train_seconds' in metrics:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("模型後端", BACKENDS[metrics['backend']].label)
+                col2.metric("訓練時間", f"{metrics['train_seconds']:.1f} 秒")
+                col3.metric("預測速度", f"{metrics['predict_rows_per_sec']:,.0f} 筆/秒")
+                col4.metric("模型大小", f"{metrics['model_mb']:,.1f} MB")
         else:
             st.info("模型已載入，但無評估指標可顯示 (可能為外部載入的模型)。")
 
+        if 'update_reports' in st.session_state:
+            st.subheader("增量更新紀錄")
+            st.caption("F1 以每次新資料中保留、未參與訓練的部分評估；模型規模為樹數量 (隨機森林) 或迭代次數 (提升模型)。")
+            st.dataframe(pd.DataFrame([{
+                "新資料筆數": report['rows'],
+                "新增類別": ', '.join(report['added_classes']) or '-',
+                "新增類別召回率": ', '.join(
+                    f"{label}: {recall:.2f}" for label, recall in report.get('added_class_recall', {}).items()
+                ) or '-',
+                "模型規模": f"{report['size_before']} → {report['size_after']}",
+                "更新前 F1": report['f1_before'],
+                "更新後 F1": report['f1_after'],
+                "耗時 (秒)": report['seconds'],
+            } for report in st.session_state['update_reports']]).round(4), hide_index=True)
+
         st.subheader("混淆矩陣 (Confusion Matrix)")
         if 'cm_df' in st.session_state:
-            cm_df = st.session_state['cm_df']
-            fig, ax = plt.subplots(figsize=(10, 8))
-            sns.heatmap(cm_df, annot=True, fmt='d', cmap='Blues', ax=ax)
-            ax.set_title('Confusion Matrix')
-            ax.set_xlabel('Predicted Label')
-            ax.set_ylabel('True Label')
-            plt.xticks(rotation=45, ha='right')
-            plt.yticks(rotation=0)
-            plt.tight_layout()
-            st.pyplot(fig)
+            st.image(_confusion_matrix_png(st.session_state['cm_df']), width='stretch')
+            _display_class_recall(st.session_state['cm_df'])
         else:
             st.info("模型已載入，但無混淆矩陣可顯示。")
 
+    if 'backend_comparison' in st.session_state:
+        st.subheader("模型後端比較")
+        st.caption("所有後端使用相同的訓練/測試資料分割。")
+        st.dataframe(
+            st.session_state['backend_comparison'].round({
+                "訓練秒數": 2, "預測速度 (筆/秒)": 0, "模型大小 (MB)": 2, "加權 F1": 4,
+            }),
+            hide_index=True,
+        )
+
     # If feature selection is done, show the results
     if st.session_state.get('selection_done', False):
         st.subheader("基因演算法選擇結果")
         if 'best_ga_score' in st.session_state:
-            st.success(f"演算法執行完畢！最佳分數 (Accuracy): {st.session_state['best_ga_score']:.4f}")
+            score_name = "加權 F1" if st.session_state.get('ga_report', {}).get('objective') == 'pareto' else "Accuracy"
+            st.success(f"演算法執行完畢！最佳分數 ({score_name}): {st.session_state['best_ga_score']:.4f}")
             st.metric(label="選擇的特徵數量", value=f"{len(st.session_state['selected_features'])} / {st.session_state['num_total_features']}")
+
+        if 'ga_report' in st.session_state:
+            ga_report = st.session_state['ga_report']
+            col1, col2, col3 = st.columns(3)
+            col1.metric("適應度快取命中率", f"{ga_report['hit_rate']:.1%}")
+            col2.metric("實際模型評估次數", f"{ga_report['evaluations']}")
+            col3.metric("總執行時間", f"{ga_report['total_seconds']:.1f} 秒")
+            if ga_report.get('stopped_early'):
+                st.info(f"最佳分數已停滯，演算法於第 {ga_report['generations_run']} 代提前停止。")
+            if 'pop_size' in ga_report:
+                representation = "向量化布林矩陣" if ga_report['representation'] == 'packed' else "DEAP 個體列表"
+                st.caption(f"族群大小 {ga_report['pop_size']}，族群表示法：{representation}。")
+            st.write(f"**每一代評估耗時 (秒，{ga_report['n_workers']} 個行程平行評估)：**")
+            st.line_chart(pd.Series(ga_report['generation_times'], name="秒"))
+            if 'history' in ga_report:
+                with st.expander("各世代評估紀錄"):
+                    st.dataframe(pd.DataFrame(ga_report['history']).rename(columns={
+                        'gen': '世代', 'rows': '評估筆數', 'max': '最佳分數', 'avg': '平均分數', 'front_size': '前緣個體數', 'seconds': '耗時 (秒)'
+                    }))
+            if 'pareto_front' in ga_report:
+                _display_pareto_front(ga_report['pareto_front'])
+        if st.session_state.get('screening_report'):
+            _display_screening_report(st.session_state['screening_report'])
         
         st.write("**選擇的特徵列表：**")
         st.dataframe(st.session_state['selected_features'])
     
     st.write("---")
 
-    # Show data analysis if data is loaded
-    if 'df_cleaned' in st.session_state:
-        df_cleaned = st.session_state['df_cleaned']
+    # Show data analysis if data is loaded; the profile is computed once while loading
+    profile = get_dataset_profile()
+    if profile is not None:
         st.header("資料集分析")
+        if 'load_report' in st.session_state:
+            load_report = st.session_state['load_report']
+            st.subheader("資料載入與清理統計")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("有效資料筆數", f"{load_report['rows_kept']:,}")
+            col2.metric("移除的無效資料 (NaN/Infinity)", f"{load_report['rows_dropped']:,}")
+            col3.metric("載入速度", f"{load_report['rows_per_sec']:,.0f} 筆/秒")
+            col4.metric("最高記憶體用量", f"{load_report['peak_rss_mb']:,.0f} MB")
+            source = "磁碟快取 (記憶體映射)" if load_report.get('cache_hit') else "原始 CSV (已建立快取)"
+            st.caption(f"資料來源：{source}。載入耗時 {load_report['seconds']:.1f} 秒，清理後資料佔用 {load_report['frame_mb']:,.1f} MB。")
+            if 'files' in load_report:
+                st.write(f"**各檔案統計 ({len(load_report['files'])} 個檔案，{load_report['workers']} 個行程平行解析，"
+                         f"共用 {load_report['columns']} 個欄位)：**")
+                st.dataframe(pd.DataFrame([{
+                    "檔案": item['file'],
+                    "讀取筆數": item['rows_read'],
+                    "有效筆數": item['rows_kept'],
+                    "移除筆數": item['rows_dropped'],
+                    "重複標頭列": item['header_rows'],
+                    "捨棄欄位": ', '.join(item['dropped_columns']) or '-',
+                    "解析耗時 (秒)": 0.0 if item['cache_hit'] else item['seconds'],
+                    "狀態": item['error'] or ('快取' if item['cache_hit'] else '已解析'),
+                } for item in load_report['files']]).round(2), hide_index=True)
+        if 'preprocess_report' in st.session_state:
+            preprocess_report = st.session_state['preprocess_report']
+            st.caption(
+                f"特徵預處理：標準化後的 float32 特徵矩陣 {preprocess_report['matrix_mb']:,.1f} MB，"
+                f"耗時 {preprocess_report['seconds']:.1f} 秒；記憶體用量 {preprocess_report['rss_before_mb']:,.0f} → "
+                f"{preprocess_report['rss_after_mb']:,.0f} MB (最高 {preprocess_report['peak_rss_mb']:,.0f} MB)。"
+            )
+        if 'sampling_report' in st.session_state:
+            _display_sampling_report(st.session_state['sampling_report'])
         st.subheader("**目標變數 (Label) 分析**")
-        label_counts = df_cleaned['Label'].value_counts()
+        label_counts = profile['label_counts']
         st.write("各類別資料筆數：")
         st.write(label_counts)
         st.subheader("目標變數分佈圖")
@@ -68,13 +306,13 @@ def display_dashboard_tab():
 
         with st.expander("顯示清理後的資料摘要"):
             st.subheader("資料預覽 (前 5 筆)")
-            st.write(df_cleaned.head())
+            st.write(profile['head'])
             st.subheader("資料基本資訊")
-            buffer = io.StringIO()
-            df_cleaned.info(buf=buffer)
-            s = buffer.getvalue()
-            st.text(s)
+            st.caption(f"{profile['rows']:,} 筆 × {len(profile['info'])} 欄，記憶體用量 {profile['memory_mb']:,.1f} MB")
+            st.dataframe(profile['info'])
             st.subheader("數值特徵統計摘要")
-            st.write(df_cleaned.describe())
+            if not profile['quantiles_exact']:
+                st.caption(f"四分位數以均勻抽樣的 {QUANTILE_SAMPLE_ROWS:,} 筆資料估計，其餘統計量為全部資料的精確值。")
+            st.write(profile['describe'])
     else:
         st.info("請至側邊欄點擊「1. 載入與清理資料」以開始。")
\ No newline at end of file
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 
 # We need the summary function
 from ui.utils import generate_shap_summary
+from src.explainer import select_class_shap
+from ui.state import get_explainer, get_predictor
 
 def display_single_prediction_tab():
     """
@@ -32,7 +33,7 @@ def display_single_prediction_tab():
         with st.spinner("執行預測與分析中..."):
             input_df_user = pd.DataFrame([user_inputs])
             scaler = st.session_state['scaler']
-            model = st.session_state['trained_model']
+            predictor = get_predictor()
             le = st.session_state['le']
             
             # Ensure the input DataFrame has all columns the scaler expects
@@ -47,7 +48,7 @@ def display_single_prediction_tab():
             input_scaled_df = pd.DataFrame(input_scaled_full, columns=required_features_for_scaler)
             final_input_for_model = input_scaled_df[st.session_state['selected_features']]
 
-            prediction = model.predict(final_input_for_model)
+            prediction = predictor.predict(final_input_for_model)
             predicted_label = le.inverse_transform(prediction)[0]
 
             st.subheader("預測結果")
@@ -59,37 +60,16 @@ def display_single_prediction_tab():
             # SHAP Analysis
             st.subheader("模型預測解釋 (SHAP Analysis)")
             try:
-                explainer = st.session_state['shap_explainer']
+                explainer = get_explainer()
+                if not explainer.ready:
+                    with st.spinner("等待 SHAP 解釋器在背景建立完成..."):
+                        explainer.get()
                 shap_values = explainer.shap_values(final_input_for_model)
-                predicted_class_index = prediction[0]
-
-                # --- START of the new, safe logic ---
-                base_value = explainer.expected_value
-                if isinstance(base_value, (list, np.ndarray)):
-                    if predicted_class_index < len(base_value):
-                        shap_base_value = base_value[predicted_class_index]
-                    else:
-                        shap_base_value = base_value[0]
-                else:
-                    shap_base_value = base_value
-
-                if isinstance(shap_values, list):
-                    if predicted_class_index < len(shap_values):
-                        shap_values_for_class = shap_values[predicted_class_index]
-                    else:
-                        shap_values_for_class = shap_values[0]
-                else:
-                    if predicted_class_index == 0:
-                        shap_values_for_class = -shap_values
-                    else:
-                        shap_values_for_class = shap_values
-                        
-                shap_values_for_class = shap_values_for_class.flatten()
-
-                features_for_plot = final_input_for_model.iloc[0]
-                if len(shap_values_for_class) == len(features_for_plot) + 1:
-                    shap_values_for_class = shap_values_for_class[:-1]
-                # --- END of the new, safe logic ---
+                shap_values_for_class, shap_base_values = select_class_shap(
+                    shap_values, explainer.expected_value, prediction[0], final_input_for_model.shape[1]
+                )
+                shap_values_for_class = shap_values_for_class[0]
+                shap_base_value = shap_base_values[0]
 
                 summary_text = generate_shap_summary(
                     shap_values_for_class, 